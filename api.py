@@ -0,0 +1,535 @@
+"""
+本地只读HTTP接口
+
+由单一的轮询方（grakx serve）定期获取课程目录，生成内存快照；本地客户端（界面、脚本等）
+通过HTTP读取快照，不会因为客户端的请求而访问教务系统：
+    GET /status                 快照版本、更新时间、各类别条数、登录状态
+    GET /catalog[/类别]          原始课程数据，每条带category字段
+    GET /filtered               筛选后的可选课程（与filter_all_courses格式相同）
+    GET /course/<jx0404id>      单门课程
+    GET /search?q=&field=&prefix=1   按名称、教师、地点、课程号搜索
+    GET /at?weekday=&period=    按上课时间查询
+    GET /login                  登录状态
+    GET /events?topics=&ids=&categories=   服务器推送事件（SSE），见EventBroadcaster
+
+每个快照版本的响应只序列化一次（搜索结果按查询串缓存），并同时保留gzip压缩后的版本；
+ETag为响应体的摘要，数据没有变化时即使快照版本更新，客户端的If-None-Match仍会得到304。
+
+/events推送以下事件，客户端无需轮询：
+    catalog_diff    某门课程的剩余人数（syrs）或冲突情况（ctsm）变化，每门课程一个事件
+    enrollment      post_class的提交结果
+    login_state     登录状态变化
+每个事件只序列化一次，按各订阅方的过滤条件（事件类型、选课代码、类别）分发；
+事件ID为"<纪元>-<序号>"，纪元在每次启动时随机生成；断线重连时浏览器自动携带Last-Event-ID，补发最近的事件。
+Last-Event-ID之后的事件已不在保留范围内，或其纪元与当前不同（服务器重启过）时改为发送一个reset事件，
+客户端应重新获取/catalog，之后的事件照常推送。
+"""
+import gzip
+import hashlib
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import events
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# 默认的课程目录刷新间隔，单位：秒
+DEFAULT_REFRESH_INTERVAL = 30
+# 小于该大小的响应不压缩，单位：字节
+_GZIP_MIN_SIZE = 512
+# 每个快照版本最多缓存的已序列化响应数（主要是不同的搜索查询）
+_RENDER_CACHE_SIZE = 256
+# 推送的事件类型
+EVENT_TOPICS = (events.CATALOG_DIFF, events.ENROLLMENT, events.LOGIN_STATE)
+# 没有事件时发送心跳注释的间隔，用于发现已断开的连接，单位：秒
+_HEARTBEAT_INTERVAL = 15
+# 单个订阅方未发送的事件超过该数量时断开该订阅方（客户端重连后按Last-Event-ID补发）
+_MAX_PENDING = 1024
+# 保留用于断线补发的最近事件数，不少于_MAX_PENDING，因积压被断开的订阅方重连后才能补发全部事件
+_EVENT_HISTORY = 2 * _MAX_PENDING
+# 无法补发时通知客户端重新获取完整目录的事件
+RESET_EVENT = "reset"
+
+
+class Rendered:
+    """序列化一次的响应体"""
+
+    __slots__ = ("body", "etag", "_gzipped")
+
+    def __init__(self, document):
+        self.body = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:20]}"'
+        self._gzipped = None
+
+    @property
+    def gzipped(self) -> bytes:
+        # 首次需要时压缩；并发时可能重复压缩一次，结果相同
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzipped
+
+
+def _split_param(value):
+    """逗号分隔的查询参数，未提供时返回None（不过滤）"""
+    if not value:
+        return None
+    return frozenset(item.strip() for item in value.split(",") if item.strip())
+
+
+class Subscriber:
+    """事件订阅方及其过滤条件"""
+
+    def __init__(self, topics=None, ids=None, categories=None):
+        """
+        :param topics: 订阅的事件类型，None表示全部
+        :param ids: 只接收这些选课代码的课程事件（catalog_diff、enrollment），None表示不过滤
+        :param categories: 只接收这些类别的catalog_diff事件，None表示不过滤
+        """
+        self.topics = topics
+        self.ids = ids
+        self.categories = categories
+        self.pending = deque()
+        self.closed = False
+
+    def matches(self, topic, jx0404id=None, category=None) -> bool:
+        if self.topics is not None and topic not in self.topics:
+            return False
+        if self.ids is not None and jx0404id is not None and jx0404id not in self.ids:
+            return False
+        if self.categories is not None and category is not None and category not in self.categories:
+            return False
+        return True
+
+
+class EventBroadcaster:
+    """将事件序列化一次后分发给所有匹配的订阅方"""
+
+    def __init__(self, history=_EVENT_HISTORY, max_pending=_MAX_PENDING):
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._subscribers = []
+        # (事件ID, 类型, 选课代码, 类别, 已序列化的帧)，用于断线补发
+        self._history = deque(maxlen=max(history, max_pending))
+        # 事件ID的前缀，区分不同进程发出的事件ID，重启后旧的Last-Event-ID不会被当作本进程的序号
+        self.epoch = secrets.token_hex(4)
+        self._next_id = 1
+        self._closed = False
+        self.published = 0
+        self.delivered = 0
+        self.disconnected = 0
+
+    def publish(self, topic, payload, jx0404id=None, category=None) -> int:
+        """
+        发布事件，返回事件ID（"<纪元>-<序号>"）
+
+        :param topic: 事件类型
+        :param payload: 事件数据（可JSON序列化）
+        :param jx0404id: 事件相关的选课代码，用于按课程过滤
+        :param category: 事件相关的类别，用于按类别过滤
+        """
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        with self._cond:
+            event_id = self._next_id
+            self._next_id += 1
+            frame = f"id: {self.epoch}-{event_id}\nevent: {topic}\ndata: {data}\n\n".encode("utf-8")
+            self._history.append((event_id, topic, jx0404id, category, frame))
+            self.published += 1
+            for subscriber in self._subscribers:
+                if subscriber.closed or not subscriber.matches(topic, jx0404id, category):
+                    continue
+                if len(subscriber.pending) >= self.max_pending:
+                    # 消费过慢的订阅方断开，避免无限占用内存
+                    subscriber.closed = True
+                    self.disconnected += 1
+                    continue
+                subscriber.pending.append(frame)
+                self.delivered += 1
+            self._cond.notify_all()
+        return f"{self.epoch}-{event_id}"
+
+    def subscribe(self, subscriber: Subscriber, last_event_id=None) -> Subscriber:
+        """
+        加入订阅方；提供last_event_id（客户端收到的最后一个事件ID）时补发其后仍保留的匹配事件
+
+        其后的事件已有部分不在保留范围内，或last_event_id不是本进程发出的（纪元不同，如服务器重启过，
+        或无法解析）时，不补发而是发送一个reset事件，ID为当前最新的事件ID
+        """
+        with self._cond:
+            if last_event_id is not None:
+                latest = self._next_id - 1
+                oldest = self._history[0][0] if self._history else self._next_id
+                epoch, _, number = str(last_event_id).rpartition("-")
+                number = int(number) if epoch == self.epoch and number.isdigit() else None
+                if number is None or number > latest or number < oldest - 1:
+                    latest_id = f"{self.epoch}-{latest}"
+                    data = json.dumps({"last_event_id": latest_id}, separators=(",", ":"))
+                    frame = f"id: {latest_id}\nevent: {RESET_EVENT}\ndata: {data}\n\n".encode("utf-8")
+                    subscriber.pending.append(frame)
+                else:
+                    subscriber.pending.extend(
+                        frame for event_id, topic, jx0404id, category, frame in self._history
+                        if event_id > number and subscriber.matches(topic, jx0404id, category))
+            subscriber.closed = self._closed
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._cond:
+            subscriber.closed = True
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def next_frames(self, subscriber: Subscriber, timeout=None):
+        """
+        等待并取出订阅方待发送的帧
+
+        Returns:
+            帧列表，超时时为空列表；订阅方已关闭时返回None
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: subscriber.pending or subscriber.closed, timeout)
+            if subscriber.closed:
+                return None
+            frames = list(subscriber.pending)
+            subscriber.pending.clear()
+            return frames
+
+    def close(self):
+        """关闭所有订阅方"""
+        with self._cond:
+            self._closed = True
+            for subscriber in self._subscribers:
+                subscriber.closed = True
+            self._cond.notify_all()
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "delivered": self.delivered,
+                "disconnected": self.disconnected,
+            }
+
+
+def catalog_changes(old_catalog, new_catalog):
+    """
+    比较两个目录，返回剩余人数或冲突情况发生变化的课程
+
+    Returns:
+        [(jx0404id, 类别, {"syrs": [原值, 新值], "ctsm": [原值, 新值]}), ...]，只包含变化的字段；
+        新出现和消失的课程不计入
+    """
+    changes = []
+    for category, row in new_catalog:
+        jx0404id = row.get("jx0404id")
+        old = old_catalog.get(jx0404id) if jx0404id else None
+        if old is None:
+            continue
+        diff = {field: [old.row.get(field), row.get(field)]
+                for field in ("syrs", "ctsm") if old.row.get(field) != row.get(field)}
+        if diff:
+            changes.append((jx0404id, category, diff))
+    return changes
+
+
+class CatalogState:
+    """课程目录的内存快照及其已序列化的响应"""
+
+    def __init__(self):
+        from get_class.catalog import Catalog
+        from get_class.index import CourseIndex
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.version = 0
+        self.updated_at = None
+        self.catalog = Catalog()
+        self.index = CourseIndex()
+        self.logged_in = None
+        self.errors = {}
+        # (资源, 参数...) -> Rendered，快照版本变化时清空
+        self._rendered = OrderedDict()
+        self.broadcaster = EventBroadcaster()
+
+    # ---------------------------------------------------------------- 更新
+
+    def update_catalog(self, catalog):
+        """
+        用一次刷新得到的目录替换快照
+
+        获取失败的类别沿用上一次快照中的数据
+        """
+        from get_class.catalog import Catalog
+
+        merged = Catalog()
+        for category in ("ts", "bx", "zy"):
+            if category in catalog.errors:
+                merged.add(category, self.catalog.rows(category))
+            else:
+                merged.add(category, catalog.rows(category))
+        self.index.update(merged.rows(), full=True)
+        changes = catalog_changes(self.catalog, merged)
+        with self._lock:
+            self.catalog = merged
+            self.errors = {category: str(error) for category, error in catalog.errors.items()}
+            self.version += 1
+            self.updated_at = time.time()
+            self._rendered.clear()
+        # 在轮询线程中预先序列化最常用的响应，客户端请求时直接返回
+        self.render(("catalog", None), self.catalog_document)
+        self.render(("filtered",), self.filtered_document)
+        for jx0404id, category, diff in changes:
+            self.broadcaster.publish(events.CATALOG_DIFF, {"jx0404id": jx0404id, "category": category, **diff},
+                                     jx0404id=jx0404id, category=category)
+
+    def refresh(self, max_age=None):
+        """获取课程目录并更新快照；与其他调用方同时发起的获取会合并为一次"""
+        from get_class import get_class
+        from get_class.catalog import Catalog
+
+        self.update_catalog(Catalog.from_futures(get_class(max_age=max_age)))
+
+    def refresh_in_background(self):
+        """在后台线程中刷新，上一次刷新尚未完成时跳过"""
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+
+        def worker():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[api] 刷新课程目录失败: {e}")
+            finally:
+                self._refresh_lock.release()
+
+        threading.Thread(target=worker, daemon=True, name="api_refresh").start()
+
+    def set_login_state(self, logged_in):
+        """记录登录状态（LOGIN_STATE事件的处理函数），状态变化时推送给订阅方"""
+        if logged_in != self.logged_in:
+            self.logged_in = logged_in
+            self.broadcaster.publish(events.LOGIN_STATE, {"logged_in": logged_in})
+
+    def publish_enrollment(self, result):
+        """推送选课提交结果（ENROLLMENT事件的处理函数）"""
+        self.broadcaster.publish(events.ENROLLMENT, result, jx0404id=result.get("course_id"))
+
+    def start_polling(self, loop=None, interval=DEFAULT_REFRESH_INTERVAL):
+        """
+        在事件循环中定期刷新快照，并跟随LOGIN_STATE、ENROLLMENT事件更新登录状态、推送选课结果
+
+        :param loop: 事件循环，默认为events.DEFAULT_LOOP
+        :param interval: 刷新间隔，单位：秒
+        :return: 刷新定时器
+        """
+        loop = loop or events.DEFAULT_LOOP
+        loop.subscribe(events.LOGIN_STATE, self.set_login_state)
+        loop.subscribe(events.ENROLLMENT, self.publish_enrollment)
+        return loop.call_every(interval, self.refresh_in_background)
+
+    # ---------------------------------------------------------------- 响应
+
+    def render(self, key, build) -> Rendered:
+        """返回当前快照版本下key对应的已序列化响应，没有时调用build()生成文档并序列化"""
+        with self._lock:
+            version = self.version
+            rendered = self._rendered.get(key)
+            if rendered is not None:
+                self._rendered.move_to_end(key)
+                return rendered
+        rendered = Rendered(build())
+        with self._lock:
+            # 序列化期间快照已更新时不缓存，避免旧数据覆盖新版本
+            if version == self.version:
+                self._rendered[key] = rendered
+                while len(self._rendered) > _RENDER_CACHE_SIZE:
+                    self._rendered.popitem(last=False)
+        return rendered
+
+    def status_document(self):
+        return {
+            "version": self.version,
+            "updated_at": self.updated_at,
+            "totals": {category: len(self.catalog.rows(category)) for category in ("zy", "bx", "ts")},
+            "errors": self.errors,
+            "logged_in": self.logged_in,
+            "events": self.broadcaster.metrics(),
+        }
+
+    def catalog_document(self, category=None):
+        return [{"category": entry.category, **entry.row} for entry in self.catalog
+                if category is None or entry.category == category]
+
+    def filtered_document(self):
+        return self.catalog.filtered(verbose=False)
+
+    def course_document(self, jx0404id):
+        entry = self.catalog.get(jx0404id)
+        return None if entry is None else {"category": entry.category, **entry.row}
+
+    def search_document(self, query, fields=None, prefix=False):
+        return self.index.search(query, fields=fields, prefix=prefix)
+
+    def at_document(self, weekday, period=None):
+        return self.index.at(weekday, period)
+
+    def login_document(self):
+        return {"logged_in": self.logged_in}
+
+
+class APIRequestHandler(BaseHTTPRequestHandler):
+    """只读接口的请求处理"""
+
+    server_version = "GrakX"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> CatalogState:
+        return self.server.state
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["events"]:
+            self._stream_events(params)
+            return
+        try:
+            rendered = self._route(parts, params)
+        except ValueError as e:
+            self._send_error(400, str(e))
+            return
+        if rendered is None:
+            self._send_error(404, f"未找到: {url.path}")
+            return
+        self._send_rendered(rendered)
+
+    def _route(self, parts, params):
+        state = self.state
+        if not parts or parts == ["status"]:
+            # 状态包含登录状态等快照之外的信息，不缓存
+            return Rendered(state.status_document())
+        if parts == ["login"]:
+            return Rendered(state.login_document())
+        if parts[0] == "catalog" and len(parts) <= 2:
+            category = parts[1] if len(parts) == 2 else None
+            if category not in (None, "zy", "bx", "ts"):
+                return None
+            return state.render(("catalog", category), lambda: state.catalog_document(category))
+        if parts == ["filtered"]:
+            return state.render(("filtered",), state.filtered_document)
+        if parts[0] == "course" and len(parts) == 2:
+            document = state.course_document(parts[1])
+            return None if document is None else state.render(("course", parts[1]), lambda: document)
+        if parts == ["search"]:
+            query = params.get("q", "").strip()
+            if not query:
+                raise ValueError("缺少查询参数q")
+            fields = tuple(params["field"].split(",")) if params.get("field") else None
+            prefix = params.get("prefix", "") in ("1", "true")
+            return state.render(("search", query, fields, prefix),
+                                lambda: state.search_document(query, fields, prefix))
+        if parts == ["at"]:
+            try:
+                weekday = int(params["weekday"])
+                period = int(params["period"]) if params.get("period") else None
+            except (KeyError, ValueError):
+                raise ValueError("weekday和period必须是整数")
+            return state.render(("at", weekday, period), lambda: state.at_document(weekday, period))
+        return None
+
+    def _stream_events(self, params):
+        """以SSE格式持续推送事件，直到客户端断开或服务器关闭"""
+        topics = _split_param(params.get("topics"))
+        if topics is not None and not topics <= set(EVENT_TOPICS):
+            self._send_error(400, f"topics只能是 {','.join(EVENT_TOPICS)}")
+            return
+        last_event_id = self.headers.get("Last-Event-ID") or params.get("last_event_id") or None
+
+        broadcaster = self.state.broadcaster
+        subscriber = broadcaster.subscribe(Subscriber(
+            topics, _split_param(params.get("ids")), _split_param(params.get("categories"))), last_event_id)
+        # 流式响应没有Content-Length，以关闭连接表示结束
+        self.close_connection = True
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.wfile.write(b"retry: 3000\n\n")
+            while True:
+                frames = broadcaster.next_frames(subscriber, timeout=_HEARTBEAT_INTERVAL)
+                if frames is None:
+                    break
+                self.wfile.write(b"".join(frames) if frames else b": ping\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    def _accepts_gzip(self) -> bool:
+        return "gzip" in self.headers.get("Accept-Encoding", "").lower()
+
+    def _send_rendered(self, rendered: Rendered):
+        if_none_match = self.headers.get("If-None-Match", "")
+        if rendered.etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            self.send_response(304)
+            self.send_header("ETag", rendered.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = rendered.body
+        use_gzip = len(body) >= _GZIP_MIN_SIZE and self._accepts_gzip()
+        if use_gzip:
+            body = rendered.gzipped
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("ETag", rendered.etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("X-Catalog-Version", str(self.state.version))
+        if self.state.updated_at is not None:
+            self.send_header("Last-Modified", formatdate(self.state.updated_at, usegmt=True))
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class APIServer(ThreadingHTTPServer):
+    """持有CatalogState的多线程HTTP服务器"""
+
+    daemon_threads = True
+
+    def __init__(self, state: CatalogState, host=DEFAULT_HOST, port=DEFAULT_PORT,
+                 handler=APIRequestHandler):
+        self.state = state
+        super().__init__((host, port), handler)
+
+
+def start_server(state: CatalogState, host=DEFAULT_HOST, port=DEFAULT_PORT) -> APIServer:
+    """在后台线程中启动HTTP服务器并返回；调用server.shutdown()停止"""
+    server = APIServer(state, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True, name="api_server").start()
+    return server
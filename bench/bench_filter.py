@@ -0,0 +1,309 @@
+"""
+课程目录规模基准测试
+
+生成1千到100万条的合成课程目录（包含真实格式的sksj、非数字的syrs和冲突说明），
+测量filter_*_courses、filter_all_courses、统一目录Catalog、aaData解码、sksj解析和CourseIndex等引擎的
+吞吐量（条/秒）和峰值内存，并与保存的基线比较，出现回退时以非零状态码退出。
+
+吞吐量以同一次运行中参照负载（只用内置类型、不依赖本项目代码）的吞吐量为单位保存和比较，
+基线因此不随机器快慢变化；峰值内存按绝对值比较。tests/test_bench_filter.py在测试中运行该检查（需设置GRAKX_BENCH=1）。
+
+运行方式：
+    python -m bench.bench_filter [--sizes 1000,10000,100000] [--engine 名称 ...]
+    python -m bench.bench_filter --save-baseline     # 将本次结果保存为基线
+    python -m bench.bench_filter --check             # 与基线比较，回退时退出码为1
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import Future
+
+from get_class.filter import filter_zy_courses, filter_bx_courses, filter_ts_courses, filter_all_courses
+from get_class.catalog import Catalog
+from get_class.index import CourseIndex
+from get_class.sksj import parse_sksj
+
+# 基线文件
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines", "bench_filter.json")
+DEFAULT_SIZES = (1000, 10000, 100000)
+# 合成数据中每页的条数（与DataTables分页请求对应）
+PAGE_SIZE = 100
+# 相对吞吐量低于基线的(1-容差)倍、或峰值内存高于基线的(1+容差)倍时视为回退；
+# 相对吞吐量抵消了机器速度差异，容差可以比绝对吞吐量小
+DEFAULT_TOLERANCE = 0.3
+# 参照负载的名称，其他引擎的相对吞吐量 = 吞吐量 / 同一规模下参照负载的吞吐量
+REFERENCE_ENGINE = "reference"
+
+_WEEKDAYS = "一二三四五六日"
+_TEACHERS = ["张伟", "王芳", "李娜", "刘洋", "陈静", "杨帆", "赵磊", "黄敏", "周杰", "吴霞", "徐明", "孙丽"]
+_COURSES = ["高等数学", "线性代数", "概率论与数理统计", "微观经济学", "会计学原理", "大学英语",
+            "数据结构", "市场营销学", "统计学", "管理学", "体育", "中国近现代史纲要"]
+_BUILDINGS = ["拓新楼", "励学楼", "行政楼", "实验楼"]
+# 非数字的剩余人数和冲突说明
+_ODD_SYRS = ["", "-", "不限", "-3", "0", None, "满"]
+_CONFLICTS = ["与第1-16周 星期一 1-2节冲突", "已选同门课程", "学分已达上限"]
+
+
+def _make_sksj(rng: random.Random) -> str:
+    entries = []
+    for _ in range(rng.choice((1, 1, 1, 2))):
+        start = rng.choice((1, 3, 5, 7, 9, 11))
+        weeks = rng.choice(("1-16周", "1-8周", "9-16周", "1-16周(单)", "2,4,6,8周", "1-17周(双)"))
+        entries.append(f"{weeks} 星期{rng.choice(_WEEKDAYS)} {start}-{start + 1}节")
+    return "<br>".join(entries)
+
+
+def generate_catalog(size: int, seed: int = 0):
+    """
+    生成合成课程目录
+
+    约70%为数字剩余人数（其中约20%为0或负数），10%为非数字剩余人数，20%带冲突说明；
+    字符串从有限的取值中选择，与真实目录一样大量重复
+    """
+    rng = random.Random(seed)
+    sksj_pool = [_make_sksj(rng) for _ in range(512)]
+    rooms = [f"{b}{rng.randint(1, 6)}{rng.randint(1, 30):02d}" for b in _BUILDINGS for _ in range(32)]
+    rows = []
+    for i in range(size):
+        roll = rng.random()
+        if roll < 0.7:
+            syrs = str(rng.randint(-2, 40) if rng.random() < 0.2 else rng.randint(1, 120))
+        elif roll < 0.8:
+            syrs = rng.choice(_ODD_SYRS)
+        else:
+            syrs = str(rng.randint(0, 60))
+        rows.append({
+            "jx0404id": f"{202520260000000 + i}",
+            "kch": f"{rng.randint(10000, 99999)}",
+            "kcmc": rng.choice(_COURSES),
+            "xf": rng.choice(("1", "1.5", "2", "3", "4")),
+            "skls": rng.choice(_TEACHERS),
+            "xqid": "1",
+            "sksj": rng.choice(sksj_pool),
+            "skdd": rng.choice(rooms),
+            "xxrs": "120",
+            "xkrs": str(rng.randint(0, 120)),
+            "syrs": syrs,
+            "ctsm": rng.choice(_CONFLICTS) if roll >= 0.8 else "",
+            "szkcflmc": "",
+        })
+    return rows
+
+
+def _completed(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def _split_categories(rows):
+    # 按类别均分，与三个接口各自返回一部分目录的情况一致
+    third = len(rows) // 3
+    return rows[:third], rows[third:2 * third], rows[2 * third:]
+
+
+def _prepare_all(rows):
+    parts = _split_categories(rows)
+    return lambda: filter_all_courses(tuple(_completed(part) for part in parts))
+
+
+def _prepare_catalog(rows):
+    # 只测量合并去重和一次遍历筛选，不含future
+    parts = _split_categories(rows)
+
+    def run():
+        catalog = Catalog()
+        for category, part in zip(("ts", "bx", "zy"), parts):
+            catalog.add(category, part)
+        return catalog.filtered(verbose=False)
+    return run
+
+
+def _prepare_aadata(rows):
+    payloads = [
+        json.dumps({"iTotalRecords": len(rows), "aaData": rows[i:i + PAGE_SIZE]}, ensure_ascii=False)
+        for i in range(0, len(rows), PAGE_SIZE)
+    ]
+    return lambda: [row for payload in payloads for row in json.loads(payload).get("aaData") or []]
+
+
+def _prepare_reference(rows):
+    # 与筛选类似的逐条取字段并创建字典，只用内置类型，用于抵消机器和解释器的速度差异
+    return lambda: [{
+        "jx0404id": row.get("jx0404id"), "xf": row.get("xf"), "skls": row.get("skls"), "skdd": row.get("skdd"),
+        "sksj": row.get("sksj"), "kcmc": row.get("kcmc"), "ctsm": row.get("ctsm"), "syrs": row.get("syrs"),
+    } for row in rows]
+
+
+# 引擎名称 -> prepare(rows)，返回被计时的无参函数；数据准备不计入耗时和内存
+ENGINES = {
+    REFERENCE_ENGINE: _prepare_reference,
+    "filter_zy": lambda rows: lambda: filter_zy_courses(rows),
+    "filter_bx": lambda rows: lambda: filter_bx_courses(rows),
+    "filter_ts": lambda rows: lambda: filter_ts_courses(rows),
+    "filter_all": _prepare_all,
+    "catalog": _prepare_catalog,
+    "aadata_decode": _prepare_aadata,
+    "sksj_parse": lambda rows: lambda: [parse_sksj(row["sksj"]) for row in rows],
+    "index_update": lambda rows: lambda: CourseIndex().update(rows),
+}
+
+
+def _timed(run) -> float:
+    """
+    运行一次并返回耗时
+
+    引擎都是单线程的CPU密集工作，用进程CPU时间计时，不计入被其他进程抢占的时间；
+    与timeit一样在计时期间关闭垃圾回收，避免回收时机不同带来的抖动
+    """
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.process_time()
+        result = run()
+        return time.process_time() - start
+    finally:
+        gc.enable()
+        del result
+
+
+def measure(engine: str, rows, repeat: int = 3, reference=None) -> dict:
+    """
+    测量一个引擎处理整个目录的吞吐量和峰值内存
+
+    耗时取repeat次中最快的一次；峰值内存在单独的一次运行中用tracemalloc测量，避免影响计时。
+    提供reference（参照负载的无参函数）时与引擎交替计时，
+    两者经历相同的机器负载，结果中附带relative（引擎吞吐量 / 参照负载吞吐量）
+    """
+    run = ENGINES[engine](rows)
+    # 筛选函数会打印统计信息，计时时丢弃
+    with contextlib.redirect_stdout(io.StringIO()):
+        best = best_reference = float("inf")
+        for _ in range(repeat):
+            if reference is not None:
+                best_reference = min(best_reference, _timed(reference))
+            best = min(best, _timed(run))
+
+        tracemalloc.start()
+        try:
+            result = run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+
+    measured = {"rows_per_s": round(len(rows) / best), "seconds": round(best, 6), "peak_kib": round(peak / 1024, 1)}
+    if reference is not None:
+        measured["relative"] = round(best_reference / best, 4)
+    return measured
+
+
+def run_engines(sizes, engines, repeat: int = 3, seed: int = 0, on_result=None) -> dict:
+    """
+    测量各规模下的引擎，返回{引擎: {规模: 结果}}
+
+    其他引擎与参照负载交替计时，结果中附带relative（相对参照负载的吞吐量）
+
+    :param on_result: 每测完一项时的回调on_result(引擎, 规模, 结果)
+    """
+    results = {}
+    for size in sizes:
+        rows = generate_catalog(size, seed=seed)
+        reference = ENGINES[REFERENCE_ENGINE](rows)
+        for engine in [REFERENCE_ENGINE] + [name for name in engines if name != REFERENCE_ENGINE]:
+            if engine == REFERENCE_ENGINE:
+                result = dict(measure(engine, rows, repeat=repeat), relative=1.0)
+            else:
+                result = measure(engine, rows, repeat=repeat, reference=reference)
+            results.setdefault(engine, {})[str(size)] = result
+            if on_result is not None:
+                on_result(engine, size, result)
+        del rows, reference
+    return results
+
+
+def load_baseline(path=BASELINE_FILE) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(results: dict, path=BASELINE_FILE):
+    """合并保存基线（只覆盖本次测量过的引擎和规模）"""
+    baseline = load_baseline(path)
+    for engine, by_size in results.items():
+        baseline.setdefault(engine, {}).update(by_size)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def compare(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE):
+    """返回相对基线出现回退的项目说明列表"""
+    regressions = []
+    for engine, by_size in results.items():
+        if engine == REFERENCE_ENGINE:
+            continue
+        for size, result in by_size.items():
+            base = baseline.get(engine, {}).get(size)
+            if base is None:
+                continue
+            if result["relative"] < base["relative"] * (1 - tolerance):
+                regressions.append(f"{engine}@{size}: 相对吞吐量 {result['relative']} < 基线 {base['relative']}")
+            if result["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+                regressions.append(f"{engine}@{size}: 峰值内存 {result['peak_kib']} > 基线 {base['peak_kib']} KiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="课程目录规模基准测试")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="目录规模，逗号分隔，如 1000,10000,1000000")
+    parser.add_argument("--engine", action="append", choices=sorted(ENGINES), help="只测量指定引擎，可重复指定")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="每项的重复次数，取最快一次")
+    parser.add_argument("--seed", type=int, default=0, help="合成数据的随机种子")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线文件路径")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--check", action="store_true", help="与基线比较，出现回退时以非零状态码退出")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="允许的相对回退幅度")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    engines = args.engine or list(ENGINES)
+    baseline = load_baseline(args.baseline)
+
+    def report(engine, size, result):
+        base = baseline.get(engine, {}).get(str(size), {}).get("relative", "-")
+        print(f"{engine:<16}{size:>10}{result['rows_per_s']:>18}{result['relative']:>12}{result['seconds'] * 1000:>12.2f}"
+              f"{result['peak_kib']:>18}{base:>12}")
+
+    print(f"{'引擎':<16}{'规模':>10}{'吞吐量(条/秒)':>16}{'相对吞吐量':>10}{'耗时(ms)':>12}{'峰值内存(KiB)':>16}{'基线(相对)':>10}")
+    results = run_engines(sizes, engines, repeat=args.repeat, seed=args.seed, on_result=report)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"基线已保存到 {args.baseline}")
+
+    if args.check:
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"回退: {message}")
+        if regressions:
+            return 1
+        print("未发现回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+导入耗时预算检查
+
+在全新的解释器中使用 -X importtime 导入 session、get_class 和命令行入口，
+统计累计导入耗时，并检查cv2、ddddocr等重型依赖是否在首次使用前就被导入。
+超出预算或提前导入重型依赖时以非零状态码退出。
+
+运行方式：
+    python -m bench.bench_import [--budget-ms 毫秒]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# 项目根目录
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 需要测量的顶层模块
+TARGET_MODULES = ("session", "get_class", "cli")
+# 不允许在导入阶段加载的重型依赖
+HEAVY_MODULES = ("cv2", "numpy", "PIL", "ddddocr", "onnxruntime")
+# 默认导入耗时预算（毫秒）
+DEFAULT_BUDGET_MS = 100
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)\s*$")
+
+
+def measure_import_time():
+    """
+    在子进程中导入目标模块
+
+    Returns:
+        (各顶层模块的累计耗时（微秒）字典, 被导入的重型依赖列表)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(TARGET_MODULES)],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+    )
+
+    cumulative = {}
+    heavy = set()
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        if len(match.group(3)) == 1 and name in TARGET_MODULES:
+            cumulative[name] = int(match.group(2))
+        top_level = name.split(".", 1)[0]
+        if top_level in HEAVY_MODULES:
+            heavy.add(top_level)
+    return cumulative, sorted(heavy)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="导入耗时预算检查")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"累计导入耗时预算，默认{DEFAULT_BUDGET_MS}毫秒")
+    args = parser.parse_args(argv)
+
+    cumulative, heavy = measure_import_time()
+    total_ms = sum(cumulative.values()) / 1000
+    for name in TARGET_MODULES:
+        print(f"{name:<10} {cumulative.get(name, 0) / 1000:8.2f} ms")
+    print(f"{'合计':<8} {total_ms:8.2f} ms  预算: {args.budget_ms:.0f} ms")
+
+    failed = False
+    if heavy:
+        print(f"导入阶段加载了重型依赖: {', '.join(heavy)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("导入耗时超出预算")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+选课轮次页面解析基准测试
+
+使用录制的 xklc_list 页面，对比旧实现（html.parser 全量解析 + apparent_encoding 探测编码）
+与当前实现（响应头优先确定编码 + 只解析表格节点）的耗时。
+
+运行方式：
+    python -m bench.bench_parse [-n 次数] [--cassette 磁带文件]
+
+指定--cassette时使用磁带中录制的真实 xklc_list 响应（见session.http）。
+"""
+import argparse
+import os
+import time
+from urllib.parse import urlsplit
+import requests
+from bs4 import BeautifulSoup
+from session.course import _parse_xklc_list, _extract_xklc_row, _resolve_encoding, HTML_PARSER
+from session.http import load_cassette, entry_body
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+XKLC_LIST_HTML = os.path.join(DATA_DIR, "xklc_list.html")
+# 磁带中 xklc_list 请求的路径后缀
+XKLC_LIST_PATH = "/xsxk/xklc_list"
+
+
+def _make_response(body: bytes, content_type: str) -> requests.Response:
+    """构造一个离线的响应对象"""
+    resp = requests.Response()
+    resp._content = body
+    resp.status_code = 200
+    resp.headers["Content-Type"] = content_type
+    return resp
+
+
+def _load_from_cassette(path):
+    """取磁带中最后一次录制的 xklc_list 响应（只比较路径末尾，不限定录制时的服务器地址）"""
+    body = None
+    for entry in load_cassette(path):
+        if urlsplit(entry["url"]).path.endswith(XKLC_LIST_PATH) and entry["status"] == 200:
+            body = entry_body(entry)
+    if body is None:
+        raise SystemExit(f"磁带 {path} 中没有 xklc_list 响应")
+    return body
+
+
+def _legacy_parse(resp: requests.Response):
+    """旧实现：全文探测编码 + html.parser 解析整页"""
+    resp.encoding = resp.apparent_encoding
+    soup = BeautifulSoup(resp.text, "html.parser")
+    table = soup.find("table", class_="Nsb_r_list")
+    rows = table.find_all("tr")[1:]
+    return [_extract_xklc_row(row) for row in rows if row]
+
+
+def _fast_parse(resp: requests.Response):
+    """当前实现"""
+    resp.encoding = _resolve_encoding(resp)
+    return _parse_xklc_list(resp.text)
+
+
+def _timeit(func, body, content_type, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        # 每次使用新的响应对象，避免 text / encoding 缓存影响结果
+        result = func(_make_response(body, content_type))
+    return (time.perf_counter() - start) / number, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="选课轮次页面解析基准测试")
+    parser.add_argument("-n", "--number", type=int, default=200, help="每种实现的重复次数")
+    parser.add_argument("--cassette", help="使用磁带文件中录制的页面代替内置样例")
+    args = parser.parse_args(argv)
+
+    if args.cassette:
+        body = _load_from_cassette(args.cassette)
+    else:
+        with open(XKLC_LIST_HTML, "rb") as f:
+            body = f.read()
+
+    print(f"页面大小: {len(body)} 字节，解析器: {HTML_PARSER}")
+    legacy_time, legacy_rows = _timeit(_legacy_parse, body, "text/html", args.number)
+    for content_type in ("text/html;charset=UTF-8", "text/html"):
+        fast_time, fast_rows = _timeit(_fast_parse, body, content_type, args.number)
+        assert fast_rows == legacy_rows, "解析结果与旧实现不一致"
+        print(f"[{content_type}] 旧实现: {legacy_time * 1000:.3f} ms  "
+              f"当前实现: {fast_time * 1000:.3f} ms  加速比: {legacy_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
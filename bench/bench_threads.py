@@ -0,0 +1,306 @@
+"""
+线程扩展性基准测试
+
+测量CPU密集的工作（选课轮次页面解析、aaData解码、课程筛选、验证码预处理）在1、2、4、8个线程下的吞吐量，
+并与进程池比较，用于判断在当前解释器上是否值得把这些工作从进程池移到线程中：
+有GIL时纯Python的工作几乎不随线程数扩展，自由线程（禁用GIL）的解释器上应接近线性。
+
+--compare-gil 在自由线程构建上分别以PYTHON_GIL=0和PYTHON_GIL=1在子进程中运行，对比有无GIL的结果；
+--check-state 在多个线程中同时更新和读取Cookie、登录状态和全局识别器，检查共享状态是否保持一致。
+本项目目前无法安装到自由线程构建上（opencv-python只有abi3 wheel，见README），这两项尚未在3.13t上运行过。
+
+运行方式：
+    python -m bench.bench_threads [--workload 名称 ...] [--threads 1,2,4,8] [--processes]
+    python -m bench.bench_threads --compare-gil
+    python -m bench.bench_threads --check-state
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import sysconfig
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# 项目根目录
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+XKLC_LIST_HTML = os.path.join(os.path.dirname(__file__), "data", "xklc_list.html")
+DEFAULT_THREADS = (1, 2, 4, 8)
+# 筛选和解码任务每项的课程条数
+CHUNK_SIZE = 1000
+
+
+def gil_enabled() -> bool:
+    """当前进程是否启用了GIL"""
+    is_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_enabled is None else is_enabled()
+
+
+def free_threaded_build() -> bool:
+    """解释器是否为自由线程构建（可通过PYTHON_GIL=0禁用GIL）"""
+    return bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+
+
+# ---------------------------------------------------------------- 工作负载
+# 任务函数须在模块顶层定义，进程池才能序列化
+
+def _parse_task(html):
+    from session.course import _parse_xklc_list
+    return len(_parse_xklc_list(html))
+
+
+def _decode_task(payload):
+    return len(json.loads(payload).get("aaData") or [])
+
+
+def _filter_task(rows):
+    from get_class.filter import is_course_available, _summarize_course
+    return len([_summarize_course(row) for row in rows if is_course_available(row)])
+
+
+def _ocr_task(img):
+    from session.ocr import preprocess_image
+    return int(preprocess_image(img, method=3).sum())
+
+
+def _prepare_parse(count):
+    with open(XKLC_LIST_HTML, "rb") as f:
+        html = f.read().decode("utf-8")
+    return _parse_task, [html] * count
+
+
+def _chunks(count):
+    from bench.bench_filter import generate_catalog
+    rows = generate_catalog(count * CHUNK_SIZE)
+    return [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+
+
+def _prepare_decode(count):
+    payloads = [json.dumps({"iTotalRecords": CHUNK_SIZE, "aaData": chunk}, ensure_ascii=False)
+                for chunk in _chunks(count)]
+    return _decode_task, payloads
+
+
+def _prepare_filter(count):
+    return _filter_task, _chunks(count)
+
+
+def _prepare_ocr(count):
+    # 验证码预处理依赖cv2和NumPy，未安装时跳过
+    import numpy as np
+    import session.ocr  # noqa: F401
+
+    rng = np.random.default_rng(0)
+    return _ocr_task, [rng.integers(0, 256, size=(40, 120, 3), dtype=np.uint8) for _ in range(count)]
+
+
+# 工作负载名称 -> (prepare(任务数), 默认任务数)；prepare返回(任务函数, 任务列表)
+WORKLOADS = {
+    "parse": (_prepare_parse, 64),
+    "decode": (_prepare_decode, 32),
+    "filter": (_prepare_filter, 32),
+    "ocr_preprocess": (_prepare_ocr, 2000),
+}
+
+
+def _run(executor, fn, tasks):
+    start = time.perf_counter()
+    for _ in executor.map(fn, tasks):
+        pass
+    return time.perf_counter() - start
+
+
+def measure(fn, tasks, threads, repeat=3, processes=False) -> dict:
+    """
+    用指定数量的线程（或进程）处理全部任务，耗时取repeat次中最快的一次
+
+    执行器在计时前创建并预热，创建线程和进程的开销不计入
+    """
+    pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool_class(max_workers=threads) as executor:
+        list(executor.map(fn, tasks[:threads]))
+        best = min(_run(executor, fn, tasks) for _ in range(repeat))
+    return {"tasks_per_s": round(len(tasks) / best, 1), "seconds": round(best, 6)}
+
+
+def run_workloads(workloads, thread_counts, repeat=3, processes=False, scale=1.0) -> dict:
+    """返回{工作负载: {"threads": {线程数: 结果}, "processes": {进程数: 结果}}}，无法运行的工作负载记录跳过原因"""
+    results = {}
+    for name in workloads:
+        prepare, default_count = WORKLOADS[name]
+        try:
+            fn, tasks = prepare(max(1, int(default_count * scale)))
+        except ImportError as e:
+            results[name] = {"skipped": str(e)}
+            continue
+        # 筛选等函数可能打印统计信息，计时时丢弃
+        with contextlib.redirect_stdout(io.StringIO()):
+            by_threads = {str(n): measure(fn, tasks, n, repeat) for n in thread_counts}
+            by_processes = {str(n): measure(fn, tasks, n, repeat, processes=True)
+                            for n in thread_counts} if processes else {}
+        results[name] = {"threads": by_threads, "processes": by_processes}
+    return results
+
+
+def print_results(results: dict, label: str = ""):
+    print(f"{'工作负载':<16}{'执行器':<8}{'并行数':>6}{'吞吐量(项/秒)':>16}{'加速比':>10}{'效率':>8}  {label}")
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<16}跳过: {result['skipped']}")
+            continue
+        for kind in ("threads", "processes"):
+            by_count = result.get(kind) or {}
+            base = by_count.get("1", {}).get("tasks_per_s")
+            for count, measured in by_count.items():
+                speedup = measured["tasks_per_s"] / base if base else float("nan")
+                print(f"{name:<16}{'线程' if kind == 'threads' else '进程':<8}{count:>8}"
+                      f"{measured['tasks_per_s']:>18}{speedup:>11.2f}x{speedup / int(count):>9.0%}")
+
+
+def compare_gil(argv) -> dict:
+    """在子进程中分别以PYTHON_GIL=0和PYTHON_GIL=1运行，返回{"gil=0": 结果, "gil=1": 结果}"""
+    results = {}
+    for value in ("0", "1"):
+        env = dict(os.environ, PYTHON_GIL=value)
+        output = subprocess.run(
+            [sys.executable, "-m", "bench.bench_threads", *argv, "--json"],
+            cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results[f"gil={value}"] = json.loads(output)
+    return results
+
+
+# ---------------------------------------------------------------- 共享状态检查
+
+def check_shared_state(threads=8, iterations=2000) -> list:
+    """
+    在多个线程中同时更新和读取共享状态，返回发现的不一致
+
+    检查：
+        并发merge_cookies的每次更新都保留下来，版本号与更新次数一致，请求头缓存最终使用最新的Cookie；
+        并发set_login_status时每次状态变化恰好报告一次；
+        并发首次调用get_captcha_recognizer只创建一个实例（需要cv2）
+    """
+    import config
+    from session import session as session_module
+
+    problems = []
+    _, saved_cookies = config.get_cookies()
+    config.set_user_credentials(cookies={})
+    start_version = config.COOKIES_VERSION
+    barrier = threading.Barrier(threads)
+
+    def update_cookies(n):
+        barrier.wait()
+        for i in range(iterations):
+            config.merge_cookies({f"t{n}": str(i)})
+            session_module.get_headers("default")
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(update_cookies, range(threads)))
+    version, cookies = config.get_cookies()
+    expected = {f"t{n}": str(iterations - 1) for n in range(threads)}
+    if cookies != expected:
+        problems.append(f"Cookie合并丢失更新: {cookies}")
+    if version - start_version != threads * iterations:
+        problems.append(f"Cookie版本号 {version - start_version} != 更新次数 {threads * iterations}")
+    if session_module.get_headers("default").get("Cookie") != "; ".join(f"{k}={v}" for k, v in cookies.items()):
+        problems.append("请求头缓存中的Cookie不是最新的")
+    config.set_user_credentials(cookies=saved_cookies or {})
+
+    # 每一轮所有线程同时设置相同的状态，状态每轮翻转一次，应恰好有一个线程报告变化
+    rounds = iterations // 10
+    changes = []
+    session_module._reset_login_status()
+    barrier.reset()
+
+    def toggle_login(_):
+        for i in range(rounds):
+            barrier.wait()
+            if session_module.set_login_status(i % 2 == 0):
+                changes.append(i)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(toggle_login, range(threads)))
+    if sorted(changes) != list(range(rounds)):
+        problems.append(f"{rounds}次状态变化被报告了{len(changes)}次")
+    session_module._reset_login_status()
+
+    try:
+        from session import ocr
+    except ImportError as e:
+        print(f"跳过验证码识别器检查: {e}")
+    else:
+        created = []
+        original = ocr.CaptchaRecognizer
+
+        class CountingRecognizer:
+            def __init__(self, debug=False):
+                created.append(self)
+
+        ocr.CaptchaRecognizer, ocr._captcha_recognizer = CountingRecognizer, None
+        barrier.reset()
+        try:
+            def get_recognizer(_):
+                barrier.wait()
+                return ocr.get_captcha_recognizer()
+
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                instances = set(map(id, executor.map(get_recognizer, range(threads))))
+        finally:
+            ocr.CaptchaRecognizer, ocr._captcha_recognizer = original, None
+        if len(created) != 1 or len(instances) != 1:
+            problems.append(f"全局识别器被创建了{len(created)}次")
+    return problems
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(description="线程扩展性基准测试")
+    parser.add_argument("--workload", action="append", choices=sorted(WORKLOADS), help="只测量指定工作负载，可重复指定")
+    parser.add_argument("--threads", default=",".join(map(str, DEFAULT_THREADS)), help="线程数，逗号分隔")
+    parser.add_argument("-n", "--repeat", type=int, default=3, help="每项的重复次数，取最快一次")
+    parser.add_argument("--scale", type=float, default=1.0, help="任务数相对默认值的倍数")
+    parser.add_argument("--processes", action="store_true", help="同时测量相同数量的进程")
+    parser.add_argument("--compare-gil", action="store_true", help="在自由线程构建上对比有无GIL的结果")
+    parser.add_argument("--check-state", action="store_true", help="检查共享状态在并发访问下是否一致")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    args = parser.parse_args(argv)
+
+    if args.check_state:
+        print(f"Python {sys.version.split()[0]}  自由线程构建: {free_threaded_build()}  GIL: {gil_enabled()}")
+        problems = check_shared_state()
+        for message in problems:
+            print(f"不一致: {message}")
+        if problems:
+            return 1
+        print("共享状态一致")
+        return 0
+
+    if args.compare_gil:
+        if not free_threaded_build():
+            print("当前解释器不是自由线程构建，无法禁用GIL；请使用python3.13t等自由线程解释器运行"
+                  "（本项目的依赖目前不支持自由线程构建，见README）")
+            return 1
+        child_argv = [arg for arg in argv if arg != "--compare-gil"]
+        for label, results in compare_gil(child_argv).items():
+            print_results(results, label)
+            print()
+        return 0
+
+    thread_counts = [int(n) for n in args.threads.split(",") if n.strip()]
+    results = run_workloads(args.workload or list(WORKLOADS), thread_counts, args.repeat, args.processes, args.scale)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False))
+    else:
+        print(f"Python {sys.version.split()[0]}  自由线程构建: {free_threaded_build()}  GIL: {gil_enabled()}")
+        print_results(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""
+命令行入口
+
+    grakx login              登录并进入选课系统
+    grakx fetch              获取并筛选所有课程
+    grakx watch              定时刷新课程数据并输出剩余人数变化（--course/--teacher 定向监视）
+    grakx export PATH        流式导出课程目录为JSONL、CSV或二进制快照
+    grakx plan COURSE [...]  按心愿单规划无冲突课表
+    grakx schedule ID [...]  在选课轮次开放时刻提交选课
+    grakx serve              定期刷新课程目录，通过本地HTTP接口提供给其他客户端
+    grakx bench NAME [...]   运行基准测试（parse、importtime、filter）
+
+用户凭证可以通过参数传入，也可以通过环境变量 GRAKX_USERNAME、GRAKX_PASSWORD、GRAKX_JSESSIONID 设置。
+为了保证启动速度，各子命令用到的模块都在执行时才导入。
+性能分析可通过 --profile（或环境变量 GRAKX_PROFILE）开启，见profiling模块。
+HTTP请求可通过 --record/--replay（或环境变量 GRAKX_HTTP_RECORD/GRAKX_HTTP_REPLAY）录制和离线回放，见session.http模块。
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+# 基准测试名称 -> 模块
+BENCHMARKS = {
+    "parse": "bench.bench_parse",
+    "importtime": "bench.bench_import",
+    "filter": "bench.bench_filter",
+    "threads": "bench.bench_threads",
+}
+
+
+def _apply_credentials(args):
+    """根据命令行参数和环境变量设置用户凭证"""
+    from config import set_user_credentials
+
+    cookie = args.cookie or os.environ.get("GRAKX_JSESSIONID")
+    set_user_credentials(
+        username=args.username or os.environ.get("GRAKX_USERNAME"),
+        password=args.password or os.environ.get("GRAKX_PASSWORD"),
+        cookies={"JSESSIONID": cookie} if cookie else None
+    )
+
+
+def _ensure_login():
+    """未登录时登录并进入选课系统"""
+    from session import login_supervisor
+
+    login_supervisor.ensure_login()
+
+
+def cmd_login(args):
+    _ensure_login()
+    return 0
+
+
+def cmd_fetch(args):
+    from get_class import get_and_filter_all_courses
+
+    _ensure_login()
+    result = get_and_filter_all_courses()
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+def cmd_watch(args):
+    from get_class import get_class, SeatHistory, CourseWatcher
+
+    _ensure_login()
+    history = SeatHistory()
+    watcher = None
+    if args.course or args.teacher:
+        # 定向监视：每个目标只通过服务端筛选请求一小页数据
+        watcher = CourseWatcher(history=history)
+        for kcxx in args.course:
+            watcher.add(kcxx=kcxx)
+        for skls in args.teacher:
+            watcher.add(skls=skls)
+
+    try:
+        while True:
+            if watcher is not None:
+                changes = [change[:3] for change in watcher.poll_once()]
+            else:
+                changes = []
+                for future in get_class():
+                    try:
+                        rows = future.result()
+                    except Exception as e:
+                        # 只获取到部分页面时仍记录这些页面的剩余人数
+                        print(f"[{time.strftime('%H:%M:%S')}] 获取课程数据失败: {e}")
+                        rows = getattr(e, "rows", None) or []
+                    changes.extend(history.record(rows))
+            for jx0404id, old, new in changes:
+                if old is not None:
+                    print(f"[{time.strftime('%H:%M:%S')}] {jx0404id} 剩余人数 {old} -> {new}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("用户手动中断程序")
+    finally:
+        if args.export:
+            count = history.export(args.export)
+            print(f"已导出{count}条剩余人数记录到 {args.export}")
+    return 0
+
+
+def cmd_export(args):
+    from get_class.export import export_catalog
+
+    _ensure_login()
+    pipeline = None
+    if args.metrics:
+        from get_class.pipeline import catalog_pipeline
+        pipeline = catalog_pipeline(args.category or ("zy", "bx", "ts"), filtered=args.filtered)
+    count = export_catalog(args.path, categories=args.category or ("zy", "bx", "ts"),
+                           filtered=args.filtered, fmt=args.format, append=args.append,
+                           compress=True if args.gzip else None, pipeline=pipeline)
+    print(f"已导出{count}条课程数据到 {args.path}")
+    if pipeline is not None:
+        print(json.dumps(pipeline.metrics(), ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_plan(args):
+    from get_class import get_and_filter_all_courses, TimetablePlanner
+
+    _ensure_login()
+    planner = TimetablePlanner(args.courses, get_and_filter_all_courses(), max_credits=args.max_credits)
+    plans = planner.plan(limit=args.limit)
+    if not plans:
+        print("没有可行的无冲突方案")
+        return 1
+    for i, plan in enumerate(plans, 1):
+        print(f"方案{i}: {len(plan.sections)}门课程，{plan.credits:g}学分")
+        for section in plan.sections:
+            print(f"  {section.jx0404id}  {section.name}  {section.row.get('上课时间', '')}")
+    return 0
+
+
+def cmd_schedule(args):
+    import events
+    from scheduler import RoundScheduler, next_round
+    from session import select_xklc, enter_xsk_system
+    from get_class import get_thread_pool
+    from post_class import post_class
+
+    _ensure_login()
+    xklc = select_xklc(xk_name=args.round) if args.round else next_round()
+    if xklc is None:
+        print("没有找到尚未开放的选课轮次")
+        return 1
+
+    failures = []
+
+    def fire(_):
+        try:
+            enter_xsk_system(xklc.get("jx0502zbid"))
+            # 同时提交所有选课请求
+            futures = [get_thread_pool().submit(post_class, jx0404id) for jx0404id in args.course_ids]
+            for future in futures:
+                print(future.result())
+        finally:
+            events.DEFAULT_LOOP.stop()
+
+    def on_failed(error):
+        failures.append(error)
+        events.DEFAULT_LOOP.stop()
+
+    events.DEFAULT_LOOP.subscribe(events.ROUND_FAILED, on_failed)
+    if RoundScheduler(lead_time=args.lead).schedule(fire, xklc) is None:
+        return 1
+    events.DEFAULT_LOOP.run()
+    return 1 if failures else 0
+
+
+def cmd_serve(args):
+    import events
+    from api import CatalogState, start_server
+
+    _ensure_login()
+    state = CatalogState()
+    state.set_login_state(True)
+    server = start_server(state, args.host, args.port)
+    print(f"本地接口已启动: http://{args.host}:{server.server_port}/ （每{args.interval:g}秒刷新课程目录）")
+    state.start_polling(interval=args.interval)
+    try:
+        events.DEFAULT_LOOP.run()
+    finally:
+        state.broadcaster.close()
+        server.shutdown()
+    return 0
+
+
+def cmd_bench(args):
+    module = importlib.import_module(BENCHMARKS[args.name])
+    return module.main(args.bench_args) or 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="grakx", description="GrakX 自动抢课系统")
+    parser.add_argument("--username", help="用户名")
+    parser.add_argument("--password", help="密码")
+    parser.add_argument("--cookie", help="JSESSIONID")
+    parser.add_argument("--profile", help="开启性能分析：cpu、memory、threads（逗号分隔）或all")
+    parser.add_argument("--profile-dir", help="性能分析报告输出目录，默认为profiles")
+    parser.add_argument("--record", metavar="CASSETTE", help="将HTTP请求/响应录制到磁带文件（.jsonl.gz）")
+    parser.add_argument("--replay", metavar="CASSETTE", help="从磁带文件离线回放HTTP响应")
+    parser.add_argument("--replay-speed", choices=("original", "fast"),
+                        help="回放速度：original按录制时的响应耗时等待，fast立即返回（默认）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    login_parser = subparsers.add_parser("login", help="登录并进入选课系统")
+    login_parser.set_defaults(func=cmd_login)
+
+    fetch_parser = subparsers.add_parser("fetch", help="获取并筛选所有课程")
+    fetch_parser.add_argument("-o", "--output", help="输出JSON文件路径，默认输出到标准输出")
+    fetch_parser.set_defaults(func=cmd_fetch)
+
+    watch_parser = subparsers.add_parser("watch", help="定时刷新课程数据并输出剩余人数变化")
+    watch_parser.add_argument("--interval", type=float, default=60, help="刷新间隔，单位：秒")
+    watch_parser.add_argument("--export", help="退出时将剩余人数记录导出为CSV")
+    watch_parser.add_argument("--course", action="append", default=[],
+                              help="只监视该课程（名称或课程号，公共选修课），可重复指定")
+    watch_parser.add_argument("--teacher", action="append", default=[],
+                              help="只监视该教师的课程（公共选修课），可重复指定")
+    watch_parser.set_defaults(func=cmd_watch)
+
+    export_parser = subparsers.add_parser("export", help="流式导出课程目录为JSONL、CSV或二进制快照")
+    export_parser.add_argument("path", help="输出路径，.csv(.gz)导出CSV，.snap导出二进制快照，其他导出JSONL")
+    export_parser.add_argument("--category", action="append", choices=("zy", "bx", "ts"),
+                               help="只导出指定类别，可重复指定，默认全部")
+    export_parser.add_argument("--filtered", action="store_true", help="只导出筛选后的可选课程")
+    export_parser.add_argument("--format", choices=("jsonl", "csv", "snap"), help="导出格式，默认根据扩展名判断")
+    export_parser.add_argument("--append", action="store_true", help="追加到已有文件（定期快照）")
+    export_parser.add_argument("--gzip", action="store_true", help="使用gzip压缩")
+    export_parser.add_argument("--metrics", action="store_true", help="导出后输出流水线各阶段的指标")
+    export_parser.set_defaults(func=cmd_export)
+
+    plan_parser = subparsers.add_parser("plan", help="按心愿单规划无冲突课表")
+    plan_parser.add_argument("courses", nargs="+", help="按偏好排序的课程名称或课程号")
+    plan_parser.add_argument("--max-credits", type=float, help="学分上限")
+    plan_parser.add_argument("--limit", type=int, default=3, help="输出的方案数量")
+    plan_parser.set_defaults(func=cmd_plan)
+
+    schedule_parser = subparsers.add_parser("schedule", help="在选课轮次开放时刻提交选课")
+    schedule_parser.add_argument("course_ids", nargs="+", help="要提交的选课代码（jx0404id）")
+    schedule_parser.add_argument("--round", help="轮次名称（子串匹配），默认为尚未开放的最早轮次")
+    schedule_parser.add_argument("--lead", type=float, default=60, help="开放前多少秒开始预热")
+    schedule_parser.set_defaults(func=cmd_schedule)
+
+    serve_parser = subparsers.add_parser("serve", help="通过本地HTTP接口提供课程目录")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    serve_parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    serve_parser.add_argument("--interval", type=float, default=30, help="课程目录刷新间隔，单位：秒")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    bench_parser = subparsers.add_parser("bench", help="运行基准测试")
+    bench_parser.add_argument("name", choices=sorted(BENCHMARKS))
+    bench_parser.add_argument("bench_args", nargs=argparse.REMAINDER, help="传给基准测试的参数")
+    bench_parser.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.profile or args.profile_dir:
+        # 必须在导入被分析的模块之前设置
+        import profiling
+        profiling.configure(modes=args.profile, directory=args.profile_dir)
+    if args.record or args.replay or args.replay_speed:
+        from session import http
+        http.configure(record=args.record, replay=args.replay, speed=args.replay_speed)
+    _apply_credentials(args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,29 @@
 """
 配置文件
+
+凭证在多个线程（界面、监视器、提交循环、API服务）间共享，写入和读取Cookie须通过本模块的函数，
+在自由线程（禁用GIL）的解释器上也能看到一致的Cookie和版本号。
 """
+import os
+import threading
 
 BASE_URL = 'http://jwxt.gdufe.edu.cn/jsxsd/'
 
+# 本地缓存目录（选课轮次等持久化数据）
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+# 教务系统服务器所在时区，选课轮次的开始/结束时间按该时区解析（与本机时区无关）
+SERVER_TIMEZONE = 'Asia/Shanghai'
+
 USERNAME = None
 PASSWORD = None
+# 当前Cookie字典，更新时整体替换，不原地修改
 COOKIES = None
+# Cookie版本号，每次通过set_user_credentials更新Cookie时递增，
+# 请求头缓存据此判断是否需要重建Cookie字符串
+COOKIES_VERSION = 0
+# 保护上述凭证的读-改-写
+_CREDENTIALS_LOCK = threading.Lock()
 
 
 def set_user_credentials(username=None, password=None, cookies=None):
@@ -17,13 +34,45 @@ def set_user_credentials(username=None, password=None, cookies=None):
     :param password: 密码，如果为None则不更新
     :param cookies: Cookie字典，如果为None则不更新
     """
-    global USERNAME, PASSWORD, COOKIES
+    global USERNAME, PASSWORD, COOKIES, COOKIES_VERSION
+
+    with _CREDENTIALS_LOCK:
+        if username is not None:
+            USERNAME = username
 
-    if username is not None:
-        USERNAME = username
+        if password is not None:
+            PASSWORD = password
+
+        if cookies is not None:
+            COOKIES = dict(cookies)
+            COOKIES_VERSION += 1
+
+
+def merge_cookies(cookies):
+    """
+    将Cookie合并到当前Cookie中，有变化时递增版本号
 
-    if password is not None:
-        PASSWORD = password
+    与先读取COOKIES再调用set_user_credentials不同，并发合并不会互相覆盖
 
-    if cookies is not None:
-        COOKIES = cookies
+    :param cookies: 要合并的Cookie字典
+    :return: 是否有变化
+    """
+    global COOKIES, COOKIES_VERSION
+
+    with _CREDENTIALS_LOCK:
+        current = COOKIES or {}
+        if all(current.get(k) == v for k, v in cookies.items()):
+            return False
+        COOKIES = {**current, **cookies}
+        COOKIES_VERSION += 1
+        return True
+
+
+def get_cookies():
+    """
+    返回(Cookie版本号, Cookie字典)，二者属于同一次更新
+
+    :return: 版本号和Cookie字典（调用方不应修改），没有Cookie时字典为None
+    """
+    with _CREDENTIALS_LOCK:
+        return COOKIES_VERSION, COOKIES
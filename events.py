@@ -0,0 +1,162 @@
+"""
+事件循环模块
+
+基于条件变量实现的轻量事件循环：支持定时器和按主题发布/订阅事件。
+循环线程在没有到期定时器和待处理事件时阻塞等待，不占用CPU；
+任意线程发布事件或添加定时器都会立即唤醒循环。
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import defaultdict, deque
+
+# 事件主题
+LOGIN_STATE = "login_state"        # 登录状态变化，payload为bool
+CATALOG_DIFF = "catalog_diff"      # 课程数据变化，payload为[(jx0404id, 原剩余人数, 新剩余人数), ...]
+SHUTDOWN = "shutdown"              # 事件循环即将退出
+ROUND_OPEN = "round_open"          # 选课轮次在校正后的开放时刻开放，payload为轮次信息
+ROUND_FAILED = "round_failed"      # 轮次调度异常终止、未能在开放时刻触发，payload为异常
+ENROLLMENT = "enrollment"          # 选课提交完成，payload为post_class的返回值
+
+# 单次等待的最长时间（秒）。事件和定时器都会立即唤醒循环，该上限不影响响应时间，
+# 只是为了让Windows下无超时的锁等待也能及时响应Ctrl+C
+_MAX_WAIT = 1.0
+
+
+class Timer:
+    """定时器句柄，可通过EventLoop.cancel取消"""
+
+    __slots__ = ("due", "interval", "callback", "args", "cancelled")
+
+    def __init__(self, due, interval, callback, args):
+        self.due = due
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class EventLoop:
+    """定时器 + 发布/订阅事件循环"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._timers = []
+        self._seq = itertools.count()
+        self._events = deque()
+        self._handlers = defaultdict(list)
+        self._running = False
+
+    # ---------------------------------------------------------------- 订阅
+
+    def subscribe(self, topic, handler):
+        """订阅主题，handler(payload)在循环线程中执行"""
+        with self._cond:
+            self._handlers[topic].append(handler)
+
+    def unsubscribe(self, topic, handler):
+        with self._cond:
+            if handler in self._handlers.get(topic, ()):
+                self._handlers[topic].remove(handler)
+
+    def publish(self, topic, payload=None):
+        """发布事件，可在任意线程调用；没有订阅者的事件直接丢弃"""
+        with self._cond:
+            if not self._handlers.get(topic):
+                return
+            self._events.append((topic, payload))
+            self._cond.notify()
+
+    # ---------------------------------------------------------------- 定时器
+
+    def call_later(self, delay, callback, *args):
+        """delay秒后在循环线程中执行callback(*args)"""
+        return self._add_timer(Timer(time.monotonic() + delay, None, callback, args))
+
+    def call_every(self, interval, callback, *args, first_delay=0):
+        """每隔interval秒执行一次callback(*args)，首次在first_delay秒后执行"""
+        return self._add_timer(Timer(time.monotonic() + first_delay, interval, callback, args))
+
+    def cancel(self, timer):
+        with self._cond:
+            timer.cancelled = True
+            self._cond.notify()
+
+    def _add_timer(self, timer):
+        with self._cond:
+            heapq.heappush(self._timers, (timer.due, next(self._seq), timer))
+            self._cond.notify()
+        return timer
+
+    # ---------------------------------------------------------------- 运行
+
+    def _next_batch(self):
+        """阻塞直到有事件或定时器到期，返回待执行的(callback, args)列表；循环停止时返回None"""
+        with self._cond:
+            while self._running:
+                batch = []
+                while self._events:
+                    topic, payload = self._events.popleft()
+                    batch.extend((handler, (payload,)) for handler in list(self._handlers.get(topic, ())))
+
+                now = time.monotonic()
+                while self._timers and (self._timers[0][2].cancelled or self._timers[0][0] <= now):
+                    _, _, timer = heapq.heappop(self._timers)
+                    if timer.cancelled:
+                        continue
+                    batch.append((timer.callback, timer.args))
+                    if timer.interval is not None:
+                        timer.due = now + timer.interval
+                        heapq.heappush(self._timers, (timer.due, next(self._seq), timer))
+
+                if batch:
+                    return batch
+                timeout = self._timers[0][0] - now if self._timers else _MAX_WAIT
+                self._cond.wait(min(timeout, _MAX_WAIT))
+            return None
+
+    def run(self):
+        """在当前线程运行事件循环，直到stop()被调用或收到Ctrl+C"""
+        with self._cond:
+            self._running = True
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    break
+                for callback, args in batch:
+                    try:
+                        callback(*args)
+                    except Exception as e:
+                        print(f"事件处理出错 ({getattr(callback, '__name__', callback)}): {e}")
+        except KeyboardInterrupt:
+            print("用户手动中断程序")
+        finally:
+            with self._cond:
+                self._running = False
+                handlers = list(self._handlers.get(SHUTDOWN, ()))
+            for handler in handlers:
+                try:
+                    handler(None)
+                except Exception as e:
+                    print(f"退出处理出错: {e}")
+
+    def stop(self):
+        """停止事件循环，可在任意线程调用"""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    @property
+    def running(self):
+        return self._running
+
+
+# 全局默认事件循环
+DEFAULT_LOOP = EventLoop()
+
+
+def publish(topic, payload=None):
+    """向默认事件循环发布事件"""
+    DEFAULT_LOOP.publish(topic, payload)
@@ -1,33 +1,119 @@
 """
 获取课程模块
+
+各子模块在首次访问对应属性时才会导入，线程池在首次提交任务时才会创建。
 """
-from .xsxk import get_ggxxkxk_data, get_xxkxk_data, get_xxxkxk_data, GLOBAL_THREAD_POOL
-from .filter import filter_zy_courses, filter_bx_courses, filter_ts_courses, filter_all_courses
+import importlib
+from functools import partial
+import profiling
+
+# 属性名 -> 所在子模块，首次访问时导入
+_LAZY_ATTRS = {
+    "get_ggxxkxk_data": ".xsxk",
+    "get_xxkxk_data": ".xsxk",
+    "get_xxxkxk_data": ".xsxk",
+    "get_thread_pool": ".xsxk",
+    "build_ggxxkxk_url": ".xsxk",
+    "query_ggxxkxk_page": ".xsxk",
+    "GLOBAL_THREAD_POOL": ".xsxk",
+    "PAGE_LIMITER": ".xsxk",
+    "get_fetch_metrics": ".xsxk",
+    "CATALOG_FLIGHTS": ".xsxk",
+    "CatalogFetchError": ".xsxk",
+    "SingleFlight": ".singleflight",
+    "AIMDLimiter": ".limiter",
+    "filter_zy_courses": ".filter",
+    "filter_bx_courses": ".filter",
+    "filter_ts_courses": ".filter",
+    "filter_all_courses": ".filter",
+    "filter_store_courses": ".filter",
+    "CATEGORY_LABELS": ".filter",
+    "is_course_available": ".filter",
+    "parse_sksj": ".sksj",
+    "TimeSlot": ".sksj",
+    "CourseIndex": ".index",
+    "CatalogStore": ".store",
+    "SeatHistory": ".seats",
+    "WatchTarget": ".watch",
+    "CourseWatcher": ".watch",
+    "iter_catalog": ".export",
+    "export_catalog": ".export",
+    "write_jsonl": ".export",
+    "write_csv": ".export",
+    "TimetablePlanner": ".planner",
+    "Wish": ".planner",
+    "Plan": ".planner",
+    "sksj_mask": ".planner",
+    "Catalog": ".catalog",
+    "Snapshot": ".snapshot",
+    "Pipeline": ".pipeline",
+    "Stage": ".pipeline",
+    "catalog_pipeline": ".pipeline",
+    "write_snapshot": ".snapshot",
+    "CatalogEntry": ".catalog",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
 
 
-def get_class():
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
+
+def get_class(max_age=None):
     """
     并行获取三种课程数据
-    
+
+    与其他调用方（界面、监视器等）同时发起的相同获取会合并为一次
+
+    Args:
+        max_age: 可接受的数据年龄（秒），响应缓存中该时间内获取的类别直接复用，默认总是重新获取
+
     Returns:
         包含三种课程数据的future对象元组，格式为(公共选修future, 学科基础/专业必修future, 专业选修future)
     """
+    from .xsxk import get_ggxxkxk_data, get_xxkxk_data, get_xxxkxk_data, get_thread_pool
+
     # 使用全局线程池并行获取三种课程数据
-    future1 = GLOBAL_THREAD_POOL.submit(get_ggxxkxk_data, verbose=False)
-    future2 = GLOBAL_THREAD_POOL.submit(get_xxkxk_data, verbose=False)
-    future3 = GLOBAL_THREAD_POOL.submit(get_xxxkxk_data, verbose=False)
+    pool = get_thread_pool()
+    future1 = pool.submit(get_ggxxkxk_data, verbose=False, max_age=max_age)
+    future2 = pool.submit(get_xxkxk_data, verbose=False, max_age=max_age)
+    future3 = pool.submit(get_xxxkxk_data, verbose=False, max_age=max_age)
     return future1, future2, future3
 
 
-def get_and_filter_all_courses():
+def _record_seats(history, future):
+    """课程数据获取完成后写入剩余人数时间序列；只获取到部分页面时记录这些页面"""
+    error = future.exception()
+    history.record(future.result() if error is None else getattr(error, "rows", None) or [])
+
+
+@profiling.profiled("catalog_refresh", memory=True)
+def get_and_filter_all_courses(history=None, max_age=None):
     """
     并行获取并筛选所有课程数据
-    
+
+    Args:
+        history: 可选，SeatHistory实例，每次获取到的课程数据会记录到其中
+        max_age: 可接受的数据年龄（秒），见get_class
+
     Returns:
         包含所有类型筛选后课程的字典
     """
+    from .filter import filter_all_courses
+
     # 并行获取所有课程数据
-    futures = get_class()
+    futures = get_class(max_age=max_age)
+    if history is not None:
+        for future in futures:
+            future.add_done_callback(partial(_record_seats, history))
     # 使用获取的数据进行筛选
     return filter_all_courses(futures)
 
@@ -35,11 +121,45 @@ __all__ = [
     "get_ggxxkxk_data",
     "get_xxkxk_data",
     "get_xxxkxk_data",
+    "get_thread_pool",
+    "build_ggxxkxk_url",
+    "query_ggxxkxk_page",
     "GLOBAL_THREAD_POOL",
+    "PAGE_LIMITER",
+    "get_fetch_metrics",
+    "CATALOG_FLIGHTS",
+    "CatalogFetchError",
+    "SingleFlight",
+    "AIMDLimiter",
     "get_class",
     "get_and_filter_all_courses",
     "filter_zy_courses",
     "filter_bx_courses",
     "filter_ts_courses",
-    "filter_all_courses"
+    "filter_all_courses",
+    "filter_store_courses",
+    "CATEGORY_LABELS",
+    "is_course_available",
+    "parse_sksj",
+    "TimeSlot",
+    "CourseIndex",
+    "CatalogStore",
+    "SeatHistory",
+    "WatchTarget",
+    "CourseWatcher",
+    "iter_catalog",
+    "export_catalog",
+    "write_jsonl",
+    "write_csv",
+    "TimetablePlanner",
+    "Wish",
+    "Plan",
+    "sksj_mask",
+    "Catalog",
+    "CatalogEntry",
+    "Snapshot",
+    "write_snapshot",
+    "Pipeline",
+    "Stage",
+    "catalog_pipeline"
 ]
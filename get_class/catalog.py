@@ -0,0 +1,177 @@
+"""
+此模块实现统一的课程目录：
+三个类别的课程数据合并为一个目录，每条课程带有类别标记并按选课代码（jx0404id）去重，
+所有筛选在一次遍历中完成；某个类别获取失败时保留其他类别的结果。
+"""
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .filter import CATEGORY_LABELS, is_course_available, _summarize_course, _filter_unseen_courses
+
+# get_class()返回的future元组中各元素对应的类别
+FUTURE_CATEGORIES = ("ts", "bx", "zy")
+
+
+class CatalogEntry(NamedTuple):
+    """目录中的一条课程"""
+    category: str       # 课程类别代码，见CATEGORY_LABELS
+    row: dict           # 接口返回的原始课程数据
+
+
+class Catalog:
+    """合并三个类别的课程目录"""
+
+    def __init__(self):
+        # 类别 -> 去重后的原始课程数据，按加入顺序排列
+        self._rows: Dict[str, List[dict]] = {}
+        # jx0404id -> (类别, 原始课程数据)
+        self._index: Dict[str, tuple] = {}
+        # 类别 -> 接口返回的总条数（去重前）
+        self.totals: Dict[str, int] = {}
+        # 类别 -> 获取失败（或只获取到部分页面）的第一个异常
+        self.errors: Dict[str, BaseException] = {}
+        # 类别 -> 该类别每一处失败的(阶段名称, 页码, 异常)，页码未知时为None
+        self.page_errors: Dict[str, List[tuple]] = {}
+        # 因重复而被丢弃的条数
+        self.duplicates = 0
+
+    @classmethod
+    def from_futures(cls, futures) -> "Catalog":
+        """
+        从get_class()返回的future元组构建目录，某个类别获取失败时记录错误并保留其他类别
+
+        Args:
+            futures: (公共选修future, 学科基础/专业必修future, 专业选修future)
+        """
+        catalog = cls()
+        for category, future in zip(FUTURE_CATEGORIES, futures):
+            try:
+                rows = future.result()
+            except Exception as e:
+                print(f"获取{CATEGORY_LABELS[category]}数据时发生错误: {e}")
+                catalog.errors[category] = e
+                # 只获取到部分页面时（CatalogFetchError）记录每一处失败；不完整的数据不加入目录
+                catalog.page_errors[category] = list(getattr(e, "errors", None) or [(None, None, e)])
+                continue
+            catalog.add(category, rows)
+        return catalog
+
+    @classmethod
+    def from_pipeline(cls, pipeline=None) -> "Catalog":
+        """
+        通过获取→解析流水线构建目录，逐页加入
+
+        任一页面获取或解析失败时，该类别记入errors（数据不完整），每一处失败记入page_errors；
+        数据源本身失败（无法确定类别）时记入所有尚未取得数据的类别
+
+        Args:
+            pipeline: 可选，不带sink、未筛选的catalog_pipeline，默认获取全部类别
+        """
+        from .pipeline import catalog_pipeline
+
+        catalog = cls()
+        if pipeline is None:
+            pipeline = catalog_pipeline()
+        for category, rows in pipeline.results():
+            catalog.add(category, rows)
+        for stage_name, item, error in pipeline.errors:
+            if item is not None:
+                # 获取和解析阶段的输入为(类别, 页码, 响应体)，之后的阶段为(类别, 课程列表)
+                categories = [(item[0], item[1] if stage_name in ("fetch", "parse") else None)]
+            else:
+                categories = [(category, None) for category in CATEGORY_LABELS if category not in catalog._rows]
+            for category, page_num in categories:
+                catalog.errors.setdefault(category, error)
+                catalog.page_errors.setdefault(category, []).append((stage_name, page_num, error))
+        return catalog
+
+    def __len__(self):
+        return sum(len(rows) for rows in self._rows.values())
+
+    def __iter__(self) -> Iterator[CatalogEntry]:
+        for category, rows in self._rows.items():
+            for row in rows:
+                yield CatalogEntry(category, row)
+
+    def __contains__(self, jx0404id):
+        return jx0404id in self._index
+
+    def get(self, jx0404id: str) -> Optional[CatalogEntry]:
+        entry = self._index.get(jx0404id)
+        return CatalogEntry(*entry) if entry is not None else None
+
+    def add(self, category: str, rows: Iterable[dict]):
+        """
+        加入某个类别的课程数据
+
+        同一选课代码已存在时保留先加入的一条（没有选课代码的课程无法去重，直接保留）
+        """
+        index = self._index
+        kept = self._rows.setdefault(category, [])
+        total = 0
+        for row in rows:
+            total += 1
+            jx0404id = row.get("jx0404id")
+            if jx0404id:
+                if jx0404id in index:
+                    self.duplicates += 1
+                    continue
+                index[jx0404id] = (category, row)
+            kept.append(row)
+        self.totals[category] = self.totals.get(category, 0) + total
+
+    def rows(self, category: Optional[str] = None) -> List[dict]:
+        """返回（某个类别的）原始课程数据"""
+        if category is not None:
+            return list(self._rows.get(category, ()))
+        return [row for rows in self._rows.values() for row in rows]
+
+    def filtered(self, verbose: bool = True) -> Dict[str, List[dict]]:
+        """
+        一次遍历筛选所有类别的可选课程
+
+        Returns:
+            {类别名称: 筛选后的课程列表}，与filter_all_courses的返回值格式相同；获取失败的类别为空列表
+        """
+        buckets = {category: [] for category in CATEGORY_LABELS}
+        for category, rows in self._rows.items():
+            buckets[category].extend(_summarize_course(row) for row in rows if is_course_available(row))
+        return _labelled(buckets, self.totals, self.errors, verbose)
+
+
+def _labelled(buckets, totals, errors, verbose) -> Dict[str, List[dict]]:
+    """打印各类别的统计信息，并将{类别代码: 课程列表}转换为{类别名称: 课程列表}"""
+    if verbose:
+        for category, label in CATEGORY_LABELS.items():
+            if category in errors:
+                print(f"{label}课程: 获取失败")
+            else:
+                print(f"{label}课程: 总条数({totals.get(category, 0)}) 可用条数({len(buckets[category])})")
+    return {CATEGORY_LABELS[category]: courses for category, courses in buckets.items()}
+
+
+def filter_futures(futures, verbose: bool = True) -> Dict[str, List[dict]]:
+    """
+    从get_class()返回的future元组直接筛选可选课程，结果与Catalog.from_futures(futures).filtered()相同
+
+    在取得每个类别的数据时一次遍历完成去重和筛选，只记录已出现的选课代码，不保存原始课程数据和索引
+
+    Args:
+        futures: (公共选修future, 学科基础/专业必修future, 专业选修future)
+        verbose: 是否打印各类别的统计信息
+
+    Returns:
+        {类别名称: 筛选后的课程列表}，获取失败的类别为空列表
+    """
+    buckets = {category: [] for category in CATEGORY_LABELS}
+    totals = {}
+    errors = {}
+    seen = set()
+    for category, future in zip(FUTURE_CATEGORIES, futures):
+        try:
+            rows = future.result()
+        except Exception as e:
+            print(f"获取{CATEGORY_LABELS[category]}数据时发生错误: {e}")
+            errors[category] = e
+            continue
+        totals[category] = _filter_unseen_courses(rows, seen, buckets[category])
+    return _labelled(buckets, totals, errors, verbose)
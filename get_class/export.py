@@ -0,0 +1,148 @@
+"""
+此模块用于将课程目录流式导出为JSONL或CSV文件，
+数据从逐页获取的迭代器中逐条写出，内存占用与课程总数无关。
+支持gzip压缩、写入临时文件后原子替换，以及用于定期快照的追加模式。
+也可以导出为可通过mmap直接读取的二进制快照（.snap，见snapshot模块）。
+"""
+import csv
+import gzip
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterable, Optional, Sequence
+
+from .filter import CATEGORY_LABELS
+from .pipeline import catalog_pipeline
+
+# 原始课程数据导出为CSV时的列
+RAW_FIELDS = (
+    "category", "snapshot_at", "jx0404id", "kch", "kcmc", "xf", "skls", "xqid", "sksj",
+    "skdd", "xxrs", "xkrs", "czrs", "syrs", "bj", "ctsm", "szkcflmc",
+)
+# 筛选后课程数据导出为CSV时的列
+FILTERED_FIELDS = (
+    "category", "snapshot_at", "选课代码", "学分", "上课老师", "上课教室", "上课时间",
+    "科目名称", "冲突情况", "剩余人数",
+)
+
+
+def _detect_format(path: str) -> str:
+    if path.endswith(".snap"):
+        return "snap"
+    name = path[:-3] if path.endswith(".gz") else path
+    return "csv" if name.endswith(".csv") else "jsonl"
+
+
+@contextmanager
+def open_output(path: str, append: bool = False, compress: Optional[bool] = None):
+    """
+    打开导出文件
+
+    Args:
+        path: 文件路径
+        append: 追加模式，直接在原文件末尾写入；否则写入临时文件，成功后原子替换原文件
+        compress: 是否gzip压缩，默认根据扩展名.gz判断
+
+    Yields:
+        文本文件对象
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    target = path if append else f"{path}.{os.getpid()}.tmp"
+    mode = "at" if append else "wt"
+    if compress:
+        f = gzip.open(target, mode, encoding="utf-8", newline="")
+    else:
+        f = open(target, mode, encoding="utf-8", newline="")
+    try:
+        with f:
+            yield f
+    except BaseException:
+        if not append:
+            os.remove(target)
+        raise
+    if not append:
+        os.replace(target, path)
+
+
+def write_jsonl(rows: Iterable[dict], path: str, append: bool = False,
+                compress: Optional[bool] = None) -> int:
+    """逐条写出为JSONL，返回写出的条数"""
+    count = 0
+    with open_output(path, append=append, compress=compress) as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def write_csv(rows: Iterable[dict], path: str, fields: Sequence[str] = RAW_FIELDS,
+              append: bool = False, compress: Optional[bool] = None) -> int:
+    """逐条写出为CSV（未列出的字段忽略），追加到已有文件时不重复写表头，返回写出的条数"""
+    write_header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+    count = 0
+    with open_output(path, append=append, compress=compress) as f:
+        writer = csv.DictWriter(f, fieldnames=list(fields), extrasaction="ignore")
+        if write_header:
+            writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def iter_catalog(categories: Sequence[str] = tuple(CATEGORY_LABELS), filtered: bool = False,
+                 snapshot_at: Optional[float] = None, window: int = 8, pipeline=None):
+    """
+    逐条产出课程数据，每条附带category和snapshot_at字段
+
+    数据经由获取→解析→筛选流水线产出（各类别的页面交错），调用方写得慢时获取随之暂停
+
+    Args:
+        categories: 要获取的课程类别代码
+        filtered: 为True时只产出可选课程的重要信息（与filter_*_courses相同）
+        snapshot_at: 快照时间戳，默认为当前时间
+        window: 同时在途的最大页面数，也是各阶段之间队列的容量
+        pipeline: 可选，已创建的catalog_pipeline（不带sink），用于在导出后读取各阶段指标；
+                  提供时忽略categories、filtered和window
+    """
+    snapshot_at = time.time() if snapshot_at is None else snapshot_at
+    if pipeline is None:
+        pipeline = catalog_pipeline(categories, filtered=filtered, fetch_workers=window, queue_size=window)
+    for category, courses in pipeline.results():
+        for course in courses:
+            yield {"category": category, "snapshot_at": snapshot_at, **course}
+
+
+def export_catalog(path: str, categories: Sequence[str] = tuple(CATEGORY_LABELS),
+                   filtered: bool = False, fmt: Optional[str] = None, append: bool = False,
+                   compress: Optional[bool] = None, pipeline=None) -> int:
+    """
+    获取课程目录并流式导出到文件
+
+    Args:
+        path: 输出路径，扩展名为.csv(.gz)时默认导出CSV，为.snap时导出二进制快照，否则为JSONL
+        categories: 要导出的课程类别代码
+        filtered: 是否只导出筛选后的可选课程（二进制快照只保存原始数据，不支持）
+        fmt: 导出格式，"jsonl"、"csv"或"snap"，默认根据扩展名判断
+        append: 追加模式，用于定期快照
+        compress: 是否gzip压缩，默认根据扩展名.gz判断
+        pipeline: 可选，已创建的catalog_pipeline，见iter_catalog
+
+    Returns:
+        int: 导出的条数
+    """
+    fmt = fmt or _detect_format(path)
+    if fmt == "snap":
+        if filtered or append or compress:
+            raise ValueError("二进制快照不支持filtered、append和compress选项")
+        from .snapshot import write_snapshot
+        return write_snapshot(iter_catalog(categories, pipeline=pipeline), path)
+    rows = iter_catalog(categories, filtered=filtered, pipeline=pipeline)
+    if fmt == "csv":
+        fields = FILTERED_FIELDS if filtered else RAW_FIELDS
+        return write_csv(rows, path, fields=fields, append=append, compress=compress)
+    return write_jsonl(rows, path, append=append, compress=compress)
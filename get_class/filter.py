@@ -5,51 +5,69 @@
 """
 from .xsxk import get_ggxxkxk_data, get_xxkxk_data, get_xxxkxk_data
 
-
-def filter_zy_courses(courses_data=None):
-    """筛选专业选修课程的重要信息
-
-    Args:
-        courses_data: 可选，已获取的专业选修课程数据，如果为None则自动获取
-
-    Returns:
-        筛选后的专业选修课程列表
+# 课程类别代码及对应名称
+CATEGORY_LABELS = {
+    "zy": "专业选修课",
+    "bx": "学科基础专业必修课",
+    "ts": "公共选修课",
+}
+
+
+def is_course_available(course):
+    """判断课程是否可选：冲突情况为空，且剩余人数不是0也不是负数"""
+    if course.get("ctsm", "") != "":
+        return False
+    remaining_slots = course.get("syrs", "")
+    try:
+        return int(remaining_slots) > 0
+    except (ValueError, TypeError):
+        # 无法转换为整数时，只排除"0"或以"-"开头的字符串
+        return not (remaining_slots == "0" or (isinstance(remaining_slots, str) and remaining_slots.startswith('-')))
+
+
+def _summarize_course(course):
+    """提取课程的重要信息"""
+    return {
+        "选课代码": course.get("jx0404id", ""),
+        "学分": course.get("xf", ""),
+        "上课老师": course.get("skls", ""),
+        "上课教室": course.get("skdd", ""),
+        "上课时间": course.get("sksj", ""),
+        "科目名称": course.get("kcmc", ""),
+        "冲突情况": course.get("ctsm", ""),
+        "剩余人数": course.get("syrs", "")
+    }
+
+
+def _filter_unseen_courses(courses_data, seen, filtered_courses):
     """
-    # 如果没有提供数据，则调用数据获取函数
-    if courses_data is None:
-        courses_data = get_xxxkxk_data(verbose=False)
-
-    filtered_courses = []
-    total_count = len(courses_data)
+    筛选未出现过的课程，将可选课程的重要信息加入filtered_courses，返回总条数
 
+    选课代码记入seen，已在seen中的课程跳过（同一批和之前各批中的重复）；
+    条件和提取的字段与is_course_available、_summarize_course相同，内联以省去每条课程两次函数调用
+    """
+    remember = seen.add
+    keep = filtered_courses.append
+    total = 0
     for course in courses_data:
-        # 检查冲突情况和剩余人数，任一条件满足则跳过该课程
+        total += 1
+        jx0404id = course.get("jx0404id")
+        if jx0404id:
+            if jx0404id in seen:
+                continue
+            remember(jx0404id)
         conflict_status = course.get("ctsm", "")
-        remaining_slots = course.get("syrs", "")
-
-        # 筛选条件：只有同时满足以下两个条件才保留课程
-        # 条件一：冲突情况为空字符串
-        # 条件二：剩余人数不是0且不是负数
-        skip = False
         if conflict_status != "":
-            skip = True
-        else:
-            # 检查剩余人数是否为0或负数
-            try:
-                # 尝试将剩余人数转换为整数进行比较
-                slots_num = int(remaining_slots)
-                if slots_num <= 0:
-                    skip = True
-            except (ValueError, TypeError):
-                # 如果无法转换为整数，检查字符串是否为"0"或表示负数的字符串
-                if remaining_slots == "0" or (isinstance(remaining_slots, str) and remaining_slots.startswith('-')):
-                    skip = True
-        
-        if skip:
             continue
-
-        filtered_course = {
-            "选课代码": course.get("jx0404id", ""),  # 最重要的字段
+        remaining_slots = course.get("syrs", "")
+        try:
+            if int(remaining_slots) <= 0:
+                continue
+        except (ValueError, TypeError):
+            if remaining_slots == "0" or (isinstance(remaining_slots, str) and remaining_slots.startswith('-')):
+                continue
+        keep({
+            "选课代码": jx0404id or "",
             "学分": course.get("xf", ""),
             "上课老师": course.get("skls", ""),
             "上课教室": course.get("skdd", ""),
@@ -57,15 +75,32 @@ def filter_zy_courses(courses_data=None):
             "科目名称": course.get("kcmc", ""),
             "冲突情况": conflict_status,
             "剩余人数": remaining_slots
-        }
-        filtered_courses.append(filtered_course)
-    
-    available_count = len(filtered_courses)
-    print(f"专业选修课课程: 总条数({total_count}) 可用条数({available_count})")
+        })
+    return total
 
+
+def _filter_courses(courses_data, category):
+    """筛选单个类别课程的重要信息（冲突情况为空且剩余人数大于0）"""
+    filtered_courses = [_summarize_course(course) for course in courses_data if is_course_available(course)]
+    print(f"{CATEGORY_LABELS[category]}课程: 总条数({len(courses_data)}) 可用条数({len(filtered_courses)})")
     return filtered_courses
 
 
+def filter_zy_courses(courses_data=None):
+    """筛选专业选修课程的重要信息
+
+    Args:
+        courses_data: 可选，已获取的专业选修课程数据，如果为None则自动获取
+
+    Returns:
+        筛选后的专业选修课程列表
+    """
+    # 如果没有提供数据，则调用数据获取函数
+    if courses_data is None:
+        courses_data = get_xxxkxk_data(verbose=False)
+    return _filter_courses(courses_data, "zy")
+
+
 def filter_bx_courses(courses_data=None):
     """筛选学科基础/专业必修课程的重要信息
 
@@ -78,52 +113,7 @@ def filter_bx_courses(courses_data=None):
     # 如果没有提供数据，则调用数据获取函数
     if courses_data is None:
         courses_data = get_xxkxk_data(verbose=False)
-
-    filtered_courses = []
-    total_count = len(courses_data)
-
-    for course in courses_data:
-        # 检查冲突情况和剩余人数，任一条件满足则跳过该课程
-        conflict_status = course.get("ctsm", "")
-        remaining_slots = course.get("syrs", "")
-
-        # 筛选条件：只有同时满足以下两个条件才保留课程
-        # 条件一：冲突情况为空字符串
-        # 条件二：剩余人数不是0且不是负数
-        skip = False
-        if conflict_status != "":
-            skip = True
-        else:
-            # 检查剩余人数是否为0或负数
-            try:
-                # 尝试将剩余人数转换为整数进行比较
-                slots_num = int(remaining_slots)
-                if slots_num <= 0:
-                    skip = True
-            except (ValueError, TypeError):
-                # 如果无法转换为整数，检查字符串是否为"0"或表示负数的字符串
-                if remaining_slots == "0" or (isinstance(remaining_slots, str) and remaining_slots.startswith('-')):
-                    skip = True
-        
-        if skip:
-            continue
-
-        filtered_course = {
-            "选课代码": course.get("jx0404id", ""),  # 重要字段
-            "学分": course.get("xf", ""),
-            "上课老师": course.get("skls", ""),
-            "上课教室": course.get("skdd", ""),
-            "上课时间": course.get("sksj", ""),
-            "科目名称": course.get("kcmc", ""),
-            "冲突情况": conflict_status,
-            "剩余人数": remaining_slots
-        }
-        filtered_courses.append(filtered_course)
-    
-    available_count = len(filtered_courses)
-    print(f"学科基础专业必修课课程: 总条数({total_count}) 可用条数({available_count})")
-
-    return filtered_courses
+    return _filter_courses(courses_data, "bx")
 
 
 def filter_ts_courses(courses_data=None):
@@ -138,93 +128,46 @@ def filter_ts_courses(courses_data=None):
     # 如果没有提供数据，则调用数据获取函数
     if courses_data is None:
         courses_data = get_ggxxkxk_data(verbose=False)
-
-    filtered_courses = []
-    total_count = len(courses_data)
-
-    for course in courses_data:
-        # 检查冲突情况和剩余人数，任一条件满足则跳过该课程
-        conflict_status = course.get("ctsm", "")
-        remaining_slots = course.get("syrs", "")
-
-        # 筛选条件：只有同时满足以下两个条件才保留课程
-        # 条件一：冲突情况为空字符串
-        # 条件二：剩余人数不是0且不是负数
-        skip = False
-        if conflict_status != "":
-            skip = True
-        else:
-            # 检查剩余人数是否为0或负数
-            try:
-                # 尝试将剩余人数转换为整数进行比较
-                slots_num = int(remaining_slots)
-                if slots_num <= 0:
-                    skip = True
-            except (ValueError, TypeError):
-                # 如果无法转换为整数，检查字符串是否为"0"或表示负数的字符串
-                if remaining_slots == "0" or (isinstance(remaining_slots, str) and remaining_slots.startswith('-')):
-                    skip = True
-        
-        if skip:
-            continue
-
-        filtered_course = {
-            "选课代码": course.get("jx0404id", ""),  # 重要字段
-            "学分": course.get("xf", ""),
-            "上课老师": course.get("skls", ""),
-            "上课教室": course.get("skdd", ""),
-            "上课时间": course.get("sksj", ""),
-            "科目名称": course.get("kcmc", ""),
-            "冲突情况": conflict_status,
-            "剩余人数": remaining_slots
-        }
-        filtered_courses.append(filtered_course)
-    
-    available_count = len(filtered_courses)
-    print(f"公共选修课课程: 总条数({total_count}) 可用条数({available_count})")
-
-    return filtered_courses
+    return _filter_courses(courses_data, "ts")
 
 
 def filter_all_courses(futures=None):
     """批量筛选所有课程类型的重要信息
 
+    三个类别按选课代码去重，在取得每个类别的数据时完成筛选（见catalog.filter_futures）；
+    某个类别获取失败时保留其他类别的结果，该类别为空列表，不会重新获取全部数据
+
     Args:
         futures: 可选，包含三种课程数据的future对象元组，格式为(公共选修future, 学科基础/专业必修future, 专业选修future)
-                 如果为None则自动创建并执行
+                 如果为None则通过获取→解析流水线（有界队列）逐页获取
 
     Returns:
         包含所有类型筛选后课程的字典
     """
-    # 如果没有提供future对象，则直接使用各个筛选函数
+    from .catalog import Catalog, filter_futures
+
     if futures is None:
-        return {
-            "专业选修课": filter_zy_courses(),
-            "学科基础专业必修课": filter_bx_courses(),
-            "公共选修课": filter_ts_courses()
-        }
+        return Catalog.from_pipeline().filtered()
+    return filter_futures(futures)
 
-    # 如果提供了future对象，则从中获取数据
-    try:
-        # 正确解析futures元组：(公共选修future, 学科基础/专业必修future, 专业选修future)
-        ggxxkxk_future, xxkxk_future, xxxkxk_future = futures
-
-        # 获取所有future的结果
-        ggxxkxk_data = ggxxkxk_future.result()  # 公共选修数据
-        xxkxk_data = xxkxk_future.result()      # 学科基础/专业必修数据
-        xxxkxk_data = xxxkxk_future.result()    # 专业选修数据
-
-        return {
-            "专业选修课": filter_zy_courses(xxxkxk_data),
-            "学科基础专业必修课": filter_bx_courses(xxkxk_data),
-            "公共选修课": filter_ts_courses(ggxxkxk_data)
-        }
-    except Exception as e:
-        # 处理可能的异常，确保即使出现问题也能返回部分结果
-        print(f"筛选课程数据时发生错误: {e}")
-        # 回退到默认行为
-        return {
-            "专业选修课": filter_zy_courses(),
-            "学科基础专业必修课": filter_bx_courses(),
-            "公共选修课": filter_ts_courses()
-        }
+
+def filter_store_courses(store, category):
+    """从SQLite课程目录中筛选某类别课程的重要信息
+
+    筛选条件与filter_*_courses相同，但在数据库中通过索引完成，无需将全部课程加载到内存
+
+    Args:
+        store: CatalogStore实例
+        category: 课程类别代码，见CATEGORY_LABELS
+
+    Returns:
+        筛选后的课程列表
+    """
+    filtered_courses = [
+        _summarize_course(course)
+        for course in store.query(category=category, available_only=True)
+    ]
+    counts = store.counts(category)
+    print(f"{CATEGORY_LABELS[category]}课程: 总条数({counts['total']}) 可用条数({counts['available']})")
+
+    return filtered_courses
@@ -0,0 +1,252 @@
+"""
+此模块实现课程目录的内存倒排索引，
+支持按课程名称、教师（含拼音首字母）、上课地点、课程号的前缀/子串搜索，
+按星期/节次查询，以及按选课代码（jx0404id）的O(1)查找。
+每次刷新课程数据时增量更新，而不是整体重建。
+"""
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from .sksj import parse_sksj
+
+# 尝试导入pypinyin库，用于支持拼音首字母搜索
+pinyin_available = False
+try:
+    from pypinyin import lazy_pinyin, Style
+    pinyin_available = True
+except ImportError:
+    pass
+
+# 建立文本索引的字段
+TEXT_FIELDS = ("kcmc", "skls", "skdd", "kch")
+# 额外建立拼音首字母索引的字段
+PINYIN_FIELDS = ("kcmc", "skls")
+
+# 多位教师之间的分隔符
+_TERM_SPLIT_RE = re.compile(r"[,，、;；/\s]+")
+
+
+def _normalize(text) -> str:
+    return str(text or "").strip().lower()
+
+
+def _initials(text: str) -> str:
+    """返回文本的拼音首字母（非汉字字符原样保留）"""
+    return "".join(lazy_pinyin(text, style=Style.FIRST_LETTER)).lower()
+
+
+def _grams(term: str):
+    """返回词项的所有单字和二元组，用于子串搜索的候选筛选"""
+    grams = set(term)
+    grams.update(term[i:i + 2] for i in range(len(term) - 1))
+    return grams
+
+
+class CourseIndex:
+    """课程目录倒排索引"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # jx0404id -> 原始课程数据
+        self._rows: Dict[str, dict] = {}
+        # jx0404id -> 已建立索引的字段值，用于判断刷新时是否需要重建该课程的索引
+        self._indexed: Dict[str, tuple] = {}
+        # jx0404id -> 字段 -> 该课程的词项
+        self._id_terms: Dict[str, Dict[str, tuple]] = {}
+        # 字段 -> 按字典序排列的(词项, jx0404id)列表，用于前缀搜索
+        self._terms: Dict[str, list] = defaultdict(list)
+        # 字段 -> 单字/二元组 -> jx0404id集合，用于子串搜索
+        self._postings: Dict[str, Dict[str, set]] = defaultdict(lambda: defaultdict(set))
+        # (星期, 节次) -> jx0404id集合
+        self._slots: Dict[tuple, set] = defaultdict(set)
+        # 星期 -> jx0404id集合
+        self._weekdays: Dict[int, set] = defaultdict(set)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, jx0404id):
+        return jx0404id in self._rows
+
+    # ---------------------------------------------------------------- 维护
+
+    @staticmethod
+    def _key(row: dict) -> tuple:
+        return tuple(row.get(field, "") for field in TEXT_FIELDS) + (row.get("sksj", ""),)
+
+    @staticmethod
+    def _field_terms(row: dict):
+        """生成(字段, 词项)对"""
+        for field in TEXT_FIELDS:
+            value = _normalize(row.get(field))
+            if not value:
+                continue
+            terms = {value}
+            if field == "skls":
+                terms.update(t for t in _TERM_SPLIT_RE.split(value) if t)
+            for term in terms:
+                yield field, term
+                if pinyin_available and field in PINYIN_FIELDS:
+                    initials = _initials(term)
+                    if initials != term:
+                        yield field + "_py", initials
+
+    def _add(self, jx0404id: str, row: dict):
+        id_terms = defaultdict(list)
+        for field, term in self._field_terms(row):
+            id_terms[field].append(term)
+            insort(self._terms[field], (term, jx0404id))
+            postings = self._postings[field]
+            for gram in _grams(term):
+                postings[gram].add(jx0404id)
+        self._id_terms[jx0404id] = {field: tuple(terms) for field, terms in id_terms.items()}
+        for slot in parse_sksj(row.get("sksj")):
+            self._weekdays[slot.weekday].add(jx0404id)
+            for period in slot.periods():
+                self._slots[(slot.weekday, period)].add(jx0404id)
+
+    def _remove(self, jx0404id: str, row: dict):
+        for field, terms in self._id_terms.pop(jx0404id, {}).items():
+            sorted_terms = self._terms[field]
+            postings = self._postings[field]
+            for term in terms:
+                pos = bisect_left(sorted_terms, (term, jx0404id))
+                if pos < len(sorted_terms) and sorted_terms[pos] == (term, jx0404id):
+                    del sorted_terms[pos]
+                for gram in _grams(term):
+                    ids = postings.get(gram)
+                    if ids is not None:
+                        ids.discard(jx0404id)
+                        if not ids:
+                            del postings[gram]
+        for slot in parse_sksj(row.get("sksj")):
+            self._weekdays[slot.weekday].discard(jx0404id)
+            for period in slot.periods():
+                self._slots[(slot.weekday, period)].discard(jx0404id)
+
+    def update(self, rows: Iterable[dict], full: bool = True) -> Dict[str, int]:
+        """
+        用一次刷新得到的课程数据增量更新索引
+
+        Args:
+            rows: 课程数据（接口返回的原始字典）
+            full: 是否为完整快照，为True时会移除本次未出现的课程
+
+        Returns:
+            dict: 新增、变更、移除、未变化的课程数量
+        """
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        with self._lock:
+            seen = set()
+            for row in rows:
+                jx0404id = row.get("jx0404id")
+                if not jx0404id:
+                    continue
+                seen.add(jx0404id)
+                key = self._key(row)
+                old_key = self._indexed.get(jx0404id)
+                if old_key is None:
+                    self._add(jx0404id, row)
+                    stats["added"] += 1
+                elif old_key != key:
+                    self._remove(jx0404id, self._rows[jx0404id])
+                    self._add(jx0404id, row)
+                    stats["changed"] += 1
+                else:
+                    stats["unchanged"] += 1
+                # 剩余人数等非索引字段直接替换为最新数据
+                self._rows[jx0404id] = row
+                self._indexed[jx0404id] = key
+
+            if full:
+                for jx0404id in [i for i in self._rows if i not in seen]:
+                    self.remove(jx0404id)
+                    stats["removed"] += 1
+        return stats
+
+    def remove(self, jx0404id: str) -> bool:
+        """从索引中移除一门课程"""
+        with self._lock:
+            row = self._rows.pop(jx0404id, None)
+            if row is None:
+                return False
+            self._remove(jx0404id, row)
+            del self._indexed[jx0404id]
+            return True
+
+    # ---------------------------------------------------------------- 查询
+
+    def get(self, jx0404id: str) -> Optional[dict]:
+        """按选课代码查找课程"""
+        return self._rows.get(jx0404id)
+
+    def _fields(self, fields):
+        fields = tuple(fields or TEXT_FIELDS)
+        if pinyin_available:
+            fields += tuple(f + "_py" for f in fields if f in PINYIN_FIELDS)
+        return fields
+
+    def _prefix_ids(self, field: str, query: str) -> set:
+        terms = self._terms.get(field, [])
+        ids = set()
+        pos = bisect_left(terms, (query,))
+        while pos < len(terms) and terms[pos][0].startswith(query):
+            ids.add(terms[pos][1])
+            pos += 1
+        return ids
+
+    def _substring_ids(self, field: str, query: str) -> set:
+        postings = self._postings.get(field)
+        if not postings:
+            return set()
+        grams = [query] if len(query) <= 2 else [query[i:i + 2] for i in range(len(query) - 1)]
+        candidate_sets = sorted((postings.get(g, ()) for g in grams), key=len)
+        if not candidate_sets[0]:
+            return set()
+        candidates = set(candidate_sets[0]).intersection(*candidate_sets[1:])
+        if len(query) <= 2:
+            return candidates
+        # 二元组只能筛选候选，最终需要校验是否真正包含查询串
+        return {
+            jx0404id for jx0404id in candidates
+            if any(query in term for term in self._id_terms[jx0404id].get(field, ()))
+        }
+
+    def search(self, query: str, fields=None, prefix: bool = False) -> List[dict]:
+        """
+        文本搜索
+
+        Args:
+            query: 查询串，不区分大小写；启用拼音支持时也可输入拼音首字母
+            fields: 搜索的字段，默认为全部文本字段（kcmc、skls、skdd、kch）
+            prefix: 为True时只匹配前缀，否则匹配子串
+
+        Returns:
+            匹配的课程数据列表
+        """
+        query = _normalize(query)
+        if not query:
+            return []
+        with self._lock:
+            ids = set()
+            for field in self._fields(fields):
+                ids |= self._prefix_ids(field, query) if prefix else self._substring_ids(field, query)
+            return [self._rows[i] for i in ids]
+
+    def at(self, weekday: int, period: Optional[int] = None) -> List[dict]:
+        """
+        按上课时间查询
+
+        Args:
+            weekday: 星期，1-7
+            period: 节次，为None时返回该星期所有有课的课程
+
+        Returns:
+            匹配的课程数据列表
+        """
+        with self._lock:
+            ids = self._weekdays.get(weekday, ()) if period is None else self._slots.get((weekday, period), ())
+            return [self._rows[i] for i in ids]
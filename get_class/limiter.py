@@ -0,0 +1,145 @@
+"""
+此模块实现基于延迟的自适应并发限制（AIMD：加性增、乘性减）：
+响应延迟正常时每完成约一个并发上限的请求，上限加一；
+出现超时、连接错误、5xx/429响应，或延迟明显高于基线时，上限减半。
+比较的是平滑后的延迟（指数移动平均），基线为最近baseline_window个请求中平滑延迟的最小值：
+单个请求的随机抖动不会被当作过载；基线随窗口滑动，服务器持续变慢后不会一直判定为过载。
+选课高峰期服务器变慢时自动减少同时在途的请求，空闲时逐步放开，使吞吐量最高而不压垮服务器。
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class AIMDLimiter:
+    """自适应并发限制器"""
+
+    def __init__(self, initial=4, min_limit=1, max_limit=50, backoff=0.5,
+                 latency_tolerance=2.0, smoothing=0.05, baseline_window=1000):
+        """
+        :param initial: 初始并发上限
+        :param min_limit: 并发上限的最小值
+        :param max_limit: 并发上限的最大值（不超过线程池大小）
+        :param backoff: 过载时并发上限乘以的系数
+        :param latency_tolerance: 平滑后的延迟超过基线的该倍数时视为过载
+        :param smoothing: 延迟指数移动平均的系数
+        :param baseline_window: 基线取最近多少个请求中平滑延迟的最小值
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+
+        self._cond = threading.Condition()
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        # 延迟的指数移动平均和基线（窗口内平滑延迟的最小值），单位：秒
+        self._latency = None
+        self._baseline = None
+        self.baseline_window = baseline_window
+        # 求窗口最小值的单调队列：(序号, 平滑延迟)，平滑延迟递增
+        self._window = deque()
+        self._observed = 0
+        self._last_decrease = 0.0
+        self._successes = 0
+        self._overloads = 0
+        self._slow = 0
+        self._decreases = 0
+        self._peak_limit = int(self._limit)
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self, timeout=None) -> bool:
+        """等待直到在途请求数低于当前上限，返回是否成功获得许可"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._in_flight < int(self._limit), timeout):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, latency=None, overloaded=False):
+        """
+        归还许可并根据本次请求的结果调整并发上限
+
+        :param latency: 请求耗时，单位：秒；请求未完成（如连接错误）时为None
+        :param overloaded: 是否出现超时、连接错误或5xx/429响应
+        """
+        now = time.monotonic()
+        with self._cond:
+            self._in_flight -= 1
+            slow = False
+            if latency is not None and not overloaded:
+                self._observe(latency)
+                # 平滑值稳定之前（约1/smoothing个请求）不判断延迟
+                slow = (self._observed * self.smoothing > 1
+                        and self._latency > self._baseline * self.latency_tolerance)
+
+            if overloaded or slow:
+                if overloaded:
+                    self._overloads += 1
+                else:
+                    self._slow += 1
+                # 同一批并发请求同时失败只减一次：距上次减少不足一个平均延迟时忽略
+                if now - self._last_decrease >= (self._latency or 0.0):
+                    self._limit = max(float(self.min_limit), self._limit * self.backoff)
+                    self._last_decrease = now
+                    self._decreases += 1
+            else:
+                self._successes += 1
+                self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                self._peak_limit = max(self._peak_limit, int(self._limit))
+            self._cond.notify_all()
+
+    def _observe(self, latency):
+        self._observed += 1
+        if self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += self.smoothing * (latency - self._latency)
+        window = self._window
+        while window and window[-1][1] >= self._latency:
+            window.pop()
+        window.append((self._observed, self._latency))
+        while window[0][0] <= self._observed - self.baseline_window:
+            window.popleft()
+        self._baseline = window[0][1]
+
+    @contextmanager
+    def slot(self):
+        """
+        以上下文管理器的方式占用一个许可，退出时按耗时和异常调整上限
+
+        需要区分5xx响应等过载情况时，请直接使用acquire/release
+        """
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.release(None, overloaded=True)
+            raise
+        self.release(time.perf_counter() - start)
+
+    def metrics(self) -> dict:
+        """当前并发上限、在途请求数、延迟等指标"""
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "peak_limit": self._peak_limit,
+                "in_flight": self._in_flight,
+                "successes": self._successes,
+                "overloads": self._overloads,
+                "slow": self._slow,
+                "decreases": self._decreases,
+                "latency_ms": round(self._latency * 1000, 1) if self._latency is not None else None,
+                "baseline_ms": round(self._baseline * 1000, 1) if self._baseline is not None else None,
+            }
@@ -0,0 +1,354 @@
+"""
+此模块实现分阶段的课程目录处理流水线：获取 → 解析 → 筛选 → 输出，
+相邻阶段之间是有界队列，每个阶段有独立的并行度和指标（吞吐量、队列深度、等待时间）。
+下游处理得慢时（如写磁盘、界面刷新），上游在放入已满的队列时阻塞，
+最终获取阶段停止请求新的页面，缓冲的数据量不超过各队列容量之和，而不是随课程总数增长。
+"""
+import json
+import queue
+import threading
+import time
+from functools import partial
+from typing import Callable, Iterable, Optional, Sequence
+
+import requests
+from .filter import CATEGORY_LABELS, is_course_available, _summarize_course
+from .xsxk import CATEGORY_ENDPOINTS, PAGE_LIMITER, PAGE_RETRY_ROUNDS, _post_page
+
+# 队列中表示上游已结束的标记
+_DONE = object()
+# 阻塞的放入/取出操作检查流水线是否已关闭的间隔，单位：秒
+_POLL_INTERVAL = 0.1
+
+
+class Stage:
+    """流水线的一个阶段"""
+
+    def __init__(self, name: str, fn: Callable, workers: int = 1, queue_size: int = 16):
+        """
+        :param name: 阶段名称
+        :param fn: 处理函数，参数为上游的输出，返回值传给下游；返回None时丢弃该项
+        :param workers: 并行的工作线程数
+        :param queue_size: 该阶段输入队列的容量
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.input = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._running = workers
+        self.processed = 0
+        self.errors = 0
+        self.busy = 0.0
+        # 等待上游输入（饥饿）和等待下游队列空位（背压）的累计时间
+        self.wait_in = 0.0
+        self.wait_out = 0.0
+        self.max_depth = 0
+
+    def _worker_finished(self) -> bool:
+        """工作线程退出时调用，返回是否为该阶段最后一个退出的线程"""
+        with self._lock:
+            self._running -= 1
+            return self._running == 0
+
+    def _add(self, **deltas):
+        with self._lock:
+            for key, value in deltas.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    def metrics(self, elapsed: float) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "processed": self.processed,
+                "errors": self.errors,
+                "throughput": round(self.processed / elapsed, 1) if elapsed > 0 else 0.0,
+                "queue_depth": self.input.qsize(),
+                "max_queue_depth": self.max_depth,
+                "queue_size": self.queue_size,
+                "busy_s": round(self.busy, 3),
+                "wait_in_s": round(self.wait_in, 3),
+                "wait_out_s": round(self.wait_out, 3),
+            }
+
+
+class Pipeline:
+    """由有界队列连接的多阶段流水线"""
+
+    def __init__(self, source, stages: Sequence[Stage], output_size: int = 16,
+                 on_error: Optional[Callable] = None):
+        """
+        :param source: 输入数据的可迭代对象，或接受本流水线、返回可迭代对象的函数；在独立线程中迭代
+        :param stages: 按顺序排列的各阶段
+        :param output_size: 最后一个阶段输出队列的容量
+        :param on_error: 处理失败时的回调on_error(阶段名称, 输入项, 异常)，默认打印错误
+        """
+        self.source = source
+        self.stages = list(stages)
+        self.output = queue.Queue(maxsize=output_size)
+        self.on_error = on_error
+        self.errors = []
+        self._stopped = threading.Event()
+        self._threads = []
+        self._started_at = None
+        self._finished_at = None
+        self.source_wait = 0.0
+
+    # ---------------------------------------------------------------- 队列操作
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        """放入队列，队列满时阻塞；流水线关闭时返回False"""
+        while not self._stopped.is_set():
+            try:
+                q.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        """从队列取出，队列空时阻塞；流水线关闭时返回_DONE"""
+        while not self._stopped.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _next_queue(self, index: int) -> queue.Queue:
+        return self.stages[index + 1].input if index + 1 < len(self.stages) else self.output
+
+    def _next_workers(self, index: int) -> int:
+        return self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+
+    def record_error(self, stage_name: str, item, error: BaseException):
+        """记录处理失败的输入项，供阶段函数和数据源调用"""
+        self.errors.append((stage_name, item, error))
+        if self.on_error is not None:
+            self.on_error(stage_name, item, error)
+        else:
+            print(f"[pipeline] {stage_name}阶段处理失败: {error}")
+
+    # ---------------------------------------------------------------- 线程
+
+    def _run_source(self):
+        first = self.stages[0] if self.stages else None
+        target = first.input if first is not None else self.output
+        try:
+            source = self.source(self) if callable(self.source) else self.source
+            for item in source:
+                start = time.perf_counter()
+                if not self._put(target, item):
+                    return
+                self.source_wait += time.perf_counter() - start
+                if first is not None:
+                    first.max_depth = max(first.max_depth, target.qsize())
+        except Exception as e:
+            self.record_error("source", None, e)
+        finally:
+            for _ in range(first.workers if first is not None else 1):
+                self._put(target, _DONE)
+
+    def _run_stage(self, index: int):
+        stage = self.stages[index]
+        target = self._next_queue(index)
+        try:
+            while True:
+                start = time.perf_counter()
+                item = self._get(stage.input)
+                waited = time.perf_counter() - start
+                if item is _DONE:
+                    stage._add(wait_in=waited)
+                    return
+
+                start = time.perf_counter()
+                try:
+                    result = stage.fn(item)
+                except Exception as e:
+                    stage._add(wait_in=waited, busy=time.perf_counter() - start, errors=1)
+                    self.record_error(stage.name, item, e)
+                    continue
+                busy = time.perf_counter() - start
+
+                start = time.perf_counter()
+                if result is not None and not self._put(target, result):
+                    return
+                stage._add(wait_in=waited, busy=busy, wait_out=time.perf_counter() - start, processed=1)
+                if index + 1 < len(self.stages):
+                    following = self.stages[index + 1]
+                    following.max_depth = max(following.max_depth, target.qsize())
+        finally:
+            # 最后一个退出的线程通知下游的每个工作线程
+            if stage._worker_finished():
+                for _ in range(self._next_workers(index)):
+                    self._put(target, _DONE)
+
+    def start(self) -> "Pipeline":
+        """启动数据源和各阶段的线程"""
+        if self._started_at is not None:
+            return self
+        self._started_at = time.perf_counter()
+        self._threads.append(threading.Thread(target=self._run_source, daemon=True, name="pipeline-source"))
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                self._threads.append(threading.Thread(
+                    target=self._run_stage, args=(index,), daemon=True, name=f"pipeline-{stage.name}-{n}"))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def close(self):
+        """停止流水线，丢弃尚未处理的数据"""
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+        if self._finished_at is None:
+            self._finished_at = time.perf_counter()
+
+    def results(self):
+        """
+        逐项产出最后一个阶段的输出（调用方即输出阶段）
+
+        调用方消费得慢时整条流水线随之减速；提前停止迭代时关闭流水线
+        """
+        self.start()
+        try:
+            while True:
+                item = self._get(self.output)
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            self.close()
+
+    def run(self, sink: Optional[Callable] = None) -> dict:
+        """
+        运行到结束，将每项输出交给sink处理
+
+        :param sink: 输出处理函数，默认丢弃
+        :return: 各阶段的指标，见metrics()
+        """
+        for item in self.results():
+            if sink is not None:
+                sink(item)
+        return self.metrics()
+
+    def metrics(self) -> dict:
+        """各阶段的处理数、吞吐量（项/秒）、队列深度、忙碌时间和等待时间"""
+        if self._started_at is None:
+            elapsed = 0.0
+        else:
+            elapsed = (self._finished_at or time.perf_counter()) - self._started_at
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "source_wait_s": round(self.source_wait, 3),
+            "output_depth": self.output.qsize(),
+            "errors": len(self.errors),
+            "stages": {stage.name: stage.metrics(elapsed) for stage in self.stages},
+        }
+
+
+# ---------------------------------------------------------------- 课程目录流水线
+
+def _request_body(category, page_num, endpoints=CATEGORY_ENDPOINTS) -> bytes:
+    """
+    获取某类别的单页原始响应体
+
+    超时、连接错误和5xx/429响应在限制器降低并发后重试，最多PAGE_RETRY_ROUNDS次
+    """
+    url, form_template, endpoint = endpoints[category]
+    current_form = form_template.copy()
+    current_form['sEcho'] = str(page_num)
+    current_form['iDisplayStart'] = str((page_num - 1) * 15)
+    form_data_str = '&'.join([f'{k}={v}' for k, v in current_form.items()])
+
+    for attempt in range(PAGE_RETRY_ROUNDS + 1):
+        PAGE_LIMITER.acquire()
+        try:
+            response = _post_page(url, endpoint, form_data_str)
+        except (requests.Timeout, requests.ConnectionError):
+            if attempt == PAGE_RETRY_ROUNDS:
+                raise
+            continue
+        if (response.status_code >= 500 or response.status_code == 429) and attempt < PAGE_RETRY_ROUNDS:
+            continue
+        response.raise_for_status()
+        return response.content
+
+
+def _page_tasks(categories, endpoints, pipeline):
+    """
+    数据源：逐个类别先获取第1页以确定总页数，再产出其余页面的获取任务
+
+    任务为(类别, 页码, 已获取的响应体或None)；第1页获取失败时记录错误并跳过该类别
+    """
+    for category in categories:
+        try:
+            body = _request_body(category, 1, endpoints)
+            json_data = json.loads(body)
+            # 与query_ggxxkxk_page一致，按筛选后的总条数计算页数
+            total = json_data.get('iTotalDisplayRecords', json_data.get('iTotalRecords', 0))
+            total_pages = (int(total or 0) + 14) // 15
+        except Exception as e:
+            pipeline.record_error("fetch", (category, 1, None), e)
+            continue
+        yield category, 1, body
+        for page_num in range(2, total_pages + 1):
+            yield category, page_num, None
+
+
+def _fetch_page(endpoints, task):
+    category, page_num, body = task
+    if body is None:
+        body = _request_body(category, page_num, endpoints)
+    return category, page_num, body
+
+
+def _parse_page(item):
+    category, page_num, body = item
+    return category, json.loads(body).get('aaData') or []
+
+
+def _filter_page(filtered, item):
+    category, rows = item
+    if filtered:
+        rows = [_summarize_course(row) for row in rows if is_course_available(row)]
+    return category, rows
+
+
+def _sink_page(sink, item):
+    sink(*item)
+
+
+def catalog_pipeline(categories: Iterable[str] = tuple(CATEGORY_LABELS), filtered: bool = False,
+                     sink: Optional[Callable] = None, fetch_workers: int = 8, parse_workers: int = 2,
+                     filter_workers: int = 1, sink_workers: int = 1, queue_size: int = 16,
+                     on_error: Optional[Callable] = None, endpoints: Optional[dict] = None) -> Pipeline:
+    """
+    创建课程目录流水线
+
+    Args:
+        categories: 要获取的课程类别代码
+        filtered: 为True时只输出可选课程的重要信息（与filter_*_courses相同）
+        sink: 输出阶段的处理函数sink(类别, 该页的课程列表)；为None时没有输出阶段，
+              由调用方通过results()逐项取得(类别, 该页的课程列表)
+        fetch_workers: 获取阶段的线程数（同时在途的页面数另受PAGE_LIMITER限制）
+        parse_workers: JSON解析阶段的线程数
+        filter_workers: 筛选阶段的线程数
+        sink_workers: 输出阶段的线程数，sink须是线程安全的才能大于1
+        queue_size: 各阶段之间队列的容量（页）
+        on_error: 处理失败时的回调，见Pipeline
+        endpoints: 可选，类别代码 -> (接口URL, 表单参数模板, 请求头模板名称)，覆盖CATEGORY_ENDPOINTS中的对应类别，
+                   如带服务端筛选条件的公共选修课接口
+    """
+    endpoints = dict(CATEGORY_ENDPOINTS, **(endpoints or {}))
+    stages = [
+        Stage("fetch", partial(_fetch_page, endpoints), fetch_workers, queue_size),
+        Stage("parse", _parse_page, parse_workers, queue_size),
+        Stage("filter", partial(_filter_page, filtered), filter_workers, queue_size),
+    ]
+    if sink is not None:
+        stages.append(Stage("sink", partial(_sink_page, sink), sink_workers, queue_size))
+    return Pipeline(partial(_page_tasks, tuple(categories), endpoints), stages,
+                    output_size=queue_size, on_error=on_error)
@@ -0,0 +1,317 @@
+"""
+此模块实现无冲突课表规划：
+给定按偏好排序的心愿单（每门课程可有多个教学班，即多个jx0404id），
+找出互不冲突的教学班组合，并按偏好和学分排序。
+
+上课时间（sksj）被编码为位集：每个(星期, 节次, 周次)对应一位，两个教学班冲突当且仅当位集相交。
+搜索按心愿单顺序回溯（分支定界）：剪除冲突和超出学分上限的分支，并以
+(课程序号, 后续课程相关的已占用位, 剩余学分)为键记忆后缀的分数上界，不可能进入前几名的分支直接剪枝。
+上界考虑剩余学分（按心愿单顺序贪心地放入学分最少的教学班），有学分上限时同样能有效剪枝，
+真实规模的心愿单在毫秒级完成。教学班满员后调用mark_full即可得到次优方案。
+"""
+import heapq
+import itertools
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .sksj import parse_sksj
+
+# 位集布局：((星期-1) * MAX_PERIODS + (节次-1)) * MAX_WEEKS + (周次-1)
+MAX_WEEKS = 30
+MAX_PERIODS = 16
+_ALL_WEEKS = (1 << MAX_WEEKS) - 1
+
+# 分数：(心愿覆盖度, 学分, -教学班偏好序号之和)
+_ZERO = (0, 0.0, 0)
+_INFEASIBLE = (float("-inf"), float("-inf"), float("-inf"))
+
+
+@lru_cache(maxsize=4096)
+def sksj_mask(sksj) -> int:
+    """
+    将上课时间编码为位集
+
+    未注明周次的时间段视为占用所有周；无法解析的上课时间返回0（不与任何课程冲突）
+    """
+    mask = 0
+    for slot in parse_sksj(sksj):
+        if not 1 <= slot.weekday <= 7:
+            continue
+        if slot.weeks:
+            weeks = 0
+            for week in slot.weeks:
+                if 1 <= week <= MAX_WEEKS:
+                    weeks |= 1 << (week - 1)
+        else:
+            weeks = _ALL_WEEKS
+        for period in slot.periods():
+            if 1 <= period <= MAX_PERIODS:
+                mask |= weeks << (((slot.weekday - 1) * MAX_PERIODS + period - 1) * MAX_WEEKS)
+    return mask
+
+
+def _credits(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Section(NamedTuple):
+    """一个教学班"""
+    jx0404id: str
+    course: str                 # 课程号（kch），筛选后的数据没有课程号时为课程名称
+    name: str                   # 课程名称
+    credits: float
+    mask: int                   # 上课时间位集
+    row: dict                   # 原始课程数据
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Section":
+        """同时支持接口返回的原始数据和filter_*_courses筛选后的数据"""
+        name = row.get("kcmc") or row.get("科目名称") or ""
+        return cls(
+            jx0404id=str(row.get("jx0404id") or row.get("选课代码") or ""),
+            course=str(row.get("kch") or name),
+            name=name,
+            credits=_credits(row.get("xf", row.get("学分"))),
+            mask=sksj_mask(row.get("sksj", row.get("上课时间")) or ""),
+            row=row,
+        )
+
+
+class Wish(NamedTuple):
+    """心愿单中的一门课程"""
+    course: str                         # 课程号或课程名称
+    sections: Tuple[str, ...] = ()      # 偏好的教学班（jx0404id）顺序，为空时接受所有教学班
+    required: bool = False              # 为True时方案必须包含该课程
+
+
+class Plan(NamedTuple):
+    """一个无冲突方案"""
+    score: tuple                        # (心愿覆盖度, 学分, -教学班偏好序号之和)，越大越好
+    sections: Tuple[Section, ...]
+
+    @property
+    def credits(self) -> float:
+        return sum(s.credits for s in self.sections)
+
+    @property
+    def jx0404ids(self) -> List[str]:
+        return [s.jx0404id for s in self.sections]
+
+
+def _add(a: tuple, b: tuple) -> tuple:
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+
+def flatten_courses(courses) -> List[dict]:
+    """将get_and_filter_all_courses返回的{类别: 课程列表}展开为课程列表，其他可迭代对象原样展开"""
+    if isinstance(courses, dict):
+        return [row for rows in courses.values() for row in rows]
+    return list(courses)
+
+
+class TimetablePlanner:
+    """心愿单课表规划器"""
+
+    def __init__(self, wishlist: Sequence, courses, max_credits: Optional[float] = None,
+                 occupied: Iterable[dict] = ()):
+        """
+        :param wishlist: 按偏好排序的心愿单，元素为Wish或课程号/课程名称字符串
+        :param courses: 可选课程，get_and_filter_all_courses的返回值或课程数据列表
+        :param max_credits: 学分上限
+        :param occupied: 已选课程，方案不能与其冲突
+        """
+        self.wishlist = [w if isinstance(w, Wish) else Wish(str(w)) for w in wishlist]
+        self.max_credits = max_credits
+        self._lock = threading.Lock()
+        self._full = set()
+        self._occupied = 0
+        for row in occupied:
+            self._occupied |= Section.from_row(row).mask
+        self.update(courses)
+
+    def update(self, courses):
+        """用最新的课程数据重建候选教学班（刷新课程目录后调用）"""
+        by_course: Dict[str, List[Section]] = {}
+        for row in flatten_courses(courses):
+            section = Section.from_row(row)
+            if not section.jx0404id:
+                continue
+            by_course.setdefault(section.course, []).append(section)
+            if section.name and section.name != section.course:
+                by_course.setdefault(section.name, []).append(section)
+        with self._lock:
+            self._by_course = by_course
+            self._rebuild()
+
+    def mark_full(self, jx0404id: str) -> Optional[Plan]:
+        """教学班已满（或选课失败）时将其排除，返回次优方案"""
+        with self._lock:
+            self._full.add(str(jx0404id))
+            self._rebuild()
+        return self.best()
+
+    def _rebuild(self):
+        """按心愿单整理每门课程的候选教学班"""
+        options = []
+        seen = set()
+        for wish in self.wishlist:
+            candidates = [
+                s for s in self._by_course.get(wish.course, ())
+                if s.jx0404id not in self._full and s.jx0404id not in seen
+                and not (s.mask & self._occupied)
+            ]
+            if wish.sections:
+                order = {jx0404id: i for i, jx0404id in enumerate(wish.sections)}
+                candidates = sorted((s for s in candidates if s.jx0404id in order), key=lambda s: order[s.jx0404id])
+            # 同一教学班只归入心愿单中靠前的课程
+            seen.update(s.jx0404id for s in candidates)
+            options.append(candidates)
+        self._options = options
+
+        # 每门课程之后所有候选教学班的位集并集：只有与之相交的已占用位会影响后续选择
+        # 以及每门课程之后各课程最多学分之和：剩余学分不少于它时学分上限不起作用
+        n = len(options)
+        self._suffix_union = [0] * (n + 1)
+        self._suffix_credits = [0.0] * (n + 1)
+        for i in range(n - 1, -1, -1):
+            union = 0
+            for s in options[i]:
+                union |= s.mask
+            self._suffix_union[i] = union | self._suffix_union[i + 1]
+            self._suffix_credits[i] = max((s.credits for s in options[i]), default=0.0) + self._suffix_credits[i + 1]
+
+    def _bound(self, i: int, mask: int, budget: Optional[float]) -> tuple:
+        """
+        第i门及之后课程能达到的分数上界，不考虑后续课程之间的冲突
+
+        每门课程只看与已占用位不冲突、学分不超过剩余学分的教学班。有学分上限时按心愿单顺序贪心：
+        能放下该课程最少的学分（并为其后的必选课程留足学分）就计入覆盖度。覆盖度按位置编码，
+        靠前的课程比其后所有课程加起来更重要，因此贪心得到的正是放宽冲突后的最大覆盖度；
+        覆盖度相同的方案包含的课程相同，学分和偏好序号取这些课程各自最好的值。
+        某门必选课程已没有可选的教学班或放不下时返回_INFEASIBLE
+        """
+        n = len(self._options)
+        # 每门课程可选教学班的(最少学分, 最多学分, 最好的偏好序号)
+        best = []
+        for j in range(i, n):
+            low = high = best_rank = None
+            for r, section in enumerate(self._options[j]):
+                if section.mask & mask or (budget is not None and section.credits > budget + 1e-9):
+                    continue
+                if best_rank is None:
+                    best_rank, low, high = r, section.credits, section.credits
+                else:
+                    low = min(low, section.credits)
+                    high = max(high, section.credits)
+            if best_rank is None and self.wishlist[j].required:
+                return _INFEASIBLE
+            best.append((low, high, best_rank))
+
+        # 为之后的必选课程预留的学分
+        reserved = [0.0] * (len(best) + 1)
+        for k in range(len(best) - 1, -1, -1):
+            reserved[k] = reserved[k + 1] + (best[k][0] if self.wishlist[i + k].required else 0.0)
+        left = float("inf") if budget is None else budget - reserved[0]
+        if left < -1e-9:
+            return _INFEASIBLE
+
+        coverage, credits, rank = 0, 0.0, 0
+        for k, (low, high, best_rank) in enumerate(best):
+            if best_rank is None:
+                continue
+            required = self.wishlist[i + k].required
+            if not required and low > left + 1e-9:
+                continue
+            if not required:
+                left -= low
+            coverage += 1 << (n - 1 - i - k)
+            credits += high
+            rank -= best_rank
+        if budget is not None:
+            credits = min(credits, budget)
+        return (coverage, credits, rank)
+
+    def _search(self, i: int, mask: int, budget: Optional[float], prefix: tuple, chosen: tuple) -> tuple:
+        """
+        从心愿单第i门课程开始回溯，完整方案加入候选堆
+
+        mask已被裁剪为后续课程可能用到的位；剩余学分足够选上后续所有课程时按不限学分处理，
+        使不同路径到达的状态能共用记忆。返回该后缀状态所能达到的分数上界并记忆，
+        之后从其他路径到达相同状态时，若前缀分数加上该上界不能进入前limit名则直接剪枝
+
+        Returns:
+            tuple: 后缀分数上界
+        """
+        n = len(self._options)
+        if i == n:
+            if chosen:
+                self._offer(prefix, chosen)
+            return _ZERO
+        if budget is not None and budget >= self._suffix_credits[i] - 1e-9:
+            # 剩余学分足够选上后续所有课程，学分上限不再起作用
+            budget = None
+        key = (i, mask, budget)
+        bound = self._memo.get(key)
+        if bound is None:
+            bound = self._bound(i, mask, budget)
+        if not self._can_improve(_add(prefix, bound)):
+            self._memo[key] = bound
+            return bound
+
+        next_union = self._suffix_union[i + 1]
+        # 覆盖度按心愿单位置编码为二进制位，靠前的课程比其后所有课程加起来更重要
+        weight = 1 << (n - 1 - i)
+        best = _INFEASIBLE
+        for rank, section in enumerate(self._options[i]):
+            if section.mask & mask:
+                continue
+            if budget is not None and section.credits > budget + 1e-9:
+                continue
+            rest_budget = None if budget is None else round(budget - section.credits, 2)
+            head = (weight, section.credits, -rank)
+            sub = self._search(i + 1, (mask | section.mask) & next_union, rest_budget,
+                               _add(prefix, head), chosen + (section,))
+            best = max(best, _add(head, sub))
+        if not self.wishlist[i].required:
+            best = max(best, self._search(i + 1, mask & next_union, budget, prefix, chosen))
+
+        self._memo[key] = min(best, bound)
+        return self._memo[key]
+
+    def _can_improve(self, score: tuple) -> bool:
+        if score[0] < 0:
+            return False
+        return len(self._heap) < self._limit or score > self._heap[0][0]
+
+    def _offer(self, score: tuple, sections: tuple):
+        item = (score, next(self._counter), sections)
+        if len(self._heap) < self._limit:
+            heapq.heappush(self._heap, item)
+        elif score > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def plan(self, limit: int = 5) -> List[Plan]:
+        """
+        返回最优的limit个无冲突方案，按(心愿覆盖度, 学分, 教学班偏好)从优到劣排序
+
+        必选课程无法安排时返回空列表
+        """
+        with self._lock:
+            budget = None if self.max_credits is None else round(float(self.max_credits), 2)
+            # 记忆的上界与limit无关，但剪枝依赖当前候选堆，每次规划重新开始
+            self._memo = {}
+            self._heap = []
+            self._limit = limit
+            self._counter = itertools.count()
+            self._search(0, self._occupied & self._suffix_union[0], budget, _ZERO, ())
+            results = sorted(self._heap, reverse=True)
+        return [Plan(score, sections) for score, _, sections in results]
+
+    def best(self) -> Optional[Plan]:
+        """返回最优方案，没有可行方案时返回None"""
+        plans = self.plan(limit=1)
+        return plans[0] if plans else None
@@ -0,0 +1,170 @@
+"""
+此模块记录每门课程剩余人数（syrs）随时间的变化，
+每个选课代码（jx0404id）对应一个基于array的定长环形缓冲区，
+只在剩余人数变化时写入，内存占用有上限，可以长时间跟随轮询运行。
+"""
+import csv
+import os
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _SeatRing:
+    """定长环形缓冲区：时间戳 + 剩余人数"""
+
+    __slots__ = ("times", "values", "head", "size")
+
+    def __init__(self, capacity: int):
+        self.times = array("d", bytes(8 * capacity))
+        self.values = array("i", bytes(4 * capacity))
+        self.head = 0   # 下一次写入的位置
+        self.size = 0
+
+    def append(self, timestamp: float, value: int):
+        capacity = len(self.times)
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % capacity
+        if self.size < capacity:
+            self.size += 1
+
+    def last(self) -> Tuple[float, int]:
+        pos = (self.head - 1) % len(self.times)
+        return self.times[pos], self.values[pos]
+
+    def items(self):
+        """按时间顺序返回(时间戳, 剩余人数)"""
+        capacity = len(self.times)
+        start = (self.head - self.size) % capacity
+        for i in range(self.size):
+            pos = (start + i) % capacity
+            yield self.times[pos], self.values[pos]
+
+
+class SeatHistory:
+    """剩余人数时间序列"""
+
+    def __init__(self, capacity: int = 256):
+        """
+        :param capacity: 每门课程最多保留的变化记录条数
+        """
+        self.capacity = capacity
+        self._rings: Dict[str, _SeatRing] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rings)
+
+    def record(self, rows: Iterable[dict], timestamp: Optional[float] = None) -> List[tuple]:
+        """
+        记录一次课程数据刷新
+
+        Args:
+            rows: 接口返回的原始课程数据
+            timestamp: 刷新时间，默认为当前时间
+
+        Returns:
+            剩余人数发生变化的课程列表，元素为(jx0404id, 原剩余人数, 新剩余人数)，首次出现时原剩余人数为None
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        changes = []
+        with self._lock:
+            for row in rows:
+                jx0404id = row.get("jx0404id")
+                try:
+                    value = int(row.get("syrs"))
+                except (ValueError, TypeError):
+                    continue
+                if not jx0404id:
+                    continue
+                ring = self._rings.get(jx0404id)
+                if ring is None:
+                    ring = self._rings[jx0404id] = _SeatRing(self.capacity)
+                    old = None
+                else:
+                    old = ring.last()[1]
+                    if old == value:
+                        continue
+                ring.append(timestamp, value)
+                changes.append((jx0404id, old, value))
+        return changes
+
+    def series(self, jx0404id: str) -> List[Tuple[float, int]]:
+        """返回某门课程按时间排序的(时间戳, 剩余人数)记录"""
+        with self._lock:
+            ring = self._rings.get(jx0404id)
+            return list(ring.items()) if ring else []
+
+    def last_change(self, jx0404id: str) -> Optional[Tuple[float, Optional[int], int]]:
+        """
+        返回某门课程最近一次变化
+
+        Returns:
+            (变化时间, 原剩余人数, 新剩余人数)，没有记录时返回None
+        """
+        with self._lock:
+            ring = self._rings.get(jx0404id)
+            if ring is None:
+                return None
+            points = list(ring.items())[-2:]
+        if len(points) == 1:
+            return points[0][0], None, points[0][1]
+        return points[1][0], points[0][1], points[1][1]
+
+    def rate(self, jx0404id: str, window: float = 300, now: Optional[float] = None) -> Dict[str, float]:
+        """
+        计算最近一段时间内名额的释放和被抢占速度
+
+        Args:
+            jx0404id: 选课代码
+            window: 统计窗口，单位：秒，须大于0
+            now: 窗口结束时间，默认为当前时间
+
+        Returns:
+            dict: freed（每分钟释放的名额）、taken（每分钟被抢占的名额）、net（每分钟净变化）
+        """
+        if window <= 0:
+            raise ValueError(f"统计窗口必须大于0: {window}")
+        now = time.time() if now is None else now
+        since = now - window
+        freed = taken = 0
+        previous = None
+        for timestamp, value in self.series(jx0404id):
+            if previous is not None and since <= timestamp <= now:
+                delta = value - previous
+                if delta > 0:
+                    freed += delta
+                else:
+                    taken -= delta
+            previous = value
+        minutes = window / 60
+        return {
+            "freed": freed / minutes,
+            "taken": taken / minutes,
+            "net": (freed - taken) / minutes,
+        }
+
+    def export(self, path: str) -> int:
+        """
+        将所有记录导出为CSV文件（jx0404id, timestamp, syrs），写入临时文件后原子替换
+
+        Returns:
+            int: 导出的记录条数
+        """
+        with self._lock:
+            snapshot = {jx0404id: list(ring.items()) for jx0404id, ring in self._rings.items()}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        count = 0
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(("jx0404id", "timestamp", "syrs"))
+            for jx0404id, points in snapshot.items():
+                for timestamp, value in points:
+                    writer.writerow((jx0404id, f"{timestamp:.3f}", value))
+                    count += 1
+        os.replace(tmp_path, path)
+        return count
@@ -0,0 +1,69 @@
+"""
+此模块实现请求合并（single-flight）：
+同一键（接口、查询条件、选课轮次）的并发调用只执行一次，其余调用方等待并共享其结果。
+调用完成后不保留结果，数据的复用由响应缓存（session.cache）负责。
+界面、监视器和提交循环同时请求课程目录时，只会产生一次完整的分页获取。
+"""
+import threading
+from concurrent.futures import Future
+from typing import Callable, Hashable
+
+
+class SingleFlight:
+    """按键合并并发调用"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 键 -> 正在进行的调用的Future
+        self._calls = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        """
+        执行fn，或加入同一键正在进行的调用并等待其结果
+
+        Args:
+            key: 调用的键
+            fn: 无参数的获取函数
+
+        Returns:
+            fn的返回值（多个调用方共享同一个对象）；fn抛出的异常同样传给所有等待的调用方
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._executed += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(value)
+        return value
+
+    def in_flight(self, key: Hashable) -> bool:
+        """该键是否有正在进行的调用"""
+        with self._lock:
+            return key in self._calls
+
+    def metrics(self) -> dict:
+        """实际执行和合并等待的调用次数"""
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
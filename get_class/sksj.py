@@ -0,0 +1,83 @@
+"""
+此模块用于解析课程的上课时间（sksj）字段，
+将类似"1-16周 星期一 3-4节"的文本转换为结构化的时间段。
+"""
+import re
+from typing import List, NamedTuple, Optional, FrozenSet
+
+# 星期文字到数字的映射
+WEEKDAY_MAP = {'一': 1, '二': 2, '三': 3, '四': 4, '五': 5, '六': 6, '日': 7, '天': 7}
+
+# 多个时间段之间的分隔符
+_ENTRY_SPLIT_RE = re.compile(r'<br\s*/?>|[;；\n]', re.I)
+_WEEKDAY_RE = re.compile(r'(?:星期|周)([一二三四五六日天])')
+_PERIOD_RE = re.compile(r'第?\[?0*(\d+)(?:\s*-\s*0*(\d+))?\]?\s*节')
+_WEEKS_RE = re.compile(r'([\d,，\-\s]+?)\s*\(?周\)?(?![一二三四五六日天])(\s*\(?[单双]\)?)?')
+_ODD_EVEN_RE = re.compile(r'([单双])周')
+
+
+class TimeSlot(NamedTuple):
+    """一个上课时间段"""
+    weekday: int                        # 星期，1-7
+    start: int                          # 开始节次
+    end: int                            # 结束节次（包含）
+    weeks: Optional[FrozenSet[int]]     # 上课周次，None表示未注明
+
+    def periods(self):
+        """返回该时间段覆盖的所有节次"""
+        return range(self.start, self.end + 1)
+
+
+def _parse_weeks(entry: str) -> Optional[FrozenSet[int]]:
+    """解析周次，例如"1-16周"、"1,3,5周"、"1-16周(单)" """
+    # 去掉星期部分，避免"周一"中的"周"被当作周次后缀
+    text = _WEEKDAY_RE.sub(' ', entry)
+    match = _WEEKS_RE.search(text)
+    if not match or not match.group(1).strip(' ,，-'):
+        return None
+
+    weeks = set()
+    for part in re.split(r'[,，\s]+', match.group(1).strip()):
+        if not part:
+            continue
+        bounds = part.split('-')
+        try:
+            if len(bounds) == 2:
+                weeks.update(range(int(bounds[0]), int(bounds[1]) + 1))
+            else:
+                weeks.add(int(bounds[0]))
+        except ValueError:
+            continue
+
+    odd_even = _ODD_EVEN_RE.search(entry) or re.search(r'([单双])', match.group(2) or '')
+    if odd_even:
+        parity = 1 if odd_even.group(1) == '单' else 0
+        weeks = {w for w in weeks if w % 2 == parity}
+    return frozenset(weeks) if weeks else None
+
+
+def parse_sksj(sksj) -> List[TimeSlot]:
+    """
+    解析上课时间字段
+
+    Args:
+        sksj: 上课时间文本，可能包含多个以<br>或分号分隔的时间段
+
+    Returns:
+        TimeSlot列表，无法识别星期或节次的部分会被忽略
+    """
+    if not sksj or not isinstance(sksj, str):
+        return []
+
+    slots = []
+    for entry in _ENTRY_SPLIT_RE.split(sksj):
+        weekday_match = _WEEKDAY_RE.search(entry)
+        period_match = _PERIOD_RE.search(_WEEKDAY_RE.sub(' ', entry))
+        if not weekday_match or not period_match:
+            continue
+        start = int(period_match.group(1))
+        end = int(period_match.group(2) or start)
+        if end < start:
+            start, end = end, start
+        slots.append(TimeSlot(WEEKDAY_MAP[weekday_match.group(1)], start, end, _parse_weeks(entry)))
+    return slots
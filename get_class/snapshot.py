@@ -0,0 +1,311 @@
+"""
+此模块实现课程目录的二进制快照格式：定宽数值列 + 字符串表，
+读取时通过mmap映射文件，列直接以memoryview（安装了NumPy时为ndarray）的形式引用映射的内存，不做解析和复制，
+重启后的进程或其他本地工具可以在毫秒级打开最新的目录，多个读取方共享同一份页缓存。
+
+文件布局（小端序，各段按8字节对齐）：
+    文件头      魔数、版本、行数、列数、字符串数、快照时间
+    列目录      每列的名称、类型码（与array模块一致）和起始偏移
+    数值列      category（int8，类别代码在CATEGORIES中的下标）、xf（float64）、
+                xxrs/xkrs/czrs/syrs（int32，无法转换为整数时为NULL_INT）
+    原值列      __raw_<数值字段>，int32，无法转换为数值时保存原字符串（如"不限"、"-"）的编号，否则为空字符串
+    字符串列    STRING_FIELDS中的各字段，int32，为字符串表中的编号（相同字符串只存一次）
+    字符串表    __str_offsets（uint32，n+1个偏移）和__str_data（UTF-8字节）
+
+写入时先写临时文件再原子替换，已打开旧快照的读取方不受影响。
+"""
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import config
+from .filter import CATEGORY_LABELS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 默认快照路径
+DEFAULT_SNAPSHOT_PATH = os.path.join(config.CACHE_DIR, "catalog.snap")
+
+MAGIC = b"GRAKXSNP"
+VERSION = 2
+# 类别代码，category列存储其下标
+CATEGORIES = tuple(CATEGORY_LABELS)
+# 数值列及其类型码
+NUMERIC_FIELDS = (("xf", "d"), ("xxrs", "i"), ("xkrs", "i"), ("czrs", "i"), ("syrs", "i"))
+# 字符串列（与导出CSV的原始列一致）
+STRING_FIELDS = ("jx0404id", "kch", "kcmc", "skls", "xqid", "sksj", "skdd", "bj", "ctsm", "szkcflmc")
+# int32列中表示空值的哨兵
+NULL_INT = -2 ** 31
+# 数值列对应的原值列名前缀
+RAW_PREFIX = "__raw_"
+
+_HEADER = struct.Struct("<8sIIIId")
+_COLUMN = struct.Struct("<16s4sQ")
+_NUMPY_DTYPES = {"b": "<i1", "B": "u1", "i": "<i4", "I": "<u4", "d": "<f8"}
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return NULL_INT
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return float("nan")
+
+
+def write_snapshot(rows: Iterable[dict], path: str = DEFAULT_SNAPSHOT_PATH,
+                   snapshot_at: Optional[float] = None) -> int:
+    """
+    将课程数据写入二进制快照
+
+    Args:
+        rows: 原始课程数据，每条须带category字段（如export.iter_catalog的输出）
+        path: 快照路径
+        snapshot_at: 快照时间戳，默认为当前时间
+
+    Returns:
+        int: 写入的条数
+    """
+    snapshot_at = time.time() if snapshot_at is None else snapshot_at
+    strings: Dict[str, int] = {}
+    columns = {"category": array("b")}
+    columns.update((name, array(code)) for name, code in NUMERIC_FIELDS)
+    columns.update((RAW_PREFIX + name, array("i")) for name, _ in NUMERIC_FIELDS)
+    columns.update((name, array("i")) for name in STRING_FIELDS)
+    empty_id = strings.setdefault("", 0)
+
+    count = 0
+    for row in rows:
+        columns["category"].append(CATEGORIES.index(row["category"]))
+        for name, code in NUMERIC_FIELDS:
+            value = row.get(name)
+            number = _to_float(value) if code == "d" else _to_int(value)
+            columns[name].append(number)
+            # 无法转换为数值时保留原值，读取时原样还原
+            missing = number != number if code == "d" else number == NULL_INT
+            raw_id = strings.setdefault(str(value), len(strings)) if missing and value is not None else empty_id
+            columns[RAW_PREFIX + name].append(raw_id)
+        for name in STRING_FIELDS:
+            value = row.get(name)
+            text = "" if value is None else str(value)
+            columns[name].append(strings.setdefault(text, len(strings)))
+        count += 1
+
+    offsets = array("I", [0])
+    data = bytearray()
+    for text in strings:
+        data += text.encode("utf-8")
+        offsets.append(len(data))
+    columns["__str_offsets"] = offsets
+    columns["__str_data"] = array("B", data)
+
+    if sys.byteorder != "little":
+        for column in columns.values():
+            column.byteswap()
+
+    # 计算各列的偏移
+    position = _align(_HEADER.size + _COLUMN.size * len(columns))
+    layout = []
+    for name, column in columns.items():
+        layout.append((name, column, position))
+        position = _align(position + len(column) * column.itemsize)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, count, len(columns), len(strings), snapshot_at))
+            for name, column, offset in layout:
+                f.write(_COLUMN.pack(name.encode("ascii"), column.typecode.encode("ascii"), offset))
+            for name, column, offset in layout:
+                f.write(b"\0" * (offset - f.tell()))
+                column.tofile(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+class Snapshot:
+    """只读打开的二进制快照"""
+
+    def __init__(self, path: str = DEFAULT_SNAPSHOT_PATH, use_numpy: Optional[bool] = None):
+        """
+        :param path: 快照路径
+        :param use_numpy: 列是否以NumPy数组返回，默认在安装了NumPy时使用
+        """
+        self.path = path
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        if self.use_numpy and np is None:
+            raise ImportError("use_numpy=True 需要安装numpy")
+        if not self.use_numpy and sys.byteorder != "little":
+            raise ValueError("大端序平台上读取快照需要安装numpy")
+
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._columns = {}
+        self._str_offsets = self._str_data = None
+        magic, version, self.n_rows, n_columns, self.n_strings, self.snapshot_at = \
+            _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"不是受支持的课程快照文件: {path}")
+
+        # 列名 -> (类型码, 偏移)
+        self._layout = {}
+        for i in range(n_columns):
+            name, code, offset = _COLUMN.unpack_from(self._mmap, _HEADER.size + i * _COLUMN.size)
+            self._layout[name.rstrip(b"\0").decode("ascii")] = (code.rstrip(b"\0").decode("ascii"), offset)
+        self._str_offsets = self.column("__str_offsets")
+        offset = self._layout["__str_data"][1]
+        self._str_data = self._view[offset:offset + self._str_offsets[self.n_strings]]
+        self._ids = None
+
+    def close(self):
+        """关闭映射；仍有列视图被引用时由垃圾回收释放"""
+        self._columns.clear()
+        self._str_offsets = self._str_data = None
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.n_rows
+
+    def column(self, name: str):
+        """
+        返回一列的零拷贝视图
+
+        Returns:
+            numpy.ndarray（只读）或memoryview；字符串列的元素为字符串表中的编号，见string()
+        """
+        column = self._columns.get(name)
+        if column is not None:
+            return column
+        code, offset = self._layout[name]
+        if name == "__str_offsets":
+            count = self.n_strings + 1
+        elif name == "__str_data":
+            count = self._str_offsets[self.n_strings]
+        else:
+            count = self.n_rows
+        if self.use_numpy:
+            column = np.frombuffer(self._mmap, dtype=_NUMPY_DTYPES[code], count=count, offset=offset)
+        else:
+            size = struct.calcsize(code)
+            column = self._view[offset:offset + count * size].cast(code)
+        self._columns[name] = column
+        return column
+
+    def string(self, string_id: int) -> str:
+        """字符串表中编号对应的字符串"""
+        offsets = self._str_offsets
+        return str(self._str_data[offsets[string_id]:offsets[string_id + 1]], "utf-8")
+
+    def string_id(self, text: str) -> int:
+        """字符串在字符串表中的编号，不存在时返回-1"""
+        for string_id in range(self.n_strings):
+            if self.string(string_id) == text:
+                return string_id
+        return -1
+
+    def row(self, index: int) -> dict:
+        """
+        第index条课程，格式与接口返回的原始数据相同（只含快照保存的字段），并带有category字段
+
+        数值字段为int/float，无法转换为数值的保留原字符串（如"不限"），原值为None时为空字符串
+        """
+        row = {"category": CATEGORIES[self.column("category")[index]]}
+        for name, code in NUMERIC_FIELDS:
+            value = self.column(name)[index]
+            if code == "d" and value == value:
+                row[name] = float(value)
+            elif code != "d" and value != NULL_INT:
+                row[name] = int(value)
+            else:
+                row[name] = self.string(self.column(RAW_PREFIX + name)[index])
+        for name in STRING_FIELDS:
+            row[name] = self.string(self.column(name)[index])
+        return row
+
+    def __iter__(self) -> Iterator[dict]:
+        for index in range(self.n_rows):
+            yield self.row(index)
+
+    def get(self, jx0404id: str) -> Optional[dict]:
+        """按选课代码查找课程（首次调用时建立索引）"""
+        if self._ids is None:
+            ids = self.column("jx0404id")
+            self._ids = {self.string(ids[index]): index for index in range(self.n_rows)}
+        index = self._ids.get(jx0404id)
+        return self.row(index) if index is not None else None
+
+    def available(self) -> List[int]:
+        """
+        可选课程的下标，规则与filter.is_course_available相同：冲突情况为空，且剩余人数大于0；
+        剩余人数无法转换为整数时，只排除以"-"开头的原值（"0"总能转换为整数）
+        """
+        empty_id = self.string_id("")
+        ctsm = self.column("ctsm")
+        syrs = self.column("syrs")
+        raw = self.column(RAW_PREFIX + "syrs")
+        if self.use_numpy:
+            unparsed = (ctsm == empty_id) & (syrs == NULL_INT)
+            excluded = [string_id for string_id in np.unique(raw[unparsed]).tolist()
+                        if self.string(string_id).startswith("-")]
+            mask = (ctsm == empty_id) & ((syrs > 0) | (unparsed & ~np.isin(raw, excluded)))
+            return np.flatnonzero(mask).tolist()
+        excluded = {}
+        available = []
+        for index in range(self.n_rows):
+            if ctsm[index] != empty_id:
+                continue
+            if syrs[index] == NULL_INT:
+                string_id = raw[index]
+                if string_id not in excluded:
+                    excluded[string_id] = self.string(string_id).startswith("-")
+                if excluded[string_id]:
+                    continue
+            elif syrs[index] <= 0:
+                continue
+            available.append(index)
+        return available
+
+    def catalog(self):
+        """将快照加载为Catalog"""
+        from .catalog import Catalog
+
+        catalog = Catalog()
+        by_category = {}
+        for row in self:
+            by_category.setdefault(row.pop("category"), []).append(row)
+        for category, rows in by_category.items():
+            catalog.add(category, rows)
+        return catalog
@@ -0,0 +1,310 @@
+"""
+此模块实现可选的SQLite课程目录存储，
+将每次刷新得到的课程数据以批量upsert的方式写入数据库，并保留最近的历史快照，
+提供按类别、教师、上课时间和可选状态的索引查询，
+大型或历史目录无需全部加载到内存，多个本地工具也可共享同一份数据。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import config
+from .sksj import parse_sksj
+
+# 默认数据库路径
+DEFAULT_DB_PATH = os.path.join(config.CACHE_DIR, "catalog.sqlite3")
+# 每个类别默认保留的历史快照数，更早的快照及其课程记录在写入新快照时删除
+DEFAULT_MAX_SNAPSHOTS = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    jx0404id    TEXT PRIMARY KEY,
+    category    TEXT NOT NULL,
+    kch         TEXT,
+    kcmc        TEXT,
+    xf          TEXT,
+    skls        TEXT,
+    skdd        TEXT,
+    sksj        TEXT,
+    syrs        TEXT,
+    syrs_num    INTEGER,
+    ctsm        TEXT,
+    raw         TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_courses_category ON courses(category);
+CREATE INDEX IF NOT EXISTS idx_courses_skls ON courses(skls);
+
+CREATE TABLE IF NOT EXISTS course_slots (
+    jx0404id TEXT NOT NULL,
+    weekday  INTEGER NOT NULL,
+    period   INTEGER NOT NULL,
+    PRIMARY KEY (jx0404id, weekday, period)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_course_slots_time ON course_slots(weekday, period);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    category TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    total    INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS snapshot_rows (
+    snapshot_id INTEGER NOT NULL,
+    jx0404id    TEXT NOT NULL,
+    syrs        TEXT,
+    ctsm        TEXT,
+    PRIMARY KEY (snapshot_id, jx0404id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_snapshot_rows_course ON snapshot_rows(jx0404id);
+CREATE INDEX IF NOT EXISTS idx_snapshots_category ON snapshots(category, id);
+"""
+
+_UPSERT_SQL = """
+INSERT INTO courses (jx0404id, category, kch, kcmc, xf, skls, skdd, sksj,
+                     syrs, syrs_num, ctsm, raw, snapshot_id, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(jx0404id) DO UPDATE SET
+    category = excluded.category, kch = excluded.kch, kcmc = excluded.kcmc,
+    xf = excluded.xf, skls = excluded.skls, skdd = excluded.skdd, sksj = excluded.sksj,
+    syrs = excluded.syrs, syrs_num = excluded.syrs_num, ctsm = excluded.ctsm,
+    raw = excluded.raw, snapshot_id = excluded.snapshot_id, updated_at = excluded.updated_at
+"""
+
+# 与filter.py中的筛选条件一致：无冲突（缺少ctsm视为空），且剩余人数大于0（无法转换为整数时不以"-"开头）
+AVAILABLE_CONDITION = (
+    "COALESCE(c.ctsm, '') = '' AND (c.syrs_num > 0 OR "
+    "(c.syrs_num IS NULL AND COALESCE(c.syrs, '') NOT LIKE '-%'))"
+)
+
+
+def _to_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _text(value) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+class CatalogStore:
+    """基于SQLite的课程目录存储"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, max_snapshots: Optional[int] = DEFAULT_MAX_SNAPSHOTS):
+        """
+        :param path: 数据库路径，":memory:"为内存数据库
+        :param max_snapshots: 每个类别保留的历史快照数，为None时不删除
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_snapshots = max_snapshots
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        # WAL模式允许其他本地进程在写入期间并发读取
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------------------------------------------------------------- 写入
+
+    def save_snapshot(self, category: str, rows: Iterable[dict], full: bool = True) -> int:
+        """
+        在一个事务中批量写入一个类别的课程数据，并记录一次快照
+
+        Args:
+            category: 课程类别代码，见filter.CATEGORY_LABELS
+            rows: 接口返回的原始课程数据
+            full: 是否为该类别的完整数据，为True时删除本次未出现的课程
+
+        Returns:
+            int: 快照ID
+        """
+        now = time.time()
+        rows = [row for row in rows if row.get("jx0404id")]
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.execute(
+                    "INSERT INTO snapshots (category, taken_at, total) VALUES (?, ?, ?)",
+                    (category, now, len(rows)))
+                snapshot_id = cur.lastrowid
+
+                cur.executemany(_UPSERT_SQL, (
+                    (row["jx0404id"], category, _text(row.get("kch")), _text(row.get("kcmc")),
+                     _text(row.get("xf")), _text(row.get("skls")), _text(row.get("skdd")),
+                     _text(row.get("sksj")), _text(row.get("syrs")), _to_int(row.get("syrs")),
+                     _text(row.get("ctsm")), json.dumps(row, ensure_ascii=False),
+                     snapshot_id, now)
+                    for row in rows))
+
+                cur.executemany(
+                    "DELETE FROM course_slots WHERE jx0404id = ?",
+                    ((row["jx0404id"],) for row in rows))
+                cur.executemany(
+                    "INSERT OR IGNORE INTO course_slots (jx0404id, weekday, period) VALUES (?, ?, ?)",
+                    ((row["jx0404id"], slot.weekday, period)
+                     for row in rows
+                     for slot in parse_sksj(row.get("sksj"))
+                     for period in slot.periods()))
+
+                cur.executemany(
+                    "INSERT INTO snapshot_rows (snapshot_id, jx0404id, syrs, ctsm) VALUES (?, ?, ?, ?)",
+                    ((snapshot_id, row["jx0404id"], _text(row.get("syrs")), _text(row.get("ctsm")))
+                     for row in rows))
+
+                if full:
+                    cur.execute(
+                        "DELETE FROM course_slots WHERE jx0404id IN "
+                        "(SELECT jx0404id FROM courses WHERE category = ? AND snapshot_id != ?)",
+                        (category, snapshot_id))
+                    cur.execute(
+                        "DELETE FROM courses WHERE category = ? AND snapshot_id != ?",
+                        (category, snapshot_id))
+                if self.max_snapshots is not None:
+                    self._prune(cur, category, self.max_snapshots)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return snapshot_id
+
+    @staticmethod
+    def _prune(cur, category: str, keep: int) -> int:
+        """删除某类别最近keep个以外的快照及其课程记录（调用方需持有锁并开启事务），返回删除的快照数"""
+        row = cur.execute(
+            "SELECT id FROM snapshots WHERE category = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+            (category, max(keep, 1) - 1)).fetchone()
+        if row is None:
+            return 0
+        cur.execute(
+            "DELETE FROM snapshot_rows WHERE snapshot_id IN "
+            "(SELECT id FROM snapshots WHERE category = ? AND id < ?)", (category, row["id"]))
+        cur.execute("DELETE FROM snapshots WHERE category = ? AND id < ?", (category, row["id"]))
+        return cur.rowcount
+
+    def prune(self, keep: Optional[int] = None) -> int:
+        """
+        删除每个类别最近keep个以外的历史快照
+
+        :param keep: 保留的快照数，默认为max_snapshots
+        :return: 删除的快照数
+        """
+        keep = self.max_snapshots if keep is None else keep
+        if keep is None:
+            return 0
+        removed = 0
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                categories = [row["category"] for row in cur.execute("SELECT DISTINCT category FROM snapshots")]
+                for category in categories:
+                    removed += self._prune(cur, category, keep)
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+        return removed
+
+    # ---------------------------------------------------------------- 查询
+
+    def get(self, jx0404id: str) -> Optional[dict]:
+        """按选课代码查找课程，返回原始课程数据"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT raw FROM courses WHERE jx0404id = ?", (jx0404id,)).fetchone()
+        return json.loads(row["raw"]) if row else None
+
+    def query(self, category: Optional[str] = None, teacher: Optional[str] = None,
+              weekday: Optional[int] = None, period: Optional[int] = None,
+              available_only: bool = False, limit: Optional[int] = None) -> List[dict]:
+        """
+        按条件查询课程
+
+        Args:
+            category: 课程类别代码
+            teacher: 教师姓名（前缀匹配）
+            weekday: 上课星期，1-7
+            period: 上课节次，需与weekday一起使用
+            available_only: 只返回无冲突且有剩余名额的课程
+            limit: 最多返回的条数
+
+        Returns:
+            原始课程数据列表，每条附带category字段
+        """
+        sql = ["SELECT c.category, c.raw FROM courses c"]
+        where, params = [], []
+        if weekday is not None:
+            slot_sql = "SELECT jx0404id FROM course_slots WHERE weekday = ?"
+            params.append(weekday)
+            if period is not None:
+                slot_sql += " AND period = ?"
+                params.append(period)
+            where.append(f"c.jx0404id IN ({slot_sql})")
+        if category is not None:
+            where.append("c.category = ?")
+            params.append(category)
+        if teacher:
+            # 使用范围条件代替LIKE，以便命中skls索引
+            where.append("c.skls >= ? AND c.skls < ?")
+            params.extend((teacher, teacher + "\U0010ffff"))
+        if available_only:
+            where.append(AVAILABLE_CONDITION)
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        if limit is not None:
+            sql.append("LIMIT ?")
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(" ".join(sql), params).fetchall()
+        return [dict(json.loads(row["raw"]), category=row["category"]) for row in rows]
+
+    def counts(self, category: str) -> Dict[str, int]:
+        """返回某类别的课程总数和可选课程数"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*) AS total, COALESCE(SUM({AVAILABLE_CONDITION}), 0) AS available "
+                "FROM courses c WHERE c.category = ?", (category,)).fetchone()
+        return {"total": row["total"], "available": row["available"]}
+
+    def snapshots(self, category: Optional[str] = None, limit: int = 100) -> List[dict]:
+        """列出最近的快照"""
+        sql = "SELECT id, category, taken_at, total FROM snapshots"
+        params = []
+        if category is not None:
+            sql += " WHERE category = ?"
+            params.append(category)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def history(self, jx0404id: str) -> List[dict]:
+        """返回某门课程在历次快照中的剩余人数和冲突情况"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.taken_at, r.syrs, r.ctsm FROM snapshot_rows r "
+                "JOIN snapshots s ON s.id = r.snapshot_id "
+                "WHERE r.jx0404id = ? ORDER BY s.id", (jx0404id,)).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,88 @@
+"""
+此模块实现定向监视模式：
+只针对登记的课程或教师，通过公共选修课接口的服务端筛选参数（kcxx、skls、skxq、skjc、sfym）
+每个目标请求一小页数据，并报告剩余人数（syrs）的变化，
+不必在每个轮询周期下载完整的课程目录。
+"""
+import threading
+from typing import List, NamedTuple, Optional
+
+from .seats import SeatHistory
+from .xsxk import query_ggxxkxk_page
+
+
+class WatchTarget(NamedTuple):
+    """监视目标，字段对应接口的服务端筛选参数"""
+    kcxx: str = ""                          # 课程信息（课程名称或课程号）
+    skls: str = ""                          # 上课老师
+    skxq: str = ""                          # 上课星期
+    skjc: str = ""                          # 上课节次
+    jx0404id: Optional[str] = None          # 只关注该选课代码（同一课程有多个教学班时）
+
+    def describe(self) -> str:
+        parts = [f"{k}={v}" for k, v in zip(self._fields, self) if v]
+        return ", ".join(parts) or "(全部)"
+
+
+class CourseWatcher:
+    """定向监视公共选修课剩余人数"""
+
+    def __init__(self, targets=(), page_size: int = 15, history: Optional[SeatHistory] = None):
+        """
+        :param targets: 初始监视目标
+        :param page_size: 每个目标每次请求的条数
+        :param history: 剩余人数时间序列，默认新建
+        """
+        self.page_size = page_size
+        self.history = history if history is not None else SeatHistory()
+        self._targets: List[WatchTarget] = list(targets)
+        self._lock = threading.Lock()
+
+    @property
+    def targets(self) -> List[WatchTarget]:
+        with self._lock:
+            return list(self._targets)
+
+    def add(self, kcxx="", skls="", skxq="", skjc="", jx0404id=None) -> WatchTarget:
+        """登记一个监视目标"""
+        target = WatchTarget(kcxx, skls, skxq, skjc, jx0404id)
+        with self._lock:
+            if target not in self._targets:
+                self._targets.append(target)
+        return target
+
+    def remove(self, target: WatchTarget):
+        with self._lock:
+            if target in self._targets:
+                self._targets.remove(target)
+
+    def fetch_target(self, target: WatchTarget) -> List[dict]:
+        """获取单个目标当前匹配的课程"""
+        rows, total = query_ggxxkxk_page(
+            page=1, page_size=self.page_size,
+            kcxx=target.kcxx, skls=target.skls, skxq=target.skxq, skjc=target.skjc)
+        if total > self.page_size:
+            print(f"[watch] 目标 {target.describe()} 匹配{total}条，只监视前{self.page_size}条，建议缩小条件")
+        if target.jx0404id:
+            rows = [row for row in rows if row.get("jx0404id") == target.jx0404id]
+        return rows
+
+    def poll_once(self) -> List[tuple]:
+        """
+        依次查询所有目标并记录剩余人数
+
+        Returns:
+            剩余人数发生变化的课程列表，元素为(jx0404id, 原剩余人数, 新剩余人数, 课程数据)，
+            首次出现的课程原剩余人数为None
+        """
+        rows_by_id = {}
+        for target in self.targets:
+            try:
+                for row in self.fetch_target(target):
+                    rows_by_id[row.get("jx0404id")] = row
+            except Exception as e:
+                print(f"[watch] 查询目标 {target.describe()} 失败: {e}")
+        return [
+            (jx0404id, old, new, rows_by_id[jx0404id])
+            for jx0404id, old, new in self.history.record(rows_by_id.values())
+        ]
@@ -2,403 +2,366 @@
 此模块用于获取公共选修课数据，
 包含数据获取、分页处理和数据解析等功能。
 """
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urlencode, urlsplit
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import config
-from session.session import generate_headers
-
-# 创建包全局线程池
-# 线程池大小根据系统资源和API并发限制设置，这里设置为10个线程
-GLOBAL_THREAD_POOL = ThreadPoolExecutor(
-    max_workers=50, thread_name_prefix="MathX")
-
-# 通用的并行页面获取函数
-def _fetch_pages_concurrently(url, form_template, headers, total_pages, start_page=1, verbose=True):
+import profiling
+from session.cache import response_cache
+from session.course import get_current_round
+from session.supervisor import login_supervisor
+from .limiter import AIMDLimiter
+from .singleflight import SingleFlight
+
+# 包全局线程池，首次使用时创建
+# 线程池大小根据系统资源和API并发限制设置，这里设置为50个线程
+_GLOBAL_THREAD_POOL = None
+_THREAD_POOL_LOCK = threading.Lock()
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """返回包全局线程池，首次调用时创建"""
+    global _GLOBAL_THREAD_POOL
+    if _GLOBAL_THREAD_POOL is None:
+        with _THREAD_POOL_LOCK:
+            if _GLOBAL_THREAD_POOL is None:
+                # 开启threads分析项时统计每个任务的耗时
+                _GLOBAL_THREAD_POOL = profiling.instrument_pool(ThreadPoolExecutor(
+                    max_workers=50, thread_name_prefix="MathX"), name="global_thread_pool")
+    return _GLOBAL_THREAD_POOL
+
+
+def __getattr__(name):
+    # GLOBAL_THREAD_POOL 保持可用，但只在首次访问时创建
+    if name == "GLOBAL_THREAD_POOL":
+        return get_thread_pool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# 分页请求的自适应并发限制器，上限不超过线程池大小
+PAGE_LIMITER = AIMDLimiter(initial=4, max_limit=50)
+# 过载（超时、5xx等）失败的页面最多重新获取的轮数
+PAGE_RETRY_ROUNDS = 2
+# 每个类别获取页面的线程数；三个类别同时获取时合计接近PAGE_LIMITER的上限，实际在途请求数由限制器决定
+FETCH_WORKERS = 16
+
+
+# 课程目录获取的请求合并，键为(请求头模板名称, 查询条件, 选课轮次)；获取结果保存在响应缓存中
+CATALOG_FLIGHTS = SingleFlight()
+
+
+def get_fetch_metrics() -> dict:
+    """分页请求的并发上限、在途请求数和延迟等指标，以及目录获取的合并和缓存情况"""
+    return dict(PAGE_LIMITER.metrics(), flights=CATALOG_FLIGHTS.metrics(), cache=response_cache.metrics())
+
+
+class CatalogFetchError(Exception):
+    """某类别的部分或全部页面获取失败"""
+
+    def __init__(self, category, rows, errors):
+        """
+        :param category: 课程类别代码
+        :param rows: 成功获取的页面中的课程数据（不完整）
+        :param errors: 每一处失败的(阶段名称, 页码, 异常)，页码未知时为None
+        """
+        self.category = category
+        self.rows = rows
+        self.errors = errors
+        stage_name, page_num, error = errors[0]
+        super().__init__(f"{category}类课程有{len(errors)}处获取失败，"
+                         f"首个失败: {stage_name}阶段 第{page_num or '?'}页 {error}")
+
+
+def _fetch_and_cache(key, fetch):
+    """获取数据并写入响应缓存；获取期间该类别被失效（如提交了选课）时不写入，获取失败时抛出异常、不写入"""
+    token = response_cache.token(key)
+    rows = fetch()
+    # 只缓存非空结果，避免把失败的获取当作"没有课程"
+    if rows:
+        response_cache.put(key, rows, token=token)
+    return rows
+
+
+def _coalesced_fetch(endpoint, query, fetch, max_age=None):
     """
-    并行获取指定URL的多个页面数据
-
-    Args:
-        url: 请求URL
-        form_template: 表单模板
-        headers: 请求头
-        total_pages: 总页数
-        start_page: 起始页码，默认为1
-        verbose: 是否显示详细信息
-
-    Returns:
-        所有页面的合并数据列表
+    合并同一接口、查询条件和选课轮次的并发获取，返回结果的副本
+
+    :param endpoint: 请求头模板名称
+    :param query: 查询条件（URL查询字符串）
+    :param fetch: 实际获取数据的无参数函数
+    :param max_age: 可接受的数据年龄（秒），响应缓存中该时间内获取的数据直接复用（不超过接口的有效期，
+        传入math.inf表示只受有效期限制）；为None时总是等待一次获取
     """
-    all_data = []
-    futures = []
-
-    # 定义单个页面获取函数
-    def fetch_single_page(page_num):
-        try:
-            # 设置当前页的参数
-            current_form = form_template.copy()
-            current_form['sEcho'] = str(page_num)
-            current_form['iDisplayStart'] = str((page_num - 1) * 15)
-
-            # 生成请求体字符串
-            form_data_str = '&'.join(
-                [f'{k}={v}' for k, v in current_form.items()])
-
-            # 发送POST请求
-            if verbose:
-                print(f"正在并行获取第{page_num}页数据...")
-            response = requests.post(
-                url,
-                headers=headers,
-                data=form_data_str,
-                timeout=10
-            )
-
-            # 检查响应状态并解析JSON
-            if response.status_code == 200:
-                try:
-                    json_data = response.json()
-                    if 'aaData' in json_data and len(json_data['aaData']) > 0:
-                        return json_data['aaData']
-                except Exception as e:
-                    if verbose:
-                        print(f"第{page_num}页数据解析失败: {str(e)}")
-        except Exception as e:
-            if verbose:
-                print(f"获取第{page_num}页数据时发生错误: {str(e)}")
-        return []
-
-    # 提交页面获取任务（从start_page开始）
-    for page in range(start_page, total_pages + 1):
-        futures.append(GLOBAL_THREAD_POOL.submit(fetch_single_page, page))
-        # 添加短暂延迟避免请求过于集中
-        time.sleep(0.1)
-
-    # 收集结果
-    for future in as_completed(futures):
-        try:
-            page_data = future.result()
-            if page_data:
-                all_data.extend(page_data)
-        except Exception as e:
-            if verbose:
-                print(f"处理页面数据时发生错误: {str(e)}")
+    key = (endpoint, query, get_current_round())
+    if max_age:
+        rows = response_cache.get(key, max_age)
+        if rows is not None:
+            return list(rows)
+    rows = CATALOG_FLIGHTS.do(key, partial(_fetch_and_cache, key, fetch))
+    return list(rows)
 
-    return all_data
 
-# 通识课
-def get_ggxxkxk_data(verbose: bool = True):
+def _post_page(url, endpoint, form_data_str):
     """
-    获取公共选修课数据，包括多页内容
+    发送分页请求（调用方须已通过PAGE_LIMITER.acquire()获得许可），完成后归还许可并反馈延迟
 
-    :param verbose: 是否输出详细日志信息，默认为True
-    :return: 所有页面的课程数据列表
+    超时、连接错误和5xx/429响应视为服务器过载，限制器据此降低并发上限
     """
-    # 目标URL
-    target_url = config.BASE_URL + \
-        'xsxkkc/xsxkGgxxkxk?kcxx=&skls=&skxq=&skjc=&sfym=false&sfct=false&szjylb=&xq=&szkclb='
-
-    # 表单参数模板
-    form_template = {
-        'iColumns': '15',
-        'sColumns': '',
-        'iDisplayLength': '15',
-        'mDataProp_0': 'kch',
-        'mDataProp_1': 'kcmc',
-        'mDataProp_2': 'xf',
-        'mDataProp_3': 'skls',
-        'mDataProp_4': 'xqid',
-        'mDataProp_5': 'sksj',
-        'mDataProp_6': 'skdd',
-        'mDataProp_7': 'xxrs',
-        'mDataProp_8': 'xkrs',
-        'mDataProp_9': 'czrs',
-        'mDataProp_10': 'syrs',
-        'mDataProp_11': 'bj',
-        'mDataProp_12': 'ctsm',
-        'mDataProp_13': 'szkcflmc',
-        'mDataProp_14': 'czOper'
-    }
-
-    all_data = []
-
-    if verbose:
-        print("开始获取公共选修课数据...")
-
+    start = time.perf_counter()
     try:
-        # 先获取第一页数据以确定总页数
-        current_form = form_template.copy()
-        current_form['sEcho'] = '1'
-        current_form['iDisplayStart'] = '0'
-
-        # 生成请求体字符串
-        form_data_str = '&'.join([f'{k}={v}' for k, v in current_form.items()])
-        content_length = len(form_data_str.encode('utf-8'))
-
-        # 生成请求头
-        headers = generate_headers(
-            cookies=config.COOKIES,
-            is_post=True,
-            content_length=content_length
-        )
-        # 添加特定的头部
-        headers['X-Requested-With'] = 'XMLHttpRequest'
-        headers['Referer'] = 'http://jwxt.gdufe.edu.cn/jsxsd/xsxk/xsxkGgxxkxk'
-        headers['Accept'] = '*/*'
-
-        # 发送POST请求
-        if verbose:
-            print("正在获取第1页数据以确定总页数...")
-        response = requests.post(
-            target_url,
-            headers=headers,
+        # 会话失效时由登录监督者统一重新登录后重放
+        response = login_supervisor.request(
+            'POST',
+            url,
+            endpoint=endpoint,
             data=form_data_str,
             timeout=10
         )
+    except (requests.Timeout, requests.ConnectionError):
+        PAGE_LIMITER.release(None, overloaded=True)
+        raise
+    except BaseException:
+        PAGE_LIMITER.release(None)
+        raise
+    overloaded = response.status_code >= 500 or response.status_code == 429
+    PAGE_LIMITER.release(time.perf_counter() - start, overloaded=overloaded)
+    return response
+
+
+# 公共选修课接口，支持通过查询参数在服务端筛选
+GGXXKXK_URL = config.BASE_URL + 'xsxkkc/xsxkGgxxkxk'
+
+# 公共选修课表单参数模板
+GGXXKXK_FORM_TEMPLATE = {
+    'iColumns': '15',
+    'sColumns': '',
+    'iDisplayLength': '15',
+    'mDataProp_0': 'kch',
+    'mDataProp_1': 'kcmc',
+    'mDataProp_2': 'xf',
+    'mDataProp_3': 'skls',
+    'mDataProp_4': 'xqid',
+    'mDataProp_5': 'sksj',
+    'mDataProp_6': 'skdd',
+    'mDataProp_7': 'xxrs',
+    'mDataProp_8': 'xkrs',
+    'mDataProp_9': 'czrs',
+    'mDataProp_10': 'syrs',
+    'mDataProp_11': 'bj',
+    'mDataProp_12': 'ctsm',
+    'mDataProp_13': 'szkcflmc',
+    'mDataProp_14': 'czOper'
+}
+
+
+def build_ggxxkxk_url(kcxx='', skls='', skxq='', skjc='', sfym=False):
+    """
+    构建带服务端筛选条件的公共选修课接口URL
+
+    :param kcxx: 课程信息（课程名称或课程号）
+    :param skls: 上课老师
+    :param skxq: 上课星期
+    :param skjc: 上课节次
+    :param sfym: 是否只返回有余量的课程
+    :return: 接口URL
+    """
+    query = urlencode({
+        'kcxx': kcxx,
+        'skls': skls,
+        'skxq': skxq,
+        'skjc': skjc,
+        'sfym': 'true' if sfym else 'false',
+        'sfct': 'false',
+        'szjylb': '',
+        'xq': '',
+        'szkclb': ''
+    })
+    return f"{GGXXKXK_URL}?{query}"
+
+
+def query_ggxxkxk_page(page=1, page_size=15, **filters):
+    """
+    按筛选条件获取公共选修课的单页数据
 
-        # 检查响应状态
-        if response.status_code == 200:
-            # 解析JSON响应
-            try:
-                json_data = response.json()
-                # 提取课程数据
-                if 'aaData' in json_data:
-                    all_data.extend(json_data['aaData'])
-
-                    # 计算总页数
-                    total_records = json_data.get('iTotalRecords', 0)
-                    total_pages = (total_records + 14) // 15  # 向上取整
-
-                    if verbose:
-                        print(f"找到{total_records}条记录，共{total_pages}页")
-
-                    # 如果有多于1页的数据，并行获取剩余页面
-                    if total_pages > 1:
-                        # 并行获取第2到第total_pages页的数据
-                        additional_data = _fetch_pages_concurrently(
-                            target_url, form_template, headers, total_pages, start_page=2, verbose=verbose
-                        )
-                        all_data.extend(additional_data)
-            except Exception as e:
-                if verbose:
-                    print(f"数据解析失败: {str(e)}")
-        else:
-            if verbose:
-                print(f"请求失败，状态码：{response.status_code}")
-    except Exception as e:
-        if verbose:
-            print(f"获取数据时发生错误：{str(e)}")
+    :param page: 页码，从1开始
+    :param page_size: 每页条数
+    :param filters: 传给build_ggxxkxk_url的筛选条件
+    :return: (课程数据列表, 符合条件的总条数)
+    """
+    form = dict(GGXXKXK_FORM_TEMPLATE)
+    form['iDisplayLength'] = str(page_size)
+    form['sEcho'] = str(page)
+    form['iDisplayStart'] = str((page - 1) * page_size)
+    form_data_str = '&'.join([f'{k}={v}' for k, v in form.items()])
+
+    response = login_supervisor.request(
+        'POST',
+        build_ggxxkxk_url(**filters),
+        endpoint='ggxxkxk',
+        data=form_data_str,
+        timeout=10
+    )
+    response.raise_for_status()
+    json_data = response.json()
+    total = json_data.get('iTotalDisplayRecords', json_data.get('iTotalRecords', 0))
+    return json_data.get('aaData', []), int(total or 0)
+
+
+# 专业选修课程接口及表单参数模板
+XXXKXK_URL = config.BASE_URL + 'xsxkkc/xsxkXxxk'
+XXXKXK_FORM_TEMPLATE = {
+    'iColumns': '14',
+    'sColumns': '',
+    'iDisplayLength': '15',
+    'mDataProp_0': 'kch',
+    'mDataProp_1': 'kcmc',
+    'mDataProp_2': 'xf',
+    'mDataProp_3': 'skls',
+    'mDataProp_4': 'xqid',
+    'mDataProp_5': 'sksj',
+    'mDataProp_6': 'skdd',
+    'mDataProp_7': 'xxrs',
+    'mDataProp_8': 'xkrs',
+    'mDataProp_9': 'czrs',
+    'mDataProp_10': 'syrs',
+    'mDataProp_11': 'bj',
+    'mDataProp_12': 'ctsm',
+    'mDataProp_13': 'czOper'
+}
+
+# 学科基础、专业必修课程接口及表单参数模板
+XXKXK_URL = config.BASE_URL + 'xsxkkc/xsxkBxxk'
+XXKXK_FORM_TEMPLATE = {
+    'iColumns': '14',
+    'sColumns': '',
+    'iDisplayLength': '15',
+    'mDataProp_0': 'kch',
+    'mDataProp_1': 'kcmc',
+    'mDataProp_2': 'xf',
+    'mDataProp_3': 'skls',
+    'mDataProp_4': 'xqid',
+    'mDataProp_5': 'sksj',
+    'mDataProp_6': 'skdd',
+    'mDataProp_7': 'xxrs',
+    'mDataProp_8': 'xkrs',
+    'mDataProp_9': 'czrs',
+    'mDataProp_10': 'syrs',
+    'mDataProp_11': 'bj',
+    'mDataProp_12': 'ctsm',
+    'mDataProp_13': 'czOper'
+}
 
-    if verbose:
-        print(f"数据获取完成，共获取{len(all_data)}条课程记录")
-    return all_data
 
-# 专业选修
-def get_xxxkxk_data(verbose: bool = True):
+# 通识课
+def get_ggxxkxk_data(verbose: bool = True, kcxx='', skls='', skxq='', skjc='', sfym=False, max_age=None):
     """
-    获取专业选修数据，包括多页内容
+    获取公共选修课数据，包括多页内容
+
+    相同筛选条件的并发调用共享同一次获取
 
     :param verbose: 是否输出详细日志信息，默认为True
+    :param kcxx: 课程信息筛选条件，默认不筛选
+    :param skls: 上课老师筛选条件，默认不筛选
+    :param skxq: 上课星期筛选条件，默认不筛选
+    :param skjc: 上课节次筛选条件，默认不筛选
+    :param sfym: 是否只返回有余量的课程，默认为False
+    :param max_age: 可接受的数据年龄（秒），响应缓存中该时间内获取的数据直接复用，默认总是重新获取
     :return: 所有页面的课程数据列表
     """
-    # 目标URL
-    target_url = config.BASE_URL + 'xsxkkc/xsxkXxxk'
-
-    # 表单参数模板
-    form_template = {
-        'iColumns': '14',
-        'sColumns': '',
-        'iDisplayLength': '15',
-        'mDataProp_0': 'kch',
-        'mDataProp_1': 'kcmc',
-        'mDataProp_2': 'xf',
-        'mDataProp_3': 'skls',
-        'mDataProp_4': 'xqid',
-        'mDataProp_5': 'sksj',
-        'mDataProp_6': 'skdd',
-        'mDataProp_7': 'xxrs',
-        'mDataProp_8': 'xkrs',
-        'mDataProp_9': 'czrs',
-        'mDataProp_10': 'syrs',
-        'mDataProp_11': 'bj',
-        'mDataProp_12': 'ctsm',
-        'mDataProp_13': 'czOper'
-    }
+    target_url = build_ggxxkxk_url(kcxx=kcxx, skls=skls, skxq=skxq, skjc=skjc, sfym=sfym)
+    return _coalesced_fetch('ggxxkxk', urlsplit(target_url).query,
+                            partial(_fetch_ggxxkxk_data, target_url, verbose), max_age)
 
-    all_data = []
 
-    if verbose:
-        print("开始获取专业选修课程数据...")
+def _fetch_ggxxkxk_data(target_url, verbose=True):
+    """获取公共选修课数据（不合并），target_url为带筛选条件的接口URL"""
+    return _fetch_category_data("ts", target_url, verbose)
 
-    try:
-        # 先获取第一页数据以确定总页数
-        current_form = form_template.copy()
-        current_form['sEcho'] = '1'
-        current_form['iDisplayStart'] = '0'
-
-        # 生成请求体字符串
-        form_data_str = '&'.join([f'{k}={v}' for k, v in current_form.items()])
-        content_length = len(form_data_str.encode('utf-8'))
-
-        # 生成请求头
-        headers = generate_headers(
-            cookies=config.COOKIES,
-            is_post=True,
-            content_length=content_length
-        )
-        # 添加特定的头部
-        headers['X-Requested-With'] = 'XMLHttpRequest'
-        headers['Referer'] = 'http://jwxt.gdufe.edu.cn/jsxsd/xsxkkc/comeInXxxk'
-        headers['Accept'] = '*/*'
+# 专业选修
+def get_xxxkxk_data(verbose: bool = True, max_age=None):
+    """
+    获取专业选修数据，包括多页内容
 
-        # 发送POST请求
-        if verbose:
-            print("正在获取第1页数据以确定总页数...")
-        response = requests.post(
-            target_url,
-            headers=headers,
-            data=form_data_str,
-            timeout=10
-        )
+    并发调用共享同一次获取
 
-        # 检查响应状态
-        if response.status_code == 200:
-            # 解析JSON响应
-            try:
-                json_data = response.json()
-                # 提取课程数据
-                if 'aaData' in json_data:
-                    all_data.extend(json_data['aaData'])
-
-                    # 计算总页数
-                    total_records = json_data.get('iTotalRecords', 0)
-                    total_pages = (total_records + 14) // 15  # 向上取整
-
-                    if verbose:
-                        print(f"找到{total_records}条记录，共{total_pages}页")
-
-                    # 如果有多于1页的数据，并行获取剩余页面
-                    if total_pages > 1:
-                        # 并行获取第2到第total_pages页的数据
-                        additional_data = _fetch_pages_concurrently(
-                            target_url, form_template, headers, total_pages, start_page=2, verbose=verbose
-                        )
-                        all_data.extend(additional_data)
-            except Exception as e:
-                if verbose:
-                    print(f"数据解析失败: {str(e)}")
-        else:
-            if verbose:
-                print(f"请求失败，状态码：{response.status_code}")
-    except Exception as e:
-        if verbose:
-            print(f"获取数据时发生错误：{str(e)}")
+    :param verbose: 是否输出详细日志信息，默认为True
+    :param max_age: 可接受的数据年龄（秒），响应缓存中该时间内获取的数据直接复用，默认总是重新获取
+    :return: 所有页面的课程数据列表
+    """
+    return _coalesced_fetch('xxxkxk', '', partial(_fetch_xxxkxk_data, verbose), max_age)
 
-    if verbose:
-        print(f"数据获取完成，共获取{len(all_data)}条课程记录")
-    return all_data
+
+def _fetch_xxxkxk_data(verbose=True):
+    """获取专业选修数据（不合并）"""
+    return _fetch_category_data("zy", verbose=verbose)
 
 # 学科基础，专业必修
-def get_xxkxk_data(verbose: bool = True):
+def get_xxkxk_data(verbose: bool = True, max_age=None):
     """
     获取学科基础，专业必修数据，包括多页内容
 
+    并发调用共享同一次获取
+
     :param verbose: 是否输出详细日志信息，默认为True
+    :param max_age: 可接受的数据年龄（秒），响应缓存中该时间内获取的数据直接复用，默认总是重新获取
     :return: 所有页面的课程数据列表
     """
-    # 目标URL
-    target_url = config.BASE_URL + 'xsxkkc/xsxkBxxk'
-
-    # 表单参数模板
-    form_template = {
-        'iColumns': '14',
-        'sColumns': '',
-        'iDisplayLength': '15',
-        'mDataProp_0': 'kch',
-        'mDataProp_1': 'kcmc',
-        'mDataProp_2': 'xf',
-        'mDataProp_3': 'skls',
-        'mDataProp_4': 'xqid',
-        'mDataProp_5': 'sksj',
-        'mDataProp_6': 'skdd',
-        'mDataProp_7': 'xxrs',
-        'mDataProp_8': 'xkrs',
-        'mDataProp_9': 'czrs',
-        'mDataProp_10': 'syrs',
-        'mDataProp_11': 'bj',
-        'mDataProp_12': 'ctsm',
-        'mDataProp_13': 'czOper'
-    }
+    return _coalesced_fetch('xxkxk', '', partial(_fetch_xxkxk_data, verbose), max_age)
 
-    all_data = []
 
-    if verbose:
-        print("开始获取学科基础、专业必修课程数据...")
+def _fetch_xxkxk_data(verbose=True):
+    """获取学科基础、专业必修数据（不合并）"""
+    return _fetch_category_data("bx", verbose=verbose)
 
-    try:
-        # 先获取第一页数据以确定总页数
-        current_form = form_template.copy()
-        current_form['sEcho'] = '1'
-        current_form['iDisplayStart'] = '0'
-
-        # 生成请求体字符串
-        form_data_str = '&'.join([f'{k}={v}' for k, v in current_form.items()])
-        content_length = len(form_data_str.encode('utf-8'))
-
-        # 生成请求头
-        headers = generate_headers(
-            cookies=config.COOKIES,
-            is_post=True,
-            content_length=content_length
-        )
-        # 添加特定的头部
-        headers['X-Requested-With'] = 'XMLHttpRequest'
-        headers['Referer'] = 'http://jwxt.gdufe.edu.cn/jsxsd/xsxkkc/comeInBxxk'
-        headers['Accept'] = '*/*'
 
-        # 发送POST请求
-        if verbose:
-            print("正在获取第1页数据以确定总页数...")
-        response = requests.post(
-            target_url,
-            headers=headers,
-            data=form_data_str,
-            timeout=10
-        )
+# 课程类别代码 -> (接口URL, 表单参数模板, 请求头模板名称)，类别代码见filter.CATEGORY_LABELS
+CATEGORY_ENDPOINTS = {
+    "zy": (XXXKXK_URL, XXXKXK_FORM_TEMPLATE, 'xxxkxk'),
+    "bx": (XXKXK_URL, XXKXK_FORM_TEMPLATE, 'xxkxk'),
+    "ts": (build_ggxxkxk_url(), GGXXKXK_FORM_TEMPLATE, 'ggxxkxk'),
+}
+
+
+def _fetch_category_data(category, url=None, verbose=True):
+    """
+    通过获取→解析流水线获取某类别的全部页面（不合并），返回课程数据列表
+
+    第1页确定总页数后，其余页面由FETCH_WORKERS个线程获取，同时在途的页面数受PAGE_LIMITER控制；
+    任一页面获取或解析失败时抛出CatalogFetchError（带有其余页面的数据），不把不完整的数据当作完整的目录返回
+
+    :param category: 课程类别代码（zy、bx、ts）
+    :param url: 可选，代替CATEGORY_ENDPOINTS中的接口URL（如带筛选条件的公共选修课接口）
+    :param verbose: 是否输出详细日志信息
+    """
+    from .filter import CATEGORY_LABELS
+    from .pipeline import catalog_pipeline
 
-        # 检查响应状态
-        if response.status_code == 200:
-            # 解析JSON响应
-            try:
-                json_data = response.json()
-                # 提取课程数据
-                if 'aaData' in json_data:
-                    all_data.extend(json_data['aaData'])
-
-                    # 计算总页数
-                    total_records = json_data.get('iTotalRecords', 0)
-                    total_pages = (total_records + 14) // 15  # 向上取整
-
-                    if verbose:
-                        print(f"找到{total_records}条记录，共{total_pages}页")
-
-                    # 如果有多于1页的数据，并行获取剩余页面
-                    if total_pages > 1:
-                        # 并行获取第2到第total_pages页的数据
-                        additional_data = _fetch_pages_concurrently(
-                            target_url, form_template, headers, total_pages, start_page=2, verbose=verbose
-                        )
-                        all_data.extend(additional_data)
-            except Exception as e:
-                if verbose:
-                    print(f"数据解析失败: {str(e)}")
-        else:
-            if verbose:
-                print(f"请求失败，状态码：{response.status_code}")
-    except Exception as e:
+    def on_error(stage_name, item, error):
         if verbose:
-            print(f"获取数据时发生错误：{str(e)}")
+            page = f"第{item[1]}页" if item is not None else ""
+            print(f"获取{page}数据时发生错误（{stage_name}）: {error}")
+
+    endpoints = None
+    if url is not None:
+        _, form_template, endpoint = CATEGORY_ENDPOINTS[category]
+        endpoints = {category: (url, form_template, endpoint)}
+    if verbose:
+        print(f"开始获取{CATEGORY_LABELS[category]}数据...")
+
+    all_data = []
+    pipeline = catalog_pipeline((category,), fetch_workers=FETCH_WORKERS, on_error=on_error, endpoints=endpoints)
+    for _, rows in pipeline.results():
+        all_data.extend(rows)
 
     if verbose:
-        print(f"数据获取完成，共获取{len(all_data)}条课程记录")
+        print(f"数据获取完成，共获取{len(all_data)}条课程记录，{len(pipeline.errors)}页失败")
+        print(f"并发指标: {get_fetch_metrics()}")
+    if pipeline.errors:
+        raise CatalogFetchError(category, all_data, [
+            (stage_name, item[1] if item is not None and stage_name in ("fetch", "parse") else None, error)
+            for stage_name, item, error in pipeline.errors
+        ])
     return all_data
@@ -2,16 +2,36 @@
 自动抢课系统
 """
 import threading
-import time
+import events
 from config import set_user_credentials
-from session import auto_login, check_login_status
-from get_class import get_and_filter_all_courses
+from session import check_login_status, login_supervisor
+from get_class import get_class, SeatHistory
 from post_class import post_class
 
+# 登录状态检查间隔，单位：秒
+LOGIN_CHECK_INTERVAL = 300
+# 课程数据刷新间隔，单位：秒；为None时不自动刷新
+CATALOG_REFRESH_INTERVAL = None
+
+
+def _run_exclusive(lock, target):
+    """在后台线程中执行target，同一时间只允许一个实例运行"""
+    if not lock.acquire(blocking=False):
+        return
+
+    def worker():
+        try:
+            target()
+        finally:
+            lock.release()
+
+    threading.Thread(target=worker, daemon=True).start()
+
 
 def main():
     """
-    主函数，用于调用自动登录功能并获取选课轮次信息、课程数据。
+    主函数：在事件循环中维护登录状态，并在课程数据变化时做出响应。
+    没有事件时主线程阻塞等待，不占用CPU；Ctrl+C退出。
     """
     # 设置用户凭证信息
     # 可以根据需要传入不同的参数，None表示不更新该参数
@@ -21,30 +41,57 @@ def main():
         cookies={'JSESSIONID': ''}  # 替换为实际Cookie
     )
 
-    # 创建并启动登录维护线程
-    threading.Thread(target=auto_login, daemon=True).start()
-    # 等待登录完成
-    while not check_login_status():
-        print("等待登录完成...")
-        time.sleep(1)
+    loop = events.DEFAULT_LOOP
+    login_lock = threading.Lock()
+    refresh_lock = threading.Lock()
+    history = SeatHistory()
+    refresh_timer = None
 
-    while True:
-        try:
-            if check_login_status():
-                # 获取课程
-                # all_courses = get_and_filter_all_courses()
-                # course_id = "202520261007196"
-                # a=post_class(course_id)
-                # print(a)
-                """
-                'success': True, 'data': '{"success":false,"message":"选课失败：与已选中课程‘体育养生 ’冲突"}\r\n', 'course_id': '202520261007196'}
-                """
-            else:
-                print("登录失效，等待重新登录...")
-                auto_login(check_inter=1)
-        except KeyboardInterrupt:
-            print('用户手动中断程序')
-            break
+    def do_login():
+        # 由登录监督者执行，与抓取线程触发的重新登录合并为一次；完成后发布LOGIN_STATE事件
+        login_supervisor.relogin()
+
+    def check_login():
+        if not check_login_status():
+            _run_exclusive(login_lock, do_login)
+
+    def refresh_catalog():
+        changes = []
+        for future in get_class():
+            try:
+                rows = future.result()
+            except Exception as e:
+                # 只获取到部分页面时仍记录这些页面的剩余人数
+                print(f"获取课程数据失败: {e}")
+                rows = getattr(e, "rows", None) or []
+            changes.extend(c for c in history.record(rows) if c[1] is not None)
+        if changes:
+            loop.publish(events.CATALOG_DIFF, changes)
+
+    def on_login_state(logged_in):
+        nonlocal refresh_timer
+        if not logged_in:
+            _run_exclusive(login_lock, do_login)
+        elif CATALOG_REFRESH_INTERVAL and refresh_timer is None:
+            refresh_timer = loop.call_every(
+                CATALOG_REFRESH_INTERVAL, _run_exclusive, refresh_lock, refresh_catalog)
+
+    def on_catalog_diff(changes):
+        for jx0404id, old, new in changes:
+            print(f"课程 {jx0404id} 剩余人数 {old} -> {new}")
+            # 有名额释放时提交选课
+            # if new > 0:
+            #     a = post_class(jx0404id)
+            #     print(a)
+            """
+            'success': True, 'data': '{"success":false,"message":"选课失败：与已选中课程‘体育养生 ’冲突"}\r\n', 'course_id': '202520261007196'}
+            """
+
+    loop.subscribe(events.LOGIN_STATE, on_login_state)
+    loop.subscribe(events.CATALOG_DIFF, on_catalog_diff)
+    # 立即检查一次登录状态，之后按固定间隔检查
+    loop.call_every(LOGIN_CHECK_INTERVAL, check_login)
+    loop.run()
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
-import requests
-from session.session import generate_headers
+import events
+from session.cache import response_cache
+from session.supervisor import login_supervisor
 import config
 
 def post_class(course_id):
@@ -9,21 +10,23 @@ def post_class(course_id):
     :return: 选课结果
     """
     try:
-        # 生成请求头
-        headers = generate_headers(config.COOKIES)
+        result = _post_class(course_id)
+    finally:
+        # 无论成功与否，公共选修课的剩余人数都可能已变化，丢弃该类别的缓存
+        response_cache.invalidate('ggxxkxk')
+    events.publish(events.ENROLLMENT, result)
+    return result
 
-        # 添加X-Requested-With头部，设置为XMLHttpRequest表示这是AJAX请求
-        headers['X-Requested-With'] = 'XMLHttpRequest'
-
-        # 更新Referer头部
-        headers['Referer'] = config.BASE_URL + 'xsxkkc/comeInGgxxkxk'
 
+def _post_class(course_id):
+    """提交选课请求，返回选课结果"""
+    try:
         # 构建请求URL
         # jx0404id参数为课程ID，xkzy为空，trjf为空，cxxdlx=1表示选课类型
         url = f"{config.BASE_URL}xsxkkc/ggxxkxkOper?jx0404id={course_id}&xkzy=&trjf=&cxxdlx=1"
 
-        # 发送GET请求
-        response = requests.get(url, headers=headers, timeout=10)
+        # 发送GET请求（预构建的选课请求头；会话失效时自动重新登录后重放）
+        response = login_supervisor.request('GET', url, endpoint='ggxxkxk_oper', timeout=10)
 
         # 检查请求是否成功
         if response.status_code == 200:
@@ -0,0 +1,204 @@
+"""
+性能分析钩子
+
+通过环境变量（或命令行参数 --profile）开启，无需修改代码：
+    GRAKX_PROFILE=cpu,memory,threads   开启的分析项，all表示全部
+    GRAKX_PROFILE_DIR=profiles         报告输出目录
+
+    cpu      对被@profiled装饰的热点函数逐次调用做cProfile，输出.prof和文本摘要
+    memory   在被@profiled(memory=True)装饰的函数前后做tracemalloc快照，输出内存增长
+    threads  统计全局线程池中每个任务的耗时，按线程汇总，进程退出时输出
+
+开关在装饰/创建线程池时读取：未开启时装饰器直接返回原函数，线程池保持原样，没有任何额外开销，
+cProfile、tracemalloc等模块也只在开启时才导入。
+因此需要在导入被装饰的模块之前设置（命令行入口会先处理 --profile 再导入其他模块）。
+"""
+import atexit
+import functools
+import itertools
+import os
+import threading
+import time
+from collections import defaultdict
+
+# 所有分析项
+PROFILE_MODES = ("cpu", "memory", "threads")
+
+
+def _read_modes():
+    value = os.environ.get("GRAKX_PROFILE", "")
+    modes = {m.strip().lower() for m in value.split(",") if m.strip()}
+    if "all" in modes:
+        return set(PROFILE_MODES)
+    return modes & set(PROFILE_MODES)
+
+
+ENABLED_MODES = _read_modes()
+PROFILE_DIR = os.environ.get("GRAKX_PROFILE_DIR", "profiles")
+
+# 同一时间只允许一个cProfile实例（Python 3.12起cProfile基于全局的sys.monitoring）
+_CPU_LOCK = threading.Lock()
+_report_seq = itertools.count(1)
+
+
+def configure(modes=None, directory=None):
+    """
+    设置分析项和报告目录（供命令行入口在导入其他模块前调用）
+
+    :param modes: 分析项，字符串（逗号分隔）或集合
+    :param directory: 报告输出目录
+    """
+    global ENABLED_MODES, PROFILE_DIR
+    if modes is not None:
+        if isinstance(modes, str):
+            os.environ["GRAKX_PROFILE"] = modes
+        else:
+            os.environ["GRAKX_PROFILE"] = ",".join(modes)
+        ENABLED_MODES = _read_modes()
+    if directory is not None:
+        os.environ["GRAKX_PROFILE_DIR"] = directory
+        PROFILE_DIR = directory
+
+
+def enabled(mode=None):
+    """是否开启了指定分析项（mode为None时表示任一分析项）"""
+    return bool(ENABLED_MODES) if mode is None else mode in ENABLED_MODES
+
+
+def _report_path(name, suffix):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(PROFILE_DIR, f"{name}-{stamp}-{os.getpid()}-{next(_report_seq)}{suffix}")
+
+
+def _write_cpu_report(name, profiler):
+    import io
+    import pstats
+
+    path = _report_path(name, ".prof")
+    profiler.dump_stats(path)
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(30)
+    with open(path[:-5] + ".txt", "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+
+
+def _write_memory_report(name, before, after, elapsed):
+    import tracemalloc
+
+    stats = after.compare_to(before, "lineno")
+    current, peak = tracemalloc.get_traced_memory()
+    with open(_report_path(name, ".mem.txt"), "w", encoding="utf-8") as f:
+        f.write(f"耗时: {elapsed:.3f} 秒  当前: {current / 1024:.1f} KiB  峰值: {peak / 1024:.1f} KiB\n\n")
+        for stat in stats[:30]:
+            f.write(f"{stat}\n")
+
+
+def profiled(name, memory=False):
+    """
+    热点函数分析装饰器
+
+    :param name: 报告名称
+    :param memory: 是否在开启memory分析项时记录该函数前后的内存快照
+    """
+    use_cpu = "cpu" in ENABLED_MODES
+    use_memory = memory and "memory" in ENABLED_MODES
+
+    def decorator(func):
+        if not (use_cpu or use_memory):
+            return func
+
+        import cProfile
+        import tracemalloc
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if use_memory:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(10)
+                tracemalloc.reset_peak()
+                before = tracemalloc.take_snapshot()
+            start = time.perf_counter()
+
+            # 嵌套调用或其他线程正在分析时直接执行
+            profiler = None
+            if use_cpu and _CPU_LOCK.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    _CPU_LOCK.release()
+                    profiler = None
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                    _CPU_LOCK.release()
+                    _write_cpu_report(name, profiler)
+                if use_memory:
+                    _write_memory_report(name, before, tracemalloc.take_snapshot(),
+                                         time.perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+class _ThreadTimes:
+    """线程池任务耗时统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 线程名 -> [任务数, 总耗时, 最长耗时]
+        self._stats = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def add(self, thread_name, elapsed):
+        with self._lock:
+            stat = self._stats[thread_name]
+            stat[0] += 1
+            stat[1] += elapsed
+            stat[2] = max(stat[2], elapsed)
+
+    def report(self):
+        with self._lock:
+            items = sorted(self._stats.items())
+        lines = [f"{'线程':<24}{'任务数':>8}{'总耗时(s)':>12}{'平均(ms)':>12}{'最长(ms)':>12}"]
+        for thread_name, (count, total, longest) in items:
+            lines.append(f"{thread_name:<26}{count:>8}{total:>12.3f}{total / count * 1000:>12.1f}{longest * 1000:>12.1f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, name):
+        if not self._stats:
+            return
+        with open(_report_path(name, ".threads.txt"), "w", encoding="utf-8") as f:
+            f.write(self.report())
+
+
+def instrument_pool(pool, name="thread_pool"):
+    """
+    开启threads分析项时，统计线程池中每个任务的耗时，进程退出时写出报告；未开启时原样返回
+
+    :param pool: concurrent.futures.ThreadPoolExecutor
+    :param name: 报告名称
+    """
+    if "threads" not in ENABLED_MODES:
+        return pool
+
+    times = _ThreadTimes()
+    submit = pool.submit
+
+    def timed_submit(fn, *args, **kwargs):
+        def task():
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                times.add(threading.current_thread().name, time.perf_counter() - start)
+
+        return submit(task)
+
+    pool.submit = timed_submit
+    pool.thread_times = times
+    atexit.register(times.write, name)
+    return pool
@@ -0,0 +1,137 @@
+"""
+选课轮次开放调度
+
+根据get_xklc_list返回的轮次开始时间（服务器时间），在开放前lead_time秒预热：
+登录、校准服务器时钟、建立连接、刷新轮次缓存并执行调用方的准备工作；
+然后在校正后的开放时刻（扣除单程网络延迟）触发预先准备好的操作，
+使开放时刻的延迟只取决于网络，而不是本地定时器的精度。
+"""
+import threading
+import time
+
+import config
+import events
+from session import get_xklc_list, login_supervisor
+from session.clock import server_clock
+from session.course import parse_xklc_time
+from session import http
+
+# 默认提前预热的时间，单位：秒
+DEFAULT_LEAD_TIME = 60
+# 距触发时刻不足该值时改为忙等，避免sleep的唤醒误差，单位：秒
+_SPIN_THRESHOLD = 0.02
+
+
+def next_round(rounds=None, now=None):
+    """返回尚未开放的最早轮次，没有时返回None"""
+    rounds = get_xklc_list() if rounds is None else rounds
+    now = server_clock.now() if now is None else now
+    upcoming = [
+        (start, item) for item in rounds
+        if (start := parse_xklc_time(item.get("start_time", ""))) is not None and start > now
+    ]
+    return min(upcoming, key=lambda pair: pair[0])[1] if upcoming else None
+
+
+def sleep_until(local_timestamp: float):
+    """睡眠到本地时间戳，最后一小段忙等以获得毫秒级精度"""
+    while True:
+        remaining = local_timestamp - time.time()
+        if remaining <= 0:
+            return
+        if remaining > _SPIN_THRESHOLD:
+            time.sleep(remaining - _SPIN_THRESHOLD)
+
+
+class RoundScheduler:
+    """选课轮次开放调度器"""
+
+    def __init__(self, loop=None, lead_time=DEFAULT_LEAD_TIME, clock=None, warm_connections=8):
+        """
+        :param loop: 事件循环，默认为events.DEFAULT_LOOP
+        :param lead_time: 开放前多少秒开始预热
+        :param clock: 服务器时钟，默认为session.clock.server_clock
+        :param warm_connections: 预热时建立的连接数
+        """
+        self.loop = loop or events.DEFAULT_LOOP
+        self.lead_time = lead_time
+        self.clock = clock or server_clock
+        self.warm_connections = warm_connections
+
+    def schedule(self, action, xklc=None, prepare=None):
+        """
+        安排在轮次开放时执行action
+
+        Args:
+            action: 开放时刻调用的函数，参数为prepare的返回值（未提供prepare时为None）
+            xklc: 选课轮次（get_xklc_list返回的元素），默认为尚未开放的最早轮次
+            prepare: 预热阶段调用的准备函数，如预先获取课程目录、规划课表
+
+        Returns:
+            预热定时器，可通过loop.cancel取消；没有可安排的轮次时返回None
+        """
+        xklc = xklc or next_round()
+        if xklc is None:
+            print("[scheduler] 没有尚未开放的选课轮次")
+            return None
+        open_at = parse_xklc_time(xklc.get("start_time", ""))
+        if open_at is None:
+            print(f"[scheduler] 无法解析轮次开始时间: {xklc.get('start_time')}")
+            return None
+
+        delay = max(0.0, self.clock.to_local(open_at) - self.lead_time - time.time())
+        print(f"[scheduler] 轮次 {xklc.get('xk_name', '')} 将于 {xklc.get('start_time')} 开放，"
+              f"{delay:.0f}秒后开始预热")
+        # 预热涉及网络请求，放到后台线程执行，不阻塞事件循环
+        return self.loop.call_later(delay, self._start_thread, self._prewarm, xklc, open_at, action, prepare)
+
+    @staticmethod
+    def _start_thread(target, *args):
+        threading.Thread(target=target, args=args, daemon=True, name="round_scheduler").start()
+
+    def _prewarm(self, xklc, open_at, action, prepare):
+        try:
+            self._prewarm_and_fire(xklc, open_at, action, prepare)
+        except Exception as e:
+            # 调用方通常在等待触发后停止事件循环，异常终止时须通知它，否则循环永远不会退出
+            print(f"[scheduler] 调度异常终止: {e}")
+            self.loop.publish(events.ROUND_FAILED, e)
+
+    def _prewarm_and_fire(self, xklc, open_at, action, prepare):
+        print("[scheduler] 开始预热...")
+        # 预热的每一步失败都只影响开放时刻的延迟，记录后继续，仍按时触发
+        try:
+            login_supervisor.ensure_login()
+        except Exception as e:
+            print(f"[scheduler] 预热登录失败: {e}")
+        try:
+            offset = self.clock.sync()
+            print(f"[scheduler] 服务器时钟偏差 {offset * 1000:+.0f} ms "
+                  f"(±{(self.clock.uncertainty or 0) * 1000:.0f} ms, RTT {(self.clock.rtt or 0) * 1000:.0f} ms)")
+        except Exception as e:
+            print(f"[scheduler] 校准服务器时钟失败，沿用偏差 {self.clock.offset * 1000:+.0f} ms: {e}")
+        try:
+            http.warm_up(config.BASE_URL, self.warm_connections)
+        except Exception as e:
+            print(f"[scheduler] 预热连接失败: {e}")
+        try:
+            get_xklc_list(use_cache=False)
+        except Exception as e:
+            print(f"[scheduler] 刷新选课轮次失败: {e}")
+        payload = None
+        if prepare is not None:
+            try:
+                payload = prepare()
+            except Exception as e:
+                print(f"[scheduler] 准备工作失败: {e}")
+
+        # 请求在开放时刻到达服务器：提前单程延迟（RTT的一半）发出
+        fire_at = self.clock.to_local(open_at) - (self.clock.rtt or 0.0) / 2
+        sleep_until(fire_at)
+        fired_at = time.time()
+        self.loop.publish(events.ROUND_OPEN, xklc)
+        try:
+            action(payload)
+        except Exception as e:
+            print(f"[scheduler] 开放时刻的操作失败: {e}")
+        print(f"[scheduler] 已在开放时刻触发（计划偏差 {(fired_at - fire_at) * 1000:.1f} ms）")
@@ -1,10 +1,43 @@
 """
 自动登录模块
+
+子模块（尤其是依赖cv2、ddddocr等重型库的验证码识别）在首次访问对应属性时才会导入。
 """
+import importlib
 import time
 import config
-from .session import login, check_login_status
-from .course import get_xklc_list, enter_xsk_system
+
+# 属性名 -> 所在子模块，首次访问时导入
+_LAZY_ATTRS = {
+    "login": ".session",
+    "check_login_status": ".session",
+    "get_headers": ".session",
+    "get_xklc_list": ".course",
+    "select_xklc": ".course",
+    "invalidate_xklc_cache": ".course",
+    "enter_xsk_system": ".course",
+    "get_current_round": ".course",
+    "LoginSupervisor": ".supervisor",
+    "login_supervisor": ".supervisor",
+    "is_session_expired": ".supervisor",
+    "ServerClock": ".clock",
+    "server_clock": ".clock",
+    "ResponseCache": ".cache",
+    "response_cache": ".cache",
+}
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
 
 
 def auto_login(check_inter=18000):
@@ -13,6 +46,9 @@ def auto_login(check_inter=18000):
     程序会以指定的时间间隔检查登录状态，若未登录则重新登录，
     可通过键盘中断（Ctrl+C）退出程序。
     """
+    from .session import check_login_status
+    from .supervisor import login_supervisor
+
     print("登录维护线程启动...")
     print(f"目标系统: {config.BASE_URL}")
 
@@ -20,9 +56,8 @@ def auto_login(check_inter=18000):
     while True:
         # 检查登录状态
         if not check_login_status():
-            # 如果未登录，立即执行login()函数
-            login()
-            enter_xsk_system()
+            # 如果未登录，通过登录监督者重新登录（与其他线程触发的登录合并为一次）
+            login_supervisor.relogin()
 
         # 等待下一次检查
         time.sleep(check_interval)
@@ -31,7 +66,18 @@ def auto_login(check_inter=18000):
 __all__ = [
     "login",
     "check_login_status",
+    "get_headers",
     "auto_login",
     "get_xklc_list",
-    "enter_xsk_system"
+    "select_xklc",
+    "invalidate_xklc_cache",
+    "enter_xsk_system",
+    "get_current_round",
+    "LoginSupervisor",
+    "login_supervisor",
+    "is_session_expired",
+    "ServerClock",
+    "server_clock",
+    "ResponseCache",
+    "response_cache"
 ]
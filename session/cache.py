@@ -0,0 +1,167 @@
+"""
+响应缓存
+
+在HTTP请求和筛选之间缓存解析后的响应（课程目录各接口、选课轮次列表），
+按接口设置有效期（TTL），条目数超过上限时淘汰最久未使用的条目（LRU）。
+
+缓存键为元组，第一个元素是接口名称（与请求头模板名称一致），如(接口, 查询条件, 选课轮次)。
+数据可能因本地操作而变化时由调用方显式失效：
+    invalidate(接口)     选课提交后该类别的剩余人数已变化
+    flush_session()     重新登录后丢弃与旧会话绑定的条目
+失效发生在获取过程中时，该次获取的结果不会写入缓存（见token/put）。
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+# 各接口的默认有效期，单位：秒；未列出的接口使用DEFAULT_TTL
+DEFAULT_TTLS = {
+    "ggxxkxk": 10,
+    "xxkxk": 10,
+    "xxxkxk": 10,
+    "xklc_list": 300,
+}
+DEFAULT_TTL = 10
+# 默认最多缓存的条目数
+DEFAULT_MAX_ENTRIES = 256
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "expires_at", "session_bound")
+
+    def __init__(self, value, stored_at, expires_at, session_bound):
+        self.value = value
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.session_bound = session_bound
+
+
+class ResponseCache:
+    """带有效期和LRU淘汰的响应缓存"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttls=None, default_ttl=DEFAULT_TTL):
+        """
+        :param max_entries: 最多缓存的条目数
+        :param ttls: 接口名称 -> 有效期（秒），默认为DEFAULT_TTLS
+        :param default_ttl: 未在ttls中列出的接口的有效期
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # 接口名称 -> 失效次数；会话失效次数。获取开始时记下，写入时不一致则丢弃结果
+        self._epochs = {}
+        self._session_epoch = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def ttl_for(self, endpoint) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def get(self, key: Hashable, max_age: Optional[float] = None):
+        """
+        返回未过期的缓存值，没有时返回None
+
+        :param key: 缓存键
+        :param max_age: 调用方可接受的最大年龄（秒），只能进一步缩短接口的有效期
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            if now >= entry.expires_at:
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+            if max_age is not None and now - entry.stored_at > max_age:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.value
+
+    def token(self, key: Hashable):
+        """获取开始前调用，返回值传给put，用于丢弃获取期间已被失效的结果"""
+        with self._lock:
+            return self._epochs.get(key[0], 0), self._session_epoch
+
+    def put(self, key: Hashable, value, ttl: Optional[float] = None, session_bound=True, token=None) -> bool:
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键，第一个元素为接口名称
+            value: 缓存值（调用方不应再修改）
+            ttl: 有效期（秒），默认按接口名称取
+            session_bound: 是否与当前登录会话绑定，重新登录时丢弃
+            token: 获取开始前token()的返回值，获取期间发生过失效时不写入
+
+        Returns:
+            bool: 是否写入
+        """
+        ttl = self.ttl_for(key[0]) if ttl is None else ttl
+        if ttl <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if token is not None and token != (self._epochs.get(key[0], 0), self._session_epoch):
+                return False
+            self._entries[key] = _Entry(value, now, now + ttl, session_bound)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return True
+
+    def _drop(self, predicate: Callable[[Hashable, _Entry], bool]) -> int:
+        """删除满足条件的条目（调用方需持有锁）"""
+        keys = [key for key, entry in self._entries.items() if predicate(key, entry)]
+        for key in keys:
+            del self._entries[key]
+        self._invalidations += len(keys)
+        return len(keys)
+
+    def invalidate(self, endpoint) -> int:
+        """使某接口的全部条目失效，返回删除的条目数"""
+        with self._lock:
+            self._epochs[endpoint] = self._epochs.get(endpoint, 0) + 1
+            return self._drop(lambda key, entry: key[0] == endpoint)
+
+    def flush_session(self) -> int:
+        """丢弃与登录会话绑定的条目（重新登录后调用），返回删除的条目数"""
+        with self._lock:
+            self._session_epoch += 1
+            return self._drop(lambda key, entry: entry.session_bound)
+
+    def clear(self):
+        with self._lock:
+            self._session_epoch += 1
+            self._epochs = {endpoint: epoch + 1 for endpoint, epoch in self._epochs.items()}
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def metrics(self) -> dict:
+        """命中、未命中、淘汰、过期和失效的次数"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "invalidations": self._invalidations,
+            }
+
+
+# 全局响应缓存
+response_cache = ResponseCache()
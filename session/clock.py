@@ -0,0 +1,111 @@
+"""
+服务器时钟
+
+根据HTTP响应的Date头估计本地时钟与教务系统服务器时钟的偏差。
+Date头只精确到秒：若请求在本地时刻[t0, t1]内完成、Date为D，则服务器在该区间内某一时刻处于[D, D+1)秒，
+即 偏差 ∈ [D - t1, D + 1 - t0]。多次采样取区间交集，并把下一次请求安排在预计的服务器整秒跳变时刻，
+使每次采样尽可能切分剩余区间；往返时间（RTT）越短，结果越精确。
+"""
+import math
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import requests
+
+import config
+from . import http
+from .session import get_headers
+
+
+class ServerClock:
+    """服务器时钟偏差估计"""
+
+    def __init__(self, url: Optional[str] = None):
+        """
+        :param url: 用于采样的URL，默认为教务系统根地址
+        """
+        self.url = url or config.BASE_URL
+        self._lock = threading.Lock()
+        # 服务器时间 - 本地时间，单位：秒
+        self.offset = 0.0
+        # 偏差估计的不确定度（区间半宽），未同步时为None
+        self.uncertainty = None
+        # 最近的往返时间中位数
+        self.rtt = None
+        self.synced_at = None
+
+    def _sample(self):
+        """发送一次HEAD请求，返回(发送时刻, 接收时刻, 服务器Date时间戳)；请求失败或没有Date头时返回None"""
+        t0 = time.time()
+        try:
+            response = http.head(self.url, headers=get_headers(), timeout=5, allow_redirects=False)
+        except requests.RequestException as e:
+            print(f"[clock] 时钟采样请求失败: {e}")
+            return None
+        t1 = time.time()
+        date = response.headers.get("Date")
+        if not date:
+            return None
+        try:
+            return t0, t1, parsedate_to_datetime(date).timestamp()
+        except (TypeError, ValueError):
+            return None
+
+    def sync(self, samples: int = 8, precision: float = 0.02) -> float:
+        """
+        采样估计时钟偏差
+
+        Args:
+            samples: 最多采样次数
+            precision: 不确定度达到该值（秒）时提前结束
+
+        Returns:
+            float: 时钟偏差（服务器时间 - 本地时间），单位：秒
+        """
+        lo, hi = -math.inf, math.inf
+        rtts = []
+        for _ in range(samples):
+            sample = self._sample()
+            if sample is None:
+                break
+            t0, t1, server = sample
+            rtts.append(t1 - t0)
+            sample_lo, sample_hi = server - t1, server + 1 - t0
+            lo, hi = max(lo, sample_lo), min(hi, sample_hi)
+            if lo > hi:
+                # 区间不相交（服务器时钟跳变或负载均衡到不同服务器），以本次采样重新开始
+                lo, hi = sample_lo, sample_hi
+            if (hi - lo) / 2 <= precision:
+                break
+
+            # 让下一次请求的中点落在预计的服务器整秒跳变时刻
+            mid = (lo + hi) / 2
+            rtt = sorted(rtts)[len(rtts) // 2]
+            now = time.time()
+            boundary = math.floor(now + mid + rtt / 2) + 1
+            delay = boundary - mid - rtt / 2 - now
+            if delay > 0:
+                time.sleep(delay)
+
+        if not rtts or math.isinf(lo):
+            return self.offset
+        with self._lock:
+            self.offset = (lo + hi) / 2
+            self.uncertainty = (hi - lo) / 2
+            self.rtt = sorted(rtts)[len(rtts) // 2]
+            self.synced_at = time.time()
+        return self.offset
+
+    def now(self) -> float:
+        """估计的服务器当前时间戳"""
+        return time.time() + self.offset
+
+    def to_local(self, server_timestamp: float) -> float:
+        """将服务器时间戳换算为本地时间戳"""
+        return server_timestamp - self.offset
+
+
+# 全局服务器时钟
+server_clock = ServerClock()
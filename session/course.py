@@ -1,23 +1,149 @@
 """
 课程模块：负责获取选课轮次信息和进入选课系统
 """
+import json
+import os
 import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
-import requests
-from bs4 import BeautifulSoup
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from bs4 import BeautifulSoup, SoupStrainer
 import config
-from .session import generate_headers
+from . import http
+from .cache import response_cache
+from .session import get_headers
 
 # 选课列表URL
 XKLC_LIST_URL = f"{config.BASE_URL}xsxk/xklc_list"
 # 选课入口URL
 XSK_INDEX_URL = f"{config.BASE_URL}xsxk/xsxk_index"
 
+# 优先使用C实现的lxml解析器，未安装时回退到纯Python的html.parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
 
-def get_xklc_list() -> List[Dict[str, str]]:
+# 只构建<table>节点，跳过页面中的菜单、脚本等无关内容
+_TABLE_STRAINER = SoupStrainer("table")
+# 响应头 / meta 中声明的字符集
+_HEADER_CHARSET_RE = re.compile(r"charset=([\w-]+)", re.I)
+_META_CHARSET_RE = re.compile(rb"<meta[^>]+charset=[\"']?([\w-]+)", re.I)
+
+# 选课轮次缓存文件
+XKLC_CACHE_FILE = os.path.join(config.CACHE_DIR, "xklc_list.json")
+# 缓存最长有效期（秒），防止轮次结束前新发布的轮次长期不可见
+XKLC_CACHE_MAX_AGE = 6 * 3600
+# 轮次时间可能的格式
+_XKLC_TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+# 内存中共享的选课轮次缓存
+_XKLC_CACHE = {"username": None, "expires_at": 0.0, "rounds": None}
+_XKLC_CACHE_LOCK = threading.Lock()
+
+# 最近一次成功进入的选课轮次（jx0502zbid），课程数据按轮次区分
+_CURRENT_ROUND = None
+
+
+def _server_timezone():
+    """教务系统服务器时区；系统缺少时区数据库（如未安装tzdata的Windows）时回退到UTC+8"""
+    try:
+        return ZoneInfo(config.SERVER_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone(timedelta(hours=8))
+
+
+def parse_xklc_time(text: str) -> Optional[float]:
+    """将选课轮次的时间字符串（服务器时区的本地时间）转换为时间戳，无法解析时返回None"""
+    for fmt in _XKLC_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(text.strip(), fmt)
+        except (ValueError, AttributeError):
+            continue
+        return parsed.replace(tzinfo=_server_timezone()).timestamp()
+    return None
+
+
+def _xklc_expires_at(rounds: List[Dict[str, str]], now: float) -> float:
+    """以最早结束的未结束轮次的end_time作为缓存过期时间"""
+    expires_at = now + XKLC_CACHE_MAX_AGE
+    for item in rounds:
+        end_time = parse_xklc_time(item.get("end_time", ""))
+        if end_time is not None and now < end_time < expires_at:
+            expires_at = end_time
+    return expires_at
+
+
+def _load_xklc_cache() -> None:
+    """从磁盘加载选课轮次缓存到内存（调用方需持有锁）"""
+    try:
+        with open(XKLC_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _XKLC_CACHE.update(
+            username=data["username"],
+            expires_at=float(data["expires_at"]),
+            rounds=data["rounds"],
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+
+def _save_xklc_cache() -> None:
+    """将内存中的选课轮次缓存写入磁盘（调用方需持有锁）"""
+    try:
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        tmp_path = XKLC_CACHE_FILE + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_XKLC_CACHE, f, ensure_ascii=False)
+        os.replace(tmp_path, XKLC_CACHE_FILE)
+    except OSError as e:
+        print(f"[xklc_cache] 写入缓存失败: {e}")
+
+
+def _get_cached_xklc_list() -> Optional[List[Dict[str, str]]]:
+    """返回当前用户未过期的缓存轮次，没有则返回None"""
+    with _XKLC_CACHE_LOCK:
+        if _XKLC_CACHE["rounds"] is None:
+            _load_xklc_cache()
+        if (_XKLC_CACHE["rounds"] is not None
+                and _XKLC_CACHE["username"] == config.USERNAME
+                and time.time() < _XKLC_CACHE["expires_at"]):
+            return list(_XKLC_CACHE["rounds"])
+    return None
+
+
+def _xklc_cache_key():
+    # 轮次列表按用户区分，与登录会话无关
+    return "xklc_list", "", config.USERNAME
+
+
+def _remember_xklc(key, rounds, expires_at):
+    """写入响应缓存，有效期不超过最早结束的轮次"""
+    ttl = min(response_cache.ttl_for("xklc_list"), expires_at - time.time())
+    response_cache.put(key, list(rounds), ttl=ttl, session_bound=False)
+
+
+def invalidate_xklc_cache() -> None:
+    """清空选课轮次缓存（内存和磁盘）"""
+    response_cache.invalidate("xklc_list")
+    with _XKLC_CACHE_LOCK:
+        _XKLC_CACHE.update(username=None, expires_at=0.0, rounds=None)
+        try:
+            os.remove(XKLC_CACHE_FILE)
+        except OSError:
+            pass
+
+
+def get_xklc_list(use_cache: bool = True) -> List[Dict[str, str]]:
     """
     获取选课轮次列表
 
+    Args:
+        use_cache: 是否优先使用未过期的缓存，为False时强制重新请求并刷新缓存
+
     Returns:
         list[dict]: 包含选课轮次信息的字典列表
         每个字典包含:
@@ -27,24 +153,89 @@ def get_xklc_list() -> List[Dict[str, str]]:
             - end_time: 结束时间
             - jx0502zbid: 子系统入口参数
     """
-    try:
-        headers = generate_headers(cookies=config.COOKIES)
-        headers["Referer"] = f"{config.BASE_URL}xskb/xskb_list.do"
+    key = _xklc_cache_key()
+    if use_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        cached = _get_cached_xklc_list()
+        if cached is not None:
+            _remember_xklc(key, cached, _XKLC_CACHE["expires_at"])
+            return cached
 
-        resp = requests.get(XKLC_LIST_URL, headers=headers, timeout=10)
+    try:
+        resp = http.get(XKLC_LIST_URL, headers=get_headers("xklc_list"), timeout=10)
         resp.raise_for_status()  # 直接抛异常，避免返回无效内容
-        resp.encoding = resp.apparent_encoding
-
-        return _parse_xklc_list(resp.text)
+        resp.encoding = _resolve_encoding(resp)
 
+        rounds = [item for item in _parse_xklc_list(resp.text) if item]
     except Exception as e:
         print(f"获取选课轮次列表失败: {e}")
         return []
 
+    # 只缓存非空结果，避免把异常页面当作"没有轮次"长期保留
+    if rounds:
+        now = time.time()
+        expires_at = _xklc_expires_at(rounds, now)
+        _remember_xklc(key, rounds, expires_at)
+        with _XKLC_CACHE_LOCK:
+            _XKLC_CACHE.update(
+                username=config.USERNAME,
+                expires_at=expires_at,
+                rounds=rounds,
+            )
+            _save_xklc_cache()
+    return list(rounds)
+
+
+def get_current_round() -> Optional[str]:
+    """最近一次成功进入的选课轮次的jx0502zbid，尚未进入时返回None"""
+    return _CURRENT_ROUND
+
+
+def select_xklc(jx0502zbid: Optional[str] = None,
+                xk_name: Optional[str] = None,
+                index: int = 0) -> Optional[Dict[str, str]]:
+    """
+    从选课轮次列表中选择一个轮次
+
+    Args:
+        jx0502zbid: 按入口参数精确匹配
+        xk_name: 按轮次名称的子串匹配
+        index: 未指定上述条件时按下标选择，默认为第一个轮次
+
+    Returns:
+        dict | None: 选中的轮次信息，找不到时返回None
+    """
+    rounds = get_xklc_list()
+    if jx0502zbid is not None:
+        return next((r for r in rounds if r.get("jx0502zbid") == jx0502zbid), None)
+    if xk_name is not None:
+        return next((r for r in rounds if xk_name in r.get("xk_name", "")), None)
+    if -len(rounds) <= index < len(rounds):
+        return rounds[index]
+    return None
+
+
+def _resolve_encoding(resp) -> str:
+    """
+    确定响应编码：依次使用响应头、页面前部的meta声明，
+    都没有时才对全文做字符集探测（apparent_encoding开销较大）
+    """
+    match = _HEADER_CHARSET_RE.search(resp.headers.get("Content-Type", ""))
+    if match:
+        return match.group(1)
+
+    match = _META_CHARSET_RE.search(resp.content[:2048])
+    if match:
+        return match.group(1).decode("ascii")
+
+    return resp.apparent_encoding
+
 
 def _parse_xklc_list(html: str) -> List[Dict[str, str]]:
     """解析 HTML 并提取选课轮次信息"""
-    soup = BeautifulSoup(html, "html.parser")
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=_TABLE_STRAINER)
     table = soup.find("table", class_="Nsb_r_list")
     if not table:
         print("[_parse_xklc_list] 未找到选课轮次表格")
@@ -83,24 +274,24 @@ def _extract_xklc_row(row) -> Dict[str, str]:
     }
 
 
-def enter_xsk_system(jx0502zbid: Optional[str] = None) -> bool:
+def enter_xsk_system(jx0502zbid: Optional[str] = None, xk_name: Optional[str] = None) -> bool:
     """
     进入选课系统入口
 
     Args:
-        jx0502zbid: 子系统入口参数，如果为None则尝试从选课轮次列表中获取
+        jx0502zbid: 子系统入口参数，如果为None则尝试从选课轮次列表（优先使用缓存）中获取
+        xk_name: 未提供jx0502zbid时，按轮次名称选择轮次，默认选择第一个轮次
 
     Returns:
         bool: 是否成功进入选课系统
     """
+    global _CURRENT_ROUND
     try:
         # 如果没有提供jx0502zbid参数，则从选课轮次列表中获取
         if jx0502zbid is None:
-            xklc_list = get_xklc_list()
-
-            # 提取第一个选课轮次的jx0502zbid参数
-            if xklc_list:
-                jx0502zbid = xklc_list[0].get("jx0502zbid", "")
+            xklc = select_xklc(xk_name=xk_name)
+            if xklc:
+                jx0502zbid = xklc.get("jx0502zbid", "")
             else:
                 print("[enter_xsk_system] 未获取到选课轮次信息")
                 return False
@@ -108,14 +299,10 @@ def enter_xsk_system(jx0502zbid: Optional[str] = None) -> bool:
         # 构建URL
         url = f"{XSK_INDEX_URL}?jx0502zbid={jx0502zbid}"
 
-        # 准备请求头
-        headers = generate_headers(cookies=config.COOKIES)
-        # 设置Referer
-        headers["Referer"] = f"{config.BASE_URL}xsxk/xklc_list?Ves632DSdyV=NEW_XSD_PYGL"
-
         # 发送GET请求
-        response = requests.get(url, headers=headers,
-                                timeout=10, allow_redirects=True)
+        response = http.get(url, headers=get_headers("xsk_index"),
+                            timeout=10, allow_redirects=True)
+        _CURRENT_ROUND = jx0502zbid
         print(f"进入选课系统成功，响应时间: {response.elapsed.total_seconds()} 秒")
         return True
 
@@ -0,0 +1,281 @@
+"""
+HTTP请求层
+
+所有对教务系统的请求都经由request()发出，可通过环境变量（或命令行参数 --record/--replay）
+切换为录制或回放模式，无需修改代码：
+    GRAKX_HTTP_RECORD=cassette.jsonl.gz    将真实的请求/响应追加录制到磁带文件
+    GRAKX_HTTP_REPLAY=cassette.jsonl.gz    从磁带文件回放响应，不访问网络
+    GRAKX_HTTP_REPLAY_SPEED=original|fast  回放时按录制时的响应耗时等待，或立即返回（默认）
+
+磁带文件为gzip压缩的JSONL，每行一条请求/响应记录。请求只记录方法、URL和请求体摘要，
+不保存请求头（Cookie）和请求体（登录表单中的密码）；响应头中的Set-Cookie会原样保存，
+磁带文件应与Cookie一样妥善保管。
+
+回放时按(方法, URL, 请求体摘要)依次取出录制的响应；请求体不一致时（如每次不同的验证码）
+退化为按(方法, URL)匹配；同一请求被取完后重复使用最后一条，便于反复运行基准测试。
+
+真实请求共用一个连接池（keep-alive），Cookie仍由调用方通过请求头传入，
+每个请求使用独立的Cookie容器，行为与requests.request相同。
+"""
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+REPLAY_SPEEDS = ("original", "fast")
+
+RECORD_PATH = os.environ.get("GRAKX_HTTP_RECORD") or None
+REPLAY_PATH = os.environ.get("GRAKX_HTTP_REPLAY") or None
+REPLAY_SPEED = os.environ.get("GRAKX_HTTP_REPLAY_SPEED", "fast")
+
+# 连接池中每个主机保持的最大连接数（与全局线程池大小一致）
+POOL_MAXSIZE = 50
+
+_recorder = None
+_player = None
+_adapter = None
+_state_lock = threading.Lock()
+
+
+class CassetteMiss(requests.RequestException):
+    """回放时磁带中没有匹配的请求"""
+
+
+def _body_digest(data) -> str:
+    """请求体摘要，磁带中不保存请求体本身"""
+    if not data:
+        return ""
+    if isinstance(data, dict):
+        data = urlencode(data)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def load_cassette(path):
+    """逐条读取磁带文件中的记录"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def entry_body(entry) -> bytes:
+    """记录中的响应体"""
+    return base64.b64decode(entry["body"])
+
+
+class CassetteRecorder:
+    """将请求/响应追加写入磁带文件"""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._start = time.time()
+        atexit.register(self.close)
+
+    def record(self, method, url, data, response):
+        entry = {
+            "method": method.upper(),
+            "url": url,
+            "body_sha1": _body_digest(data),
+            "offset": round(time.time() - self._start, 6),
+            "status": response.status_code,
+            "reason": response.reason,
+            "final_url": response.url,
+            "elapsed": response.elapsed.total_seconds(),
+            "headers": list(response.raw.headers.items()) if response.raw is not None
+            else list(response.headers.items()),
+            "body": base64.b64encode(response.content).decode("ascii"),
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line)
+            self._file.write("\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class CassettePlayer:
+    """从磁带文件回放响应"""
+
+    def __init__(self, path, speed="fast"):
+        if speed not in REPLAY_SPEEDS:
+            raise ValueError(f"回放速度必须是 {'、'.join(REPLAY_SPEEDS)} 之一: {speed}")
+        self.path = path
+        self.speed = speed
+        self._lock = threading.Lock()
+        # (方法, URL, 请求体摘要) / (方法, URL) -> 按录制顺序排列的记录
+        self._exact = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        for entry in load_cassette(path):
+            self._exact[(entry["method"], entry["url"], entry["body_sha1"])].append(entry)
+            self._loose[(entry["method"], entry["url"])].append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._loose.values())
+
+    @staticmethod
+    def _take(entries):
+        """按顺序取出一条记录，只剩最后一条时重复使用"""
+        return entries.popleft() if len(entries) > 1 else entries[0]
+
+    def _lookup(self, method, url, data):
+        method = method.upper()
+        with self._lock:
+            entries = self._exact.get((method, url, _body_digest(data)))
+            if not entries:
+                entries = self._loose.get((method, url))
+            if not entries:
+                raise CassetteMiss(f"磁带 {self.path} 中没有请求 {method} {url}")
+            return self._take(entries)
+
+    def play(self, method, url, data=None, **kwargs) -> requests.Response:
+        entry = self._lookup(method, url, data)
+        if self.speed == "original":
+            time.sleep(entry["elapsed"])
+
+        resp = requests.Response()
+        resp.status_code = entry["status"]
+        resp.reason = entry.get("reason")
+        resp.url = entry["final_url"]
+        resp.headers = CaseInsensitiveDict()
+        for name, value in entry["headers"]:
+            if name.lower() == "set-cookie":
+                cookie = SimpleCookie()
+                cookie.load(value)
+                for key, morsel in cookie.items():
+                    resp.cookies.set(key, morsel.value, path=morsel["path"] or "/")
+            # 与urllib3一致，同名响应头以逗号合并
+            resp.headers[name] = f"{resp.headers[name]}, {value}" if name in resp.headers else value
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.elapsed = timedelta(seconds=entry["elapsed"])
+        resp._content = entry_body(entry)
+        resp._content_consumed = True
+        resp.request = requests.Request(method.upper(), url).prepare()
+        return resp
+
+
+def configure(record=None, replay=None, speed=None):
+    """
+    设置录制/回放模式（供命令行入口调用）
+
+    :param record: 录制的磁带文件路径
+    :param replay: 回放的磁带文件路径
+    :param speed: 回放速度，original或fast
+    """
+    global RECORD_PATH, REPLAY_PATH, REPLAY_SPEED, _recorder, _player
+    with _state_lock:
+        if record is not None:
+            RECORD_PATH = record
+            _recorder = None
+        if replay is not None:
+            REPLAY_PATH = replay
+            _player = None
+        if speed is not None:
+            REPLAY_SPEED = speed
+            _player = None
+
+
+def _get_player():
+    global _player
+    if _player is None:
+        with _state_lock:
+            if _player is None:
+                _player = CassettePlayer(REPLAY_PATH, REPLAY_SPEED)
+    return _player
+
+
+def _get_recorder():
+    global _recorder
+    if _recorder is None:
+        with _state_lock:
+            if _recorder is None:
+                _recorder = CassetteRecorder(RECORD_PATH)
+    return _recorder
+
+
+def _get_adapter() -> HTTPAdapter:
+    global _adapter
+    if _adapter is None:
+        with _state_lock:
+            if _adapter is None:
+                _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE)
+    return _adapter
+
+
+def _new_session() -> requests.Session:
+    """创建挂载共享连接池的会话；Cookie容器不共享，避免不同请求之间互相影响"""
+    session = requests.Session()
+    adapter = _get_adapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def warm_up(url, connections=8, timeout=5) -> int:
+    """
+    并发发送HEAD请求，预先建立到目标主机的连接，返回成功的请求数；回放模式下不访问网络
+
+    :param url: 目标主机上的任意URL
+    :param connections: 预先建立的连接数
+    :param timeout: 单个请求的超时时间，单位：秒
+    """
+    if REPLAY_PATH:
+        return 0
+
+    def probe(_):
+        try:
+            _new_session().head(url, timeout=timeout, allow_redirects=False)
+            return True
+        except requests.RequestException:
+            return False
+
+    with ThreadPoolExecutor(max_workers=connections, thread_name_prefix="warm_up") as pool:
+        return sum(pool.map(probe, range(connections)))
+
+
+def request(method, url, data=None, **kwargs) -> requests.Response:
+    """
+    发送请求，参数与requests.request相同
+
+    回放模式下直接返回磁带中的响应；录制模式下发送真实请求并记录响应
+    """
+    if REPLAY_PATH:
+        return _get_player().play(method, url, data=data, **kwargs)
+    response = _new_session().request(method, url, data=data, **kwargs)
+    if RECORD_PATH:
+        _get_recorder().record(method, url, data, response)
+    return response
+
+
+def get(url, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs) -> requests.Response:
+    return request("HEAD", url, **kwargs)
+
+
+def post(url, data=None, **kwargs) -> requests.Response:
+    return request("POST", url, data=data, **kwargs)
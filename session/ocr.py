@@ -5,10 +5,12 @@
 """
 import os
 import re
+import threading
 import cv2
 import numpy as np
 from PIL import Image
 from multiprocessing import Pool, cpu_count
+import profiling
 
 # 使用多种方法尝试禁用ONNX Runtime警告日志
 os.environ['ORT_LOGGING_LEVEL'] = '3'  # 3表示ERROR级别，不显示WARNING
@@ -39,6 +41,65 @@ except ImportError:
     print("请安装ddddocr库: pip install ddddocr")
 
 
+def preprocess_image(img, method=1):
+    """
+    验证码图片预处理：灰度、自适应二值化和形态学去噪
+
+    只操作传入的数组，不访问共享状态，可在多个线程中并行调用
+
+    :param img: BGR图片（cv2.imread的返回值）
+    :param method: 预处理方法，1为二值化后开运算，2为仅二值化，其他为去线、中值滤波和锐化
+    :return: 处理后的单通道图片
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+    if method == 1:
+        thresh = cv2.adaptiveThreshold(
+            gray, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            15, 10
+        )
+        kernel_small = cv2.getStructuringElement(
+            cv2.MORPH_RECT, (1, 1))
+        result = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel_small)
+
+    elif method == 2:
+        thresh = cv2.adaptiveThreshold(
+            gray, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            15, 10
+        )
+        result = thresh
+
+    else:
+        thresh = cv2.adaptiveThreshold(
+            gray, 255,
+            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+            cv2.THRESH_BINARY_INV,
+            15, 10
+        )
+        kernel_small = cv2.getStructuringElement(
+            cv2.MORPH_RECT, (2, 2))
+        open_img = cv2.morphologyEx(
+            thresh, cv2.MORPH_OPEN, kernel_small)
+
+        kernel_line = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 5))
+        closed_img = cv2.morphologyEx(
+            open_img, cv2.MORPH_CLOSE, kernel_line)
+
+        median_blur = cv2.medianBlur(closed_img, 3)
+        kernel_sharpen = np.array(
+            [[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]]
+        )
+        sharpened = cv2.filter2D(median_blur, -1, kernel_sharpen)
+
+        result = sharpened
+
+    return result
+
+
 class CaptchaRecognizer:
     """验证码识别器类，封装验证码识别的所有功能"""
 
@@ -61,51 +122,7 @@ class CaptchaRecognizer:
             if img is None:
                 raise Exception("无法读取图片")
 
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-            if method == 1:
-                thresh = cv2.adaptiveThreshold(
-                    gray, 255,
-                    cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                    cv2.THRESH_BINARY_INV,
-                    15, 10
-                )
-                kernel_small = cv2.getStructuringElement(
-                    cv2.MORPH_RECT, (1, 1))
-                result = cv2.morphologyEx(thresh, cv2.MORPH_OPEN, kernel_small)
-
-            elif method == 2:
-                thresh = cv2.adaptiveThreshold(
-                    gray, 255,
-                    cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                    cv2.THRESH_BINARY_INV,
-                    15, 10
-                )
-                result = thresh
-
-            else:
-                thresh = cv2.adaptiveThreshold(
-                    gray, 255,
-                    cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                    cv2.THRESH_BINARY_INV,
-                    15, 10
-                )
-                kernel_small = cv2.getStructuringElement(
-                    cv2.MORPH_RECT, (2, 2))
-                open_img = cv2.morphologyEx(
-                    thresh, cv2.MORPH_OPEN, kernel_small)
-
-                kernel_line = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 5))
-                closed_img = cv2.morphologyEx(
-                    open_img, cv2.MORPH_CLOSE, kernel_line)
-
-                median_blur = cv2.medianBlur(closed_img, 3)
-                kernel_sharpen = np.array(
-                    [[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]]
-                )
-                sharpened = cv2.filter2D(median_blur, -1, kernel_sharpen)
-
-                result = sharpened
+            result = preprocess_image(img, method)
 
             if self.debug:
                 os.makedirs("./tmp", exist_ok=True)
@@ -122,6 +139,7 @@ class CaptchaRecognizer:
         clean_result = re.sub(r'[^a-zA-Z0-9]', '', result)
         return clean_result if preserve_case else clean_result
 
+    @profiling.profiled("captcha_recognize")
     def recognize(self, img_path=None, max_attempts=2):
         if img_path is None:
             img_path = "./test/captcha.jpg"
@@ -193,11 +211,34 @@ class CaptchaRecognizerPool:
         self.pool.join()
 
 
-# 创建全局识别器实例
-captcha_recognizer = CaptchaRecognizer(debug=False)
+# 全局识别器实例，首次使用时创建（加载ONNX模型耗时较长）
+_captcha_recognizer = None
+# 保证并发的首次调用只创建一个实例
+_captcha_recognizer_lock = threading.Lock()
+
+
+def get_captcha_recognizer():
+    """返回全局识别器实例，首次调用时创建"""
+    global _captcha_recognizer
+    recognizer = _captcha_recognizer
+    if recognizer is None:
+        with _captcha_recognizer_lock:
+            if _captcha_recognizer is None:
+                _captcha_recognizer = CaptchaRecognizer(debug=False)
+            recognizer = _captcha_recognizer
+    return recognizer
+
+
+def __getattr__(name):
+    # 兼容旧代码中对 ocr.captcha_recognizer 的访问
+    if name == "captcha_recognizer":
+        return get_captcha_recognizer()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
+@profiling.profiled("captcha_verify_code")
 def verify_code(img_path=None, img_bytes=None):
+    captcha_recognizer = get_captcha_recognizer()
     if img_bytes is not None:
         try:
             res = captcha_recognizer.ocr.classification(img_bytes)
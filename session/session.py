@@ -1,10 +1,15 @@
 """
 会话确权
 """
+import threading
 import time
+from types import MappingProxyType
+from urllib.parse import urlencode
 import requests
-from session.ocr import verify_code
 import config
+import events
+import profiling
+from . import http
 
 # 鉴权URL
 VERIFY_URL = config.BASE_URL + 'verifycode.servlet'
@@ -13,6 +18,8 @@ LOGINTO_URL = config.BASE_URL + 'xk/LoginToXkLdap'
 MAIN_PAGE_URL = config.BASE_URL + 'framework/main.jsp'
 # 全局变量，用于跟踪上一次的登录状态
 _LAST_LOGIN_STATUS = None
+# 保护_LAST_LOGIN_STATUS的比较和更新，并发检查时状态变化只发布一次
+_LOGIN_STATUS_LOCK = threading.Lock()
 
 # 用于POST请求的额外头部信息
 POST_HEADERS = {
@@ -34,47 +41,119 @@ BASE_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36 Edg/140.0.0.0'
 }
 
-# 定义一个函数，用于生成完整的请求头，支持动态传入 Cookie 和自定义头部
+# AJAX 接口（DataTables 分页、选课操作）共用的头部
+_XHR_HEADERS = {
+    'X-Requested-With': 'XMLHttpRequest',
+    'Accept': '*/*'
+}
 
+# 各接口在基础请求头之上需要覆盖的头部
+ENDPOINT_HEADERS = {
+    'default': {},
+    'login': POST_HEADERS,
+    'xklc_list': {'Referer': config.BASE_URL + 'xskb/xskb_list.do'},
+    'xsk_index': {'Referer': config.BASE_URL + 'xsxk/xklc_list?Ves632DSdyV=NEW_XSD_PYGL'},
+    # 公共选修
+    'ggxxkxk': {**POST_HEADERS, **_XHR_HEADERS, 'Referer': config.BASE_URL + 'xsxk/xsxkGgxxkxk'},
+    # 学科基础、专业必修
+    'xxkxk': {**POST_HEADERS, **_XHR_HEADERS, 'Referer': config.BASE_URL + 'xsxkkc/comeInBxxk'},
+    # 专业选修
+    'xxxkxk': {**POST_HEADERS, **_XHR_HEADERS, 'Referer': config.BASE_URL + 'xsxkkc/comeInXxxk'},
+    # 选课提交（沿用BASE_HEADERS的Accept）
+    'ggxxkxk_oper': {'X-Requested-With': 'XMLHttpRequest', 'Referer': config.BASE_URL + 'xsxkkc/comeInGgxxkxk'},
+}
 
-def generate_headers(cookies: dict, is_post: bool = False, content_length=None):
-    """
-    生成完整的请求头，支持动态传入 Cookie 和自定义参数
+# 预构建的不可变请求头模板（不含Cookie）
+HEADER_TEMPLATES = {
+    name: MappingProxyType({**BASE_HEADERS, **extra})
+    for name, extra in ENDPOINT_HEADERS.items()
+}
+
+# 请求头缓存：endpoint -> (Cookie版本号, 带Cookie的不可变请求头)
+_HEADERS_CACHE = {}
+# Cookie字符串缓存：(Cookie版本号, Cookie字符串)
+_COOKIE_STR_CACHE = (None, '')
+
+
+def _cookie_string(version, cookies):
+    """返回Cookie字符串，仅在Cookie版本变化时重新拼接"""
+    global _COOKIE_STR_CACHE
+    cached_version, cookie_str = _COOKIE_STR_CACHE
+    if cached_version != version:
+        cookie_str = '; '.join([f'{k}={v}' for k, v in (cookies or {}).items()])
+        # 整体替换元组，其他线程读到的版本号和字符串总是配对的
+        _COOKIE_STR_CACHE = (version, cookie_str)
+    return cookie_str
 
-    :param cookies: Cookie 字典，用于添加到请求头中
-    :param is_post: 是否为 POST 请求，默认为 False
-    :param content_length: 请求内容长度，若为 POST 请求且提供该参数，则添加到请求头中
-    :return: 包含所有请求头信息的字典
+
+def get_headers(endpoint: str = 'default'):
     """
-    # 使用基础请求头作为默认值
-    final_headers = BASE_HEADERS.copy()
+    获取指定接口的请求头（只读映射），Cookie取自config.COOKIES
+
+    同一Cookie版本内直接返回缓存的对象，不再逐次复制和拼接；
+    通过config.set_user_credentials更新Cookie后自动重建。
+    Content-Length由requests根据请求体自动计算，不包含在模板中。
 
-    # 如果是POST请求，添加POST特有的头部
-    if is_post:
-        final_headers.update(POST_HEADERS)
-        # 如果提供了content_length，则添加Content-Length头部
-        if content_length is not None:
-            final_headers['Content-Length'] = str(content_length)
+    :param endpoint: 接口名称，见ENDPOINT_HEADERS
+    :return: 包含所有请求头信息的只读映射
+    """
+    cached = _HEADERS_CACHE.get(endpoint)
+    if cached is not None and cached[0] == config.COOKIES_VERSION:
+        return cached[1]
 
-    # 若传入了cookies参数，则将其转换为字符串并添加到请求头中
+    # 版本号和Cookie须取自同一次更新，否则可能把新Cookie缓存在旧版本号下
+    version, cookies = config.get_cookies()
+    headers = dict(HEADER_TEMPLATES[endpoint])
     if cookies:
-        # 将cookies字典转换为符合HTTP协议的Cookie字符串
-        cookie_str = '; '.join([f'{k}={v}' for k, v in cookies.items()])
-        final_headers['Cookie'] = cookie_str
+        headers['Cookie'] = _cookie_string(version, cookies)
+    headers = MappingProxyType(headers)
+    _HEADERS_CACHE[endpoint] = (version, headers)
+    return headers
 
-    # 打印生成的请求头，方便调试
-    # print("生成的请求头:", final_headers)
-    return final_headers
+
+def _merge_response_cookies(response):
+    """将服务器下发的Cookie（如新的JSESSIONID）合并到config.COOKIES，验证码与之绑定"""
+    new_cookies = response.cookies.get_dict()
+    if new_cookies:
+        config.merge_cookies(new_cookies)
+
+
+def set_login_status(status):
+    """
+    记录登录状态，状态变化时发布LOGIN_STATE事件
+
+    登录流程完成后可直接标记为已登录，省去一次检查请求
+
+    :return: 状态是否变化
+    """
+    global _LAST_LOGIN_STATUS
+    with _LOGIN_STATUS_LOCK:
+        changed = _LAST_LOGIN_STATUS != status
+        _LAST_LOGIN_STATUS = status
+    if changed:
+        events.publish(events.LOGIN_STATE, status)
+    return changed
+
+
+def _reset_login_status():
+    """清除记录的登录状态，下一次检查无论结果如何都视为变化"""
+    global _LAST_LOGIN_STATUS
+    with _LOGIN_STATUS_LOCK:
+        _LAST_LOGIN_STATUS = None
 
 
 # 自动登录直到成功
 
+@profiling.profiled("login")
 def login():
     """
     自动登录函数，持续尝试登录直到成功。
     在每次尝试中，会获取验证码、调用 OCR 识别，然后使用识别结果进行登录请求。
     会根据响应结果判断登录是否成功，失败则继续尝试。
     """
+    # 验证码识别依赖cv2、ddddocr等重型库，首次登录时才导入
+    from session.ocr import verify_code
+
     success = False
     attempt_count = 0
 
@@ -83,9 +162,10 @@ def login():
         # print(f"第{attempt_count}次尝试登录...")
 
         # 获取验证码
-        headers = generate_headers(cookies=config.COOKIES)
-        x = requests.get(VERIFY_URL, headers=headers, timeout=10)
+        headers = get_headers()
+        x = http.get(VERIFY_URL, headers=headers, timeout=10)
         captcha_bytes = x.content
+        _merge_response_cookies(x)
 
         # 获取用户输入的验证码+OCR识别
         try:
@@ -106,14 +186,14 @@ def login():
             'PASSWORD': config.PASSWORD,
             'RANDOMCODE': user_input_code
         }
-        # 计算表单数据的长度（这里是固定的59，也可以动态计算）
-        content_length = 59
-        # 生成POST请求头，包含正确的Content-Length
-        post_headers = generate_headers(
-            cookies=config.COOKIES, is_post=True, content_length=content_length)
+        # 按实际编码后的请求体计算Content-Length
+        form_body = urlencode(form_data)
+        post_headers = {**get_headers('login'),
+                        'Content-Length': str(len(form_body.encode('utf-8')))}
         # 发送POST请求，包含表单数据
-        p = requests.post(LOGINTO_URL, headers=post_headers,
-                          data=form_data, timeout=10)
+        p = http.post(LOGINTO_URL, headers=post_headers,
+                      data=form_body, timeout=10)
+        _merge_response_cookies(p)
         # 打印响应状态码
         # print(f"请求响应状态码: {p.status_code}")
 
@@ -145,15 +225,13 @@ def check_login_status():
     UTF-8编码表示已登录，GBK编码表示未登录
     只有在状态变化时才输出信息
     """
-    global _LAST_LOGIN_STATUS
-
     try:
-        # 使用session.py中已有的generate_headers函数生成请求头
-        headers = generate_headers(cookies=config.COOKIES)
+        # 使用预构建的请求头
+        headers = get_headers()
 
         # 发送HEAD请求只获取响应头，提高效率
         start_time = time.time()
-        response = requests.head(
+        response = http.head(
             MAIN_PAGE_URL, headers=headers, timeout=10, allow_redirects=True)
         response_time = time.time() - start_time
 
@@ -169,8 +247,8 @@ def check_login_status():
         else:
             current_status = False  # 如果无法确定编码类型，默认认为未登录
 
-        # 只有在状态变化时才输出信息，或者是第一次检查
-        if _LAST_LOGIN_STATUS is None or _LAST_LOGIN_STATUS != current_status:
+        # 更新上一次的状态并通知关注登录状态的订阅者；只有在状态变化时才输出信息，或者是第一次检查
+        if set_login_status(current_status):
             if current_status:
                 print(f"已登录 [响应时间: {response_time:.2f}秒]")
             elif 'gbk' in content_type.lower():
@@ -179,14 +257,11 @@ def check_login_status():
                 print(
                     f"状态未知，Content-Type: {content_type} [响应时间: {response_time:.2f}秒]")
 
-            # 更新上一次的状态
-            _LAST_LOGIN_STATUS = current_status
-
         return current_status
 
     except (requests.RequestException, KeyError) as e:
         # 异常情况也认为是状态变化，需要输出信息
         print(f"检查状态错误: {str(e)}")
-        _LAST_LOGIN_STATUS = None  # 重置状态，以便下次异常时仍能输出
+        _reset_login_status()  # 重置状态，以便下次异常时仍能输出
         # 发生异常时默认认为需要重新登录
         return False
@@ -0,0 +1,127 @@
+"""
+登录监督模块
+
+LoginSupervisor持有会话状态，保证同一时间最多只有一次登录（验证码识别）在进行：
+多个工作线程同时发现会话失效时，只有一个线程执行登录，其余线程阻塞等待其结果，
+登录完成后各自使用新的Cookie重放请求。
+"""
+import threading
+from . import http
+from .cache import response_cache
+from .session import login, check_login_status, get_headers, set_login_status
+from .course import enter_xsk_system
+
+
+def is_session_expired(response) -> bool:
+    """
+    判断响应是否表示会话已失效
+
+    与check_login_status一致：未登录时服务器返回GBK编码的登录页；
+    此外被重定向到登录页或返回401/403也视为失效
+    """
+    if response.status_code in (401, 403):
+        return True
+    content_type = response.headers.get('Content-Type', '').lower()
+    if 'json' in content_type:
+        return False
+    if 'gbk' in content_type:
+        return True
+    return 'LoginToXk' in response.url or 'verifycode.servlet' in response.text
+
+
+class LoginSupervisor:
+    """单飞（single-flight）登录监督者"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # 登录代数，每次登录成功后加一；请求方据此判断自己看到的会话是否已被刷新
+        self._generation = 0
+        self._logging_in = False
+        self._last_error = None
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    @property
+    def logging_in(self) -> bool:
+        return self._logging_in
+
+    def relogin(self, seen_generation=None, timeout=None) -> int:
+        """
+        重新登录；已有登录在进行时等待其结果而不是再登录一次
+
+        Args:
+            seen_generation: 调用方发现会话失效时的登录代数，若此后已完成过登录则直接返回
+            timeout: 等待其他线程登录的最长时间，单位：秒
+
+        Returns:
+            int: 当前登录代数
+        """
+        with self._cond:
+            if seen_generation is not None and seen_generation != self._generation:
+                return self._generation
+            if self._logging_in:
+                self._cond.wait_for(lambda: not self._logging_in, timeout)
+                if self._last_error is not None:
+                    raise self._last_error
+                return self._generation
+            self._logging_in = True
+
+        print("会话已失效，开始重新登录...")
+        error = None
+        try:
+            login()
+            enter_xsk_system()
+        except BaseException as e:
+            error = e
+
+        with self._cond:
+            self._logging_in = False
+            self._last_error = error
+            if error is None:
+                self._generation += 1
+            self._cond.notify_all()
+            generation = self._generation
+
+        if error is not None:
+            raise error
+        # 旧会话下获取的数据（如课程目录）不再可信
+        response_cache.flush_session()
+        set_login_status(True)
+        return generation
+
+    def ensure_login(self) -> int:
+        """检查登录状态，未登录时（单飞）重新登录"""
+        generation = self._generation
+        if not check_login_status():
+            return self.relogin(seen_generation=generation)
+        return generation
+
+    def request(self, method, url, endpoint='default', retries=1, **kwargs):
+        """
+        发送请求，请求头按endpoint取预构建模板和当前Cookie
+
+        检测到会话失效时触发（或等待正在进行的）重新登录，然后用新的Cookie重放请求
+
+        Args:
+            method: 请求方法
+            url: 请求URL
+            endpoint: 请求头模板名称，见session.ENDPOINT_HEADERS
+            retries: 会话失效后最多重放的次数
+            **kwargs: 传给http.request（即requests.request）的其他参数
+
+        Returns:
+            requests.Response
+        """
+        for attempt in range(retries + 1):
+            generation = self._generation
+            response = http.request(method, url, headers=get_headers(endpoint), **kwargs)
+            if attempt == retries or not is_session_expired(response):
+                return response
+            self.relogin(seen_generation=generation)
+        return response
+
+
+# 全局登录监督者
+login_supervisor = LoginSupervisor()
@@ -0,0 +1,29 @@
+"""
+课程目录规模基准回退检查
+
+在1万条的合成目录上运行bench/bench_filter.py的全部引擎，
+相对吞吐量和峰值内存与保存的基线比较（见bench_filter.compare），出现回退时失败。
+
+吞吐量受机器负载影响，默认跳过；设置环境变量 GRAKX_BENCH=1 时运行：
+    GRAKX_BENCH=1 uv run pytest tests/test_bench_filter.py
+"""
+import os
+
+import pytest
+
+from bench.bench_filter import ENGINES, compare, load_baseline, run_engines
+
+# 测试中使用的目录规模（须在基线中有记录）
+TEST_SIZE = 10000
+
+pytestmark = pytest.mark.skipif(not os.environ.get("GRAKX_BENCH"), reason="基准检查默认跳过，设置GRAKX_BENCH=1运行")
+
+
+def test_filter_engines_match_baseline():
+    baseline = load_baseline()
+    missing = [engine for engine in ENGINES if str(TEST_SIZE) not in baseline.get(engine, {})]
+    assert not missing, f"基线中缺少以下引擎的记录: {', '.join(missing)}"
+
+    results = run_engines([TEST_SIZE], list(ENGINES))
+    regressions = compare(results, baseline)
+    assert not regressions, "\n".join(regressions)
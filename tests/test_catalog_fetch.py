@@ -0,0 +1,96 @@
+"""
+课程目录获取失败的处理
+
+用假的分页响应代替网络请求（替换pipeline._request_body），
+检查获取失败的类别被报告为失败，而不是被当作没有课程。
+"""
+import json
+
+import pytest
+import requests
+
+from get_class import pipeline
+from get_class.filter import CATEGORY_LABELS
+
+# 每个类别的课程条数（每页15条，共2页）
+ROWS_PER_CATEGORY = 20
+
+
+def _rows(category, page_num):
+    start = (page_num - 1) * 15
+    return [{"jx0404id": f"{category}-{i}", "kcmc": "课程", "syrs": "5", "ctsm": ""}
+            for i in range(start, min(start + 15, ROWS_PER_CATEGORY))]
+
+
+@pytest.fixture
+def fake_pages(monkeypatch):
+    """返回失败的(类别, 页码)集合，加入其中的页面请求抛出ConnectionError"""
+    failing = set()
+
+    def request_body(category, page_num, endpoints=None):
+        if (category, page_num) in failing or (category, None) in failing:
+            raise requests.ConnectionError(f"{category}第{page_num}页连接失败")
+        return json.dumps({"iTotalRecords": ROWS_PER_CATEGORY, "aaData": _rows(category, page_num)}).encode()
+
+    monkeypatch.setattr(pipeline, "_request_body", request_body)
+    return failing
+
+
+def test_failed_refresh_keeps_api_snapshot(fake_pages):
+    from api import CatalogState
+
+    state = CatalogState()
+    state.refresh()
+    before = {category: len(state.catalog.rows(category)) for category in CATEGORY_LABELS}
+    assert before == {category: ROWS_PER_CATEGORY for category in CATEGORY_LABELS}
+    assert state.errors == {}
+
+    # 第1页失败（整个类别）和第2页失败（部分页面）都不得覆盖上一次的快照
+    fake_pages.update({("ts", None), ("bx", 2)})
+    state.refresh()
+    after = {category: len(state.catalog.rows(category)) for category in CATEGORY_LABELS}
+    assert after == before
+    assert set(state.errors) == {"ts", "bx"}
+
+
+@pytest.mark.parametrize("failing", [("ts", None), ("ts", 2)], ids=["all-pages", "second-page"])
+def test_failed_category_is_reported_not_empty(fake_pages, failing, capsys):
+    from get_class import get_class
+    from get_class.catalog import Catalog
+    from get_class.filter import filter_all_courses
+
+    fake_pages.add(failing)
+    label = CATEGORY_LABELS["ts"]
+
+    catalog = Catalog.from_futures(get_class())
+    assert set(catalog.errors) == {"ts"}
+    assert catalog.page_errors["ts"]
+
+    capsys.readouterr()
+    result = filter_all_courses(get_class())
+    output = capsys.readouterr().out
+    assert f"{label}课程: 获取失败" in output
+    assert f"{label}课程: 总条数(0)" not in output
+    assert len(result[CATEGORY_LABELS["zy"]]) == ROWS_PER_CATEGORY
+
+    # 不提供futures时经由流水线获取，失败同样被报告
+    filter_all_courses()
+    assert f"{label}课程: 获取失败" in capsys.readouterr().out
+
+
+def test_page_count_uses_display_records(monkeypatch):
+    from get_class import get_class
+    from get_class.catalog import Catalog
+
+    requested = []
+
+    def request_body(category, page_num, endpoints=None):
+        requested.append((category, page_num))
+        # 未筛选的总条数更多，按它计算页数会多请求5个空页面
+        return json.dumps({"iTotalRecords": 100, "iTotalDisplayRecords": ROWS_PER_CATEGORY,
+                           "aaData": _rows(category, page_num)}).encode()
+
+    monkeypatch.setattr(pipeline, "_request_body", request_body)
+    catalog = Catalog.from_futures(get_class())
+    assert sorted(requested) == sorted((category, page) for category in CATEGORY_LABELS for page in (1, 2))
+    assert all(len(catalog.rows(category)) == ROWS_PER_CATEGORY for category in CATEGORY_LABELS)
@@ -0,0 +1,39 @@
+"""
+/events的断线补发
+
+事件ID为"<纪元>-<序号>"：同一进程内按序号补发，纪元不同（服务器重启过）或无法补发时发送reset事件。
+"""
+from api import RESET_EVENT, EventBroadcaster, Subscriber
+
+
+def _frames(broadcaster, last_event_id):
+    subscriber = broadcaster.subscribe(Subscriber(), last_event_id)
+    return [frame.decode("utf-8") for frame in subscriber.pending]
+
+
+def test_replays_events_after_last_event_id():
+    broadcaster = EventBroadcaster()
+    ids = [broadcaster.publish("enrollment", {"n": n}) for n in range(5)]
+    frames = _frames(broadcaster, ids[2])
+    assert [frame.splitlines()[0] for frame in frames] == [f"id: {ids[3]}", f"id: {ids[4]}"]
+
+
+def test_other_epoch_gets_reset():
+    # 重启前的进程发出了更多事件，其序号落在新进程的序号范围内，也不能按序号补发
+    old = EventBroadcaster()
+    old_ids = [old.publish("enrollment", {"n": n}) for n in range(10)]
+    restarted = EventBroadcaster()
+    for n in range(20):
+        restarted.publish("enrollment", {"n": n})
+    for last_event_id in (old_ids[4], "5", "garbage"):
+        frames = _frames(restarted, last_event_id)
+        assert len(frames) == 1
+        assert f"event: {RESET_EVENT}" in frames[0]
+        assert frames[0].startswith(f"id: {restarted.epoch}-20\n")
+
+
+def test_evicted_events_get_reset():
+    broadcaster = EventBroadcaster(history=4, max_pending=4)
+    ids = [broadcaster.publish("enrollment", {"n": n}) for n in range(10)]
+    assert f"event: {RESET_EVENT}" in _frames(broadcaster, ids[0])[0]
+    assert len(_frames(broadcaster, ids[5])) == 4
@@ -0,0 +1,14 @@
+"""
+导入耗时预算
+
+在全新的解释器中导入session、get_class和命令行入口（见bench/bench_import.py），
+累计耗时不得超出预算，且导入阶段不得加载cv2、ddddocr等重型依赖。
+"""
+from bench.bench_import import DEFAULT_BUDGET_MS, measure_import_time
+
+
+def test_import_time_within_budget():
+    cumulative, heavy = measure_import_time()
+    assert not heavy, f"导入阶段加载了重型依赖: {', '.join(heavy)}"
+    total_ms = sum(cumulative.values()) / 1000
+    assert total_ms <= DEFAULT_BUDGET_MS, f"导入耗时 {total_ms:.2f} ms 超出预算 {DEFAULT_BUDGET_MS} ms"
@@ -0,0 +1,45 @@
+"""
+自适应并发限制器
+
+用模拟时钟驱动AIMDLimiter：服务器的延迟与并发数无关、只带随机抖动时，并发上限不应被压到最小值；
+延迟随并发数明显上升时，上限应停在服务器能承受的范围内。
+"""
+import random
+
+import pytest
+
+from get_class import limiter as limiter_module
+from get_class.limiter import AIMDLimiter
+
+SAMPLES = 5000
+
+
+def _simulate(monkeypatch, latency_of, samples=SAMPLES, seed=0):
+    """按当前并发上限连续完成samples个请求，latency_of(rng, 并发上限)返回单个请求的延迟"""
+    rng = random.Random(seed)
+    clock = [0.0]
+    monkeypatch.setattr(limiter_module.time, "monotonic", lambda: clock[0])
+    limiter = AIMDLimiter(initial=4, max_limit=50)
+    for _ in range(samples):
+        limit = limiter.limit
+        latency = latency_of(rng, limit)
+        limiter.acquire()
+        limiter.release(latency)
+        # 上限为n时每个延迟周期完成n个请求
+        clock[0] += latency / limit
+    return limiter
+
+
+@pytest.mark.parametrize("sigma", [0.1, 0.3, 0.5])
+def test_jitter_does_not_collapse_limit(monkeypatch, sigma):
+    limiter = _simulate(monkeypatch, lambda rng, limit: 0.2 * rng.lognormvariate(0, sigma))
+    metrics = limiter.metrics()
+    assert limiter.limit >= 25, metrics
+    assert metrics["slow"] < SAMPLES * 0.05, metrics
+
+
+def test_load_dependent_latency_backs_off(monkeypatch):
+    # 并发超过8时服务器排队，延迟随并发数线性上升
+    limiter = _simulate(monkeypatch, lambda rng, limit: 0.2 * max(1.0, limit / 8) * rng.lognormvariate(0, 0.1))
+    assert limiter.metrics()["decreases"] > 0
+    assert limiter.limit < 50, limiter.metrics()
@@ -0,0 +1,74 @@
+"""
+有学分上限时的课表规划
+
+合成12门课程、每门6个教学班的目录，检查有学分上限时分支定界仍能剪枝（规划和mark_full都在
+毫秒级完成），并在小规模目录上与穷举的结果比较。
+"""
+import itertools
+import random
+import time
+
+import pytest
+
+from get_class.planner import TimetablePlanner, Wish, sksj_mask
+
+# 有学分上限时单次规划加mark_full的耗时上限（秒），上界不考虑学分时约需1秒
+TIME_LIMIT = 0.3
+
+
+def _catalog(n_courses, n_sections, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for c in range(n_courses):
+        for s in range(n_sections):
+            weekday = rng.choice("一二三四五")
+            start = rng.choice((1, 3, 5, 7, 9))
+            rows.append({"jx0404id": f"{c}-{s}", "kch": f"K{c}", "kcmc": f"课程{c}", "xf": rng.choice(("2", "3", "4")),
+                         "sksj": f"1-16周 星期{weekday} {start}-{start + 1}节"})
+    return rows
+
+
+def _brute_force(wishlist, rows, max_credits):
+    """穷举所有组合得到的最优分数"""
+    n = len(wishlist)
+    options = [[row for row in rows if row["kch"] == wish.course] for wish in wishlist]
+    best = None
+    for choice in itertools.product(*[[None] + [(r, row) for r, row in enumerate(o)] for o in options]):
+        picked = [(j, r, row) for j, item in enumerate(choice) if item for r, row in [item]]
+        if any(wish.required and choice[j] is None for j, wish in enumerate(wishlist)):
+            continue
+        masks = [sksj_mask(row["sksj"]) for _, _, row in picked]
+        if any(a & b for a, b in itertools.combinations(masks, 2)):
+            continue
+        credits = sum(float(row["xf"]) for _, _, row in picked)
+        if not picked or (max_credits is not None and credits > max_credits + 1e-9):
+            continue
+        score = (sum(1 << (n - 1 - j) for j, _, _ in picked), credits, -sum(r for _, r, _ in picked))
+        best = score if best is None else max(best, score)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_capped_plan_is_fast(seed):
+    rows = _catalog(12, 6, seed)
+    elapsed = float("inf")
+    # 取3次中最快的一次，减少机器负载的影响
+    for _ in range(3):
+        start = time.perf_counter()
+        planner = TimetablePlanner([f"K{c}" for c in range(12)], rows, max_credits=20)
+        plans = planner.plan(limit=5)
+        planner.mark_full(plans[0].jx0404ids[0])
+        elapsed = min(elapsed, time.perf_counter() - start)
+    assert plans[0].credits <= 20
+    assert elapsed < TIME_LIMIT
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("max_credits", [None, 12, 9.5])
+@pytest.mark.parametrize("required", [(), (2,), (0, 4)])
+def test_best_plan_matches_brute_force(seed, max_credits, required):
+    rows = _catalog(5, 3, seed)
+    wishlist = [Wish(f"K{c}", required=c in required) for c in range(5)]
+    best = TimetablePlanner(wishlist, rows, max_credits=max_credits).best()
+    expected = _brute_force(wishlist, rows, max_credits)
+    assert (best.score if best else None) == expected
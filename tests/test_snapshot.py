@@ -0,0 +1,41 @@
+"""
+二进制快照与原始数据的一致性
+
+用基准测试的合成目录（包含"不限"、"-"、"满"、None等非数字的剩余人数）检查：
+快照的available()与filter.is_course_available逐条一致，row()能还原无法转换为数值的原值。
+"""
+import pytest
+
+from bench.bench_filter import generate_catalog
+from get_class.filter import is_course_available
+from get_class.snapshot import CATEGORIES, Snapshot, np, write_snapshot
+
+USE_NUMPY = [False, pytest.param(True, marks=pytest.mark.skipif(np is None, reason="需要numpy"))]
+
+
+@pytest.fixture(scope="module")
+def sample(tmp_path_factory):
+    rows = [{"category": CATEGORIES[i % len(CATEGORIES)], **row}
+            for i, row in enumerate(generate_catalog(5000, seed=1))]
+    path = str(tmp_path_factory.mktemp("snapshot") / "catalog.snap")
+    write_snapshot(rows, path)
+    return rows, path
+
+
+@pytest.mark.parametrize("use_numpy", USE_NUMPY)
+def test_available_matches_is_course_available(sample, use_numpy):
+    rows, path = sample
+    expected = [index for index, row in enumerate(rows) if is_course_available(row)]
+    with Snapshot(path, use_numpy=use_numpy) as snapshot:
+        assert snapshot.available() == expected
+
+
+@pytest.mark.parametrize("use_numpy", USE_NUMPY)
+def test_row_keeps_unparsed_values(sample, use_numpy):
+    rows, path = sample
+    with Snapshot(path, use_numpy=use_numpy) as snapshot:
+        for index, row in enumerate(rows):
+            restored = snapshot.row(index)
+            syrs = row["syrs"]
+            assert str(restored["syrs"]) == ("" if syrs is None else syrs)
+            assert is_course_available(restored) == is_course_available(row)